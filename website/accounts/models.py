@@ -21,6 +21,9 @@ def user_profile_image_path(instance, filename):
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     profile_picture = models.ImageField(upload_to=user_profile_image_path, blank=True, null=True)
+    # Size, colour and placeholder of profile_picture (website/image_meta.py)
+    image_meta = models.JSONField(default=dict, blank=True, editable=False)
+    IMAGE_META_FIELDS = ('profile_picture',)
     #bio = models.TextField(blank=True)
     
     def __str__(self):
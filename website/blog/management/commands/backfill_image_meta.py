@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from accounts.models import UserProfile
+from blog.models import Post
+from influencer.models import Influencer
+from website import image_meta
+from webstory.models import WebStory
+
+MODELS = {model._meta.label: model for model in (Post, Influencer, WebStory, UserProfile)}
+
+
+def _measure_job(job):
+    """Worker entry point: measure one image. Returns (job, meta, error)."""
+    try:
+        return job, image_meta.read_meta(job[4]), None
+    except Exception as e:
+        return job, None, str(e)
+
+
+class Command(BaseCommand):
+    help = "Fill in image_meta (size, dominant colour, blurred placeholder) for images that lack it, in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=sorted(MODELS), help='Only this model (repeatable)')
+        parser.add_argument('--force', action='store_true', help='Re-measure images whose metadata looks current')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk_update')
+
+    def handle(self, *args, **options):
+        for label in options['model'] or MODELS:
+            self.backfill(MODELS[label], options)
+
+    def backfill(self, model, options):
+        fields = model.IMAGE_META_FIELDS
+        # Decide what to measure in this process from the stored names; only
+        # the decoding is shipped to workers.
+        metas, jobs = {}, []
+        rows = model._default_manager.order_by('pk').values_list('pk', 'image_meta', *fields)
+        for pk, meta, *names in rows.iterator(chunk_size=2000):
+            meta = dict(meta or {})
+            changed = False
+            for field_name, name in zip(fields, names):
+                current = meta.get(field_name, {})
+                if not name:
+                    changed |= meta.pop(field_name, None) is not None
+                elif options['force'] or current.get('name') != name:
+                    jobs.append((pk, field_name, name, meta, default_storage.path(name)))
+            if changed:
+                metas[pk] = meta
+
+        label = model.__name__
+        self.stdout.write(f"{label}: {len(jobs)} image(s) to measure.")
+        failed = 0
+        if jobs:
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                chunksize = max(1, len(jobs) // (options['workers'] * 4))
+                for (pk, field_name, name, meta, _), measured, error in pool.map(_measure_job, jobs, chunksize=chunksize):
+                    meta = metas.setdefault(pk, meta)
+                    if error:
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(f"❌ {model.__name__} {pk} {field_name}: {error}"))
+                        meta[field_name] = {'name': name}  # as image_meta.compute() records unreadable files
+                    else:
+                        meta[field_name] = {'name': name, **measured}
+
+        # bulk_update: no save() side effects, updated_at/modified_date untouched.
+        pending = [model(pk=pk, image_meta=meta) for pk, meta in metas.items()]
+        for start in range(0, len(pending), options['batch_size']):
+            model._default_manager.bulk_update(pending[start:start + options['batch_size']], ['image_meta'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {label}: updated {len(pending)} row(s), {failed} image(s) failed.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog import related
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed related-posts table (IDF-weighted tag/category similarity)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk_create')
+
+    def handle(self, *args, **options):
+        total = related.rebuild_related(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Stored {total} related-post link(s).'))
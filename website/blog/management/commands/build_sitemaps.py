@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from website import sitemap_files
+
+
+class Command(BaseCommand):
+    help = 'Write static (and gzipped) sitemap files for the sections changed since the last build'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild every section, not just the changed ones')
+        parser.add_argument('--section', action='append', choices=sitemap_files.SECTION_NAMES,
+                            help='Rebuild this section (repeatable)')
+        parser.add_argument('--base-url', help='Absolute site URL used in <loc> (default: settings.SITE_URL)')
+
+    def handle(self, *args, **options):
+        if options['all'] and options['section']:
+            raise CommandError('Use either --all or --section, not both.')
+        sections = sitemap_files.SECTION_NAMES if options['all'] else options['section']
+
+        built = sitemap_files.build(sections, base_url=options['base_url'])
+        if not built:
+            self.stdout.write('Sitemaps are up to date.')
+            return
+        for section, names in built.items():
+            self.stdout.write(f'{section}: {", ".join(names)}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {len(built)} section(s) and sitemap_index.xml.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from website import suggest
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the header search typeahead index from the database and compact its delta log'
+
+    def handle(self, *args, **options):
+        count = suggest.build()
+        self.stdout.write(self.style.SUCCESS(f'✅ Indexed {count} suggestions.'))
@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from blog import og
+from blog.models import Post
+from website.file_cleanup import delete_on_commit
+
+
+def _render_job(job):
+    """Worker entry point: build one card. Returns (post_id, name, old_name, signature, error)."""
+    post_id, src_path, dest_name, old_name, signature = job
+    try:
+        og.render_og_card(src_path, os.path.join(settings.MEDIA_ROOT, dest_name))
+        return post_id, dest_name, old_name, signature, None
+    except Exception as e:
+        return post_id, dest_name, old_name, signature, str(e)
+
+
+def _save_cards(pending):
+    """Store the new card names, then delete the cards they replace."""
+    Post.objects.bulk_update([post for post, _ in pending], ['og_image', 'og_source_hash'])
+    field = Post._meta.get_field('og_image')
+    for post, old_name in pending:
+        if old_name and old_name != post.og_image.name:
+            delete_on_commit(field.attr_class(post, field, old_name))
+
+
+class Command(BaseCommand):
+    help = 'Generate 1200x630 Open Graph cards for blog posts in parallel, skipping cards that are already current'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only posts modified on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--force', action='store_true', help='Regenerate even if the source image is unchanged')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk_update')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(featured_image__isnull=True).exclude(featured_image='')
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format.")
+            posts = posts.filter(modified_date__gte=timezone.make_aware(datetime.combine(since, time.min)))
+
+        # Decide what to do in this process from cheap stat() calls; only real work is shipped to workers.
+        jobs = []
+        missing = 0
+        rows = posts.order_by('id').values_list('id', 'featured_image', 'og_image', 'og_source_hash')
+        for post_id, image_name, og_name, stored_hash in rows.iterator(chunk_size=2000):
+            src_path = os.path.join(settings.MEDIA_ROOT, image_name)
+            try:
+                signature = og.source_signature(image_name, src_path)
+            except OSError:
+                missing += 1
+                continue
+            if og_name and signature == stored_hash and not options['force']:
+                continue
+            jobs.append((post_id, src_path, og.og_image_name(post_id, signature), og_name, signature))
+
+        skipped = posts.count() - len(jobs) - missing
+        self.stdout.write(f"{len(jobs)} card(s) to render, {skipped} up to date, {missing} missing source file(s).")
+        if not jobs:
+            return
+
+        done, failed, pending = 0, 0, []
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            chunksize = max(1, len(jobs) // (options['workers'] * 4))
+            for post_id, name, old_name, signature, error in pool.map(_render_job, jobs, chunksize=chunksize):
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"❌ Post {post_id}: {error}"))
+                    continue
+                # bulk_update: no save() side effects, modified_date untouched.
+                pending.append((Post(pk=post_id, og_image=name, og_source_hash=signature), old_name))
+                if len(pending) >= options['batch_size']:
+                    _save_cards(pending)
+                    done += len(pending)
+                    pending = []
+        if pending:
+            _save_cards(pending)
+            done += len(pending)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Generated {done} OG card(s), {failed} failed.'))
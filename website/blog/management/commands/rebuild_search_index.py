@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FTS5 full-text search index for all blog posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Posts inserted per executemany() batch')
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            raise CommandError('Full-text search needs the SQLite database backend.')
+
+        # One transaction: searches keep seeing the old index until the new one is complete.
+        with transaction.atomic():
+            total = search.rebuild_index(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Indexed {total} post(s).'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.rendering import content_hash, render_content
+
+
+class Command(BaseCommand):
+    help = 'Pre-render Post.content into Post.rendered_html for posts whose content (or the renderer) changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render every post, even if up to date')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rendered = 0
+        batch = []
+
+        posts = Post.objects.only('id', 'content', 'content_hash').order_by('id')
+        for post in posts.iterator(chunk_size=batch_size):
+            digest = content_hash(post.content)
+            if digest == post.content_hash and not options['force']:
+                continue
+            post.rendered_html = render_content(post.content)
+            post.content_hash = digest
+            batch.append(post)
+
+            if len(batch) >= batch_size:
+                # bulk_update skips save(): no modified_date bump, no re-render.
+                Post.objects.bulk_update(batch, ['rendered_html', 'content_hash'])
+                rendered += len(batch)
+                batch = []
+
+        if batch:
+            Post.objects.bulk_update(batch, ['rendered_html', 'content_hash'])
+            rendered += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Rendered {rendered} post(s).'))
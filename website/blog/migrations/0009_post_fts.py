@@ -0,0 +1,46 @@
+# Full-text search table for blog posts (see blog/search.py)
+
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends fall back to icontains search.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts USING fts5("
+        "title, excerpt, meta_keywords, body, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS blog_post_fts")
+
+
+def populate_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from blog.search import document_for
+
+    Post = apps.get_model('blog', 'Post')
+    rows = Post.objects.order_by('id').values_list('id', 'title', 'excerpt', 'meta_keywords', 'content')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO blog_post_fts (rowid, title, excerpt, meta_keywords, body) VALUES (%s, %s, %s, %s, %s)",
+            ([pk, *document_for(*fields)] for pk, *fields in rows.iterator(chunk_size=500)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_published_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(populate_fts_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_post_rendered_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='og_image',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='og_images'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='og_source_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_relatedpost'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='modified_date',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
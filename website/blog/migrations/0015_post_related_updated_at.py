@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_post_image_meta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='related_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,12 +1,15 @@
 # blog/models.py
+from django.conf import settings
 from django.db import models
 from django.utils.text import slugify
-from PIL import Image
 import os
-from django.core.files.base import ContentFile
-from io import BytesIO
 from django.urls import reverse
 
+from website.file_cleanup import delete_on_commit
+
+from . import og
+from .rendering import content_hash, render_content
+
 class Author(models.Model):
     wp_id = models.IntegerField(unique=True)
     name = models.CharField(max_length=255)
@@ -19,7 +22,9 @@ class Category(models.Model):
     wp_id = models.IntegerField(unique=True)
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
-    updated_at = models.DateTimeField(auto_now=True) 
+    # Also bumped when a post in the category changes (blog/signals.py), so
+    # it doubles as the category page's Last-Modified.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -52,7 +57,30 @@ class Post(models.Model):
     meta_keywords = models.CharField(max_length=255, blank=True, null=True)
     noindex = models.BooleanField(default=False)
     published_date = models.DateTimeField(auto_now_add=True)
-    modified_date = models.DateTimeField(auto_now=True)
+    modified_date = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Output of blog/rendering.py, computed on save; content_hash records
+    # which version of `content` (and of the renderer) it was made from.
+    rendered_html = models.TextField(blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    # 1200x630 social card built from featured_image (see blog/og.py)
+    og_image = models.ImageField(upload_to=og.OG_UPLOAD_DIR, blank=True, null=True, editable=False)
+    og_source_hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    # Size, colour and placeholder of featured_image (website/image_meta.py)
+    image_meta = models.JSONField(default=dict, blank=True, editable=False)
+    IMAGE_META_FIELDS = ('featured_image',)
+
+    # When blog/related.py last rewrote this post's RelatedPost list; part of
+    # blog_detail's ETag and Last-Modified, like modified_date
+    related_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Backs the (published_date, id) keyset pagination of the post lists.
+            models.Index(fields=['published_date', 'id'], name='blog_post_published_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -60,18 +88,52 @@ class Post(models.Model):
     def get_absolute_url(self):
         return reverse('blog_detail', kwargs={'slug': self.slug})
 
-    def generate_og_image(self):
-            image_path = self.featured_image.path
-            image = Image.open(image_path)
+    def save(self, *args, **kwargs):
+        # Render the content once here so requests never transform HTML.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            digest = content_hash(self.content)
+            if digest != self.content_hash:
+                self.rendered_html = render_content(self.content)
+                self.content_hash = digest
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'rendered_html', 'content_hash'}
+        super().save(*args, **kwargs)
+
+    def generate_og_image(self, force=False):
+        """(Re)build this post's 1200x630 OG card unless it is already current."""
+        if not self.featured_image:
+            return False
+        signature = og.source_signature(self.featured_image.name, self.featured_image.path)
+        if not force and self.og_image and signature == self.og_source_hash:
+            return False
 
-            # Resize to OG dimensions: 1200x630
-            image = image.convert("RGB")
-            image = image.resize((1200, 630), Image.ANTIALIAS)
+        old_name = self.og_image.name
+        name = og.og_image_name(self.pk, signature)
+        og.render_og_card(self.featured_image.path, os.path.join(settings.MEDIA_ROOT, name))
+        self.og_image.name = name
+        self.og_source_hash = signature
+        self.save(update_fields=['og_image', 'og_source_hash'])
+        if old_name and old_name != name:
+            field = self._meta.get_field('og_image')
+            delete_on_commit(field.attr_class(self, field, old_name))
+        return True
 
-            buffer = BytesIO()
-            image.save(fp=buffer, format='JPEG')
 
-            og_image_name = f"og_{os.path.basename(self.featured_image.name)}"
-            self.og_image.save(og_image_name, ContentFile(buffer.getvalue()), save=False)
+class RelatedPost(models.Model):
+    """One precomputed "related posts" neighbour of a post (see blog/related.py)."""
+    # No separate index on post_id: the (post, rank) constraint below covers it.
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_links', db_index=False)
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_to')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
 
-            self.save(update_fields=['og_image'])
\ No newline at end of file
+    class Meta:
+        ordering = ['rank']
+        constraints = [
+            # Also the index blog_detail reads the neighbours through.
+            models.UniqueConstraint(fields=['post', 'rank'], name='blog_relatedpost_post_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.3f})"
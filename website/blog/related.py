@@ -0,0 +1,228 @@
+# blog/related.py
+"""
+Precomputed "related posts" for blog_detail.
+
+Each post is a sparse vector over its tags and categories, every term
+weighted by its inverse document frequency (a tag on 5 posts says far more
+than a category on 5,000). Neighbours are ranked by cosine similarity and
+the top RELATED_POSTS_COUNT per post are stored in RelatedPost, so the
+detail page reads them with one indexed query and never scores anything.
+
+* rebuild_related() scores every post at once through an in-memory inverted
+  index (term -> posting list), the sparse equivalent of X @ X.T. It is run
+  by ``python manage.py build_related_posts``.
+* refresh_related() updates just the posts whose terms changed plus the
+  neighbours whose lists they enter or leave. blog/signals.py calls it after
+  commit whenever a post's tags or categories change.
+
+Both stamp Post.related_updated_at on the posts whose lists they rewrote,
+so blog_detail's conditional GET validators change with the list.
+
+Incremental updates reuse the current IDF weights of all terms; a nightly
+rebuild folds in the slow drift of those weights as the blog grows.
+"""
+import heapq
+import math
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Post, RelatedPost
+
+RELATED_POSTS_COUNT = 6
+
+# Tags are chosen per post; categories are broad buckets.
+TAG_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.5
+
+# (term prefix, through model, term column, weight)
+_SOURCES = (
+    ('t', Post.tags.through, 'tag_id', TAG_WEIGHT),
+    ('c', Post.categories.through, 'category_id', CATEGORY_WEIGHT),
+)
+
+
+def _term_weights():
+    """IDF weight of every tag/category term that is on at least one post."""
+    total = Post.objects.count()
+    weights = {}
+    for prefix, through, column, weight in _SOURCES:
+        counts = through.objects.order_by().values(column).annotate(df=Count('post_id')).values_list(column, 'df')
+        for term_id, df in counts:
+            weights[(prefix, term_id)] = weight * math.log(total / df)
+    return weights
+
+
+def _post_terms(post_ids=None):
+    """post_id -> set of terms, for the given posts (or all posts)."""
+    terms = defaultdict(set)
+    for prefix, through, column, _ in _SOURCES:
+        rows = through.objects.all()
+        if post_ids is not None:
+            rows = rows.filter(post_id__in=post_ids)
+        for post_id, term_id in rows.values_list('post_id', column).iterator(chunk_size=5000):
+            terms[post_id].add((prefix, term_id))
+    return terms
+
+
+def _postings_for(terms):
+    """term -> list of post ids carrying it, for the given terms only."""
+    postings = defaultdict(list)
+    for prefix, through, column, _ in _SOURCES:
+        term_ids = [term_id for p, term_id in terms if p == prefix]
+        if not term_ids:
+            continue
+        rows = through.objects.filter(**{f'{column}__in': term_ids}).values_list(column, 'post_id')
+        for term_id, post_id in rows.iterator(chunk_size=5000):
+            postings[(prefix, term_id)].append(post_id)
+    return postings
+
+
+def _norms(terms, weights):
+    return {
+        post_id: math.sqrt(sum(weights.get(term, 0.0) ** 2 for term in post_terms))
+        for post_id, post_terms in terms.items()
+    }
+
+
+def _scores(post_id, terms, postings, weights, norms):
+    """Cosine similarity of ``post_id`` to every post sharing a weighted term with it."""
+    norm = norms.get(post_id)
+    if not norm:
+        return {}
+    dots = defaultdict(float)
+    for term in terms[post_id]:
+        weight_sq = weights.get(term, 0.0) ** 2
+        if not weight_sq:
+            continue  # a term on every post can't tell posts apart
+        for other in postings[term]:
+            if other != post_id:
+                dots[other] += weight_sq
+    return {other: dot / (norm * norms[other]) for other, dot in dots.items()}
+
+
+def _top(scores, limit=RELATED_POSTS_COUNT):
+    # Ties go to the higher id, i.e. the newer post.
+    return heapq.nlargest(limit, ((score, other) for other, score in scores.items()))
+
+
+def _links(post_id, ranked):
+    return [
+        RelatedPost(post_id=post_id, related_id=other, rank=rank, score=score)
+        for rank, (score, other) in enumerate(ranked)
+    ]
+
+
+def _replace(lists, batch_size=1000):
+    """Swap in new neighbour lists ({post_id: [(score, other), ...]})."""
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=list(lists)).delete()
+        links = [link for post_id, ranked in lists.items() for link in _links(post_id, ranked)]
+        RelatedPost.objects.bulk_create(links, batch_size=batch_size)
+        # update(): the posts' own modified_date (and sitemap lastmod) stay put.
+        Post.objects.filter(pk__in=list(lists)).update(related_updated_at=timezone.now())
+
+
+def rebuild_related(batch_size=1000):
+    """Recompute every post's neighbours from scratch. Returns the number of links written."""
+    weights = _term_weights()
+    terms = _post_terms()
+    norms = _norms(terms, weights)
+
+    # Invert post -> terms into term -> posts; the accumulation in _scores()
+    # then only ever visits pairs of posts that actually share a term.
+    postings = defaultdict(list)
+    for post_id, post_terms in terms.items():
+        for term in post_terms:
+            postings[term].append(post_id)
+
+    links = []
+    for post_id in terms:
+        links.extend(_links(post_id, _top(_scores(post_id, terms, postings, weights, norms))))
+
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(links, batch_size=batch_size)
+        Post.objects.update(related_updated_at=timezone.now())
+    return len(links)
+
+
+def refresh_related(post_ids):
+    """Bring the neighbour lists touched by a change to ``post_ids``' terms up to date."""
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+
+    weights = _term_weights()
+    changed_terms = _post_terms(post_ids)
+    postings = _postings_for(set().union(*changed_terms.values()) if changed_terms else set())
+    candidates = {other for posting in postings.values() for other in posting}
+    # Posts that list a changed post today may have to drop it.
+    listing = set(RelatedPost.objects.filter(related_id__in=post_ids).values_list('post_id', flat=True))
+
+    terms = _post_terms(post_ids | candidates)
+    norms = _norms(terms, weights)
+
+    scores = {post_id: _scores(post_id, terms, postings, weights, norms) for post_id in post_ids}
+    lists = {post_id: _top(post_scores) for post_id, post_scores in scores.items()}
+
+    # Cosine similarity is symmetric, so each affected neighbour's list only
+    # needs the changed posts' new scores merged into it.
+    neighbours = (candidates | listing) - post_ids
+    current = defaultdict(dict)
+    for post_id, other, score in RelatedPost.objects.filter(post_id__in=neighbours).values_list('post_id', 'related_id', 'score'):
+        current[post_id][other] = score
+
+    full_recompute = set()
+    for neighbour in neighbours:
+        entries = current[neighbour]
+        was_full = len(entries) >= RELATED_POSTS_COUNT
+        dropped = False
+        for post_id in post_ids:
+            new_score = scores[post_id].get(neighbour)
+            if new_score:
+                if post_id in entries and new_score < entries[post_id]:
+                    dropped = True
+                entries[post_id] = new_score
+            elif entries.pop(post_id, None) is not None:
+                dropped = True
+        if dropped and was_full:
+            # Whatever should replace it is unknown here: score this one from scratch.
+            full_recompute.add(neighbour)
+        else:
+            lists[neighbour] = _top(entries)
+
+    if full_recompute:
+        more_terms = _post_terms(full_recompute)
+        more_postings = _postings_for(set().union(*more_terms.values()) if more_terms else set())
+        more_ids = {other for posting in more_postings.values() for other in posting} | full_recompute
+        all_terms = _post_terms(more_ids)
+        all_norms = _norms(all_terms, weights)
+        for neighbour in full_recompute:
+            lists[neighbour] = _top(_scores(neighbour, all_terms, more_postings, weights, all_norms))
+
+    _replace(lists)
+
+
+# Posts whose terms changed in the current transaction, per thread.
+_pending = threading.local()
+
+
+def schedule_refresh(post_id):
+    """Queue a post for refresh_related() once the current transaction commits."""
+    ids = getattr(_pending, 'ids', None)
+    if ids is None:
+        ids = _pending.ids = set()
+    ids.add(post_id)
+    # Registered per call; the first callback to run takes the whole batch,
+    # so an import that retags a page of posts refreshes them in one pass.
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    ids, _pending.ids = getattr(_pending, 'ids', None), None
+    if ids:
+        refresh_related(ids)
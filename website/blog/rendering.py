@@ -0,0 +1,157 @@
+# blog/rendering.py
+"""
+Save-time rendering of Post.content.
+
+WordPress-imported HTML is parsed once with lxml when a post is saved and
+the cleaned-up result is stored in Post.rendered_html, so requests only
+ever output precomputed markup. The pipeline:
+
+* strips WordPress cruft: block comments, the per-attachment image classes
+  (wp-image-N, size-*, attachment-*), lazy-load plugin attributes and the
+  <noscript> copy such plugins put after an image, and empty paragraphs.
+  Layout classes (align*, is-*, has-*, wp-block-*), other data-*
+  attributes and other <noscript> content are kept;
+* adds loading="lazy" / decoding="async" to every <img>;
+* for images under MEDIA_URL, adds the intrinsic width/height read from the
+  local file and a srcset of downscaled derivatives under RESPONSIVE_DIR.
+  A derivative's name includes the original's size and mtime, so replacing
+  the original produces new derivatives instead of serving stale ones.
+
+Bump RENDERER_VERSION whenever the output changes so that
+``python manage.py render_post_content`` re-renders every post.
+"""
+import hashlib
+import html
+import logging
+import os
+import re
+from urllib.parse import unquote, urlparse
+
+import lxml.html
+from lxml import etree
+from PIL import Image
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RENDERER_VERSION = 2
+
+# Widths of the srcset derivatives; only those narrower than the original are made.
+RESPONSIVE_WIDTHS = (480, 768, 1200)
+RESPONSIVE_DIR = 'responsive'
+CONTENT_IMAGE_SIZES = '(max-width: 768px) 100vw, 768px'
+
+_WP_CLASS_RE = re.compile(r'^(wp-image-\d+$|size-|attachment-)')
+# Attributes lazy-load plugins use to hide the real image URL.
+_LAZY_SRC_ATTRS = ('data-lazy-src', 'data-src', 'data-original')
+# ...and the real srcset/sizes, which are replaced by our own anyway.
+_LAZY_ATTRS = _LAZY_SRC_ATTRS + ('data-lazy-srcset', 'data-srcset', 'data-lazy-sizes', 'data-sizes')
+
+
+def content_hash(content):
+    """Digest of the source HTML (and renderer version) a render was made from."""
+    return hashlib.sha256(f'{RENDERER_VERSION}:{content}'.encode('utf-8')).hexdigest()
+
+
+def _media_path(src):
+    """Return the MEDIA_ROOT-relative path for a local media URL, else None."""
+    path = unquote(urlparse(src).path)
+    if not path.startswith(settings.MEDIA_URL):
+        return None
+    relative = os.path.normpath(path[len(settings.MEDIA_URL):])
+    if relative.startswith('..') or os.path.isabs(relative):
+        return None
+    return relative
+
+
+def _source_signature(path):
+    """Short digest of a file's size and mtime, to key the derivatives made from it."""
+    stat = os.stat(path)
+    return hashlib.sha1(f'{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:10]
+
+
+def _derivative(relative, width, signature):
+    """Create (once) a ``width``-pixel-wide copy of a media file; return its relative path."""
+    stem, ext = os.path.splitext(relative)
+    target = os.path.join(RESPONSIVE_DIR, str(width), f'{stem}.{signature}{ext}')
+    target_path = os.path.join(settings.MEDIA_ROOT, target)
+    if not os.path.exists(target_path):
+        with Image.open(os.path.join(settings.MEDIA_ROOT, relative)) as img:
+            height = round(img.height * width / img.width)
+            img.draft(img.mode, (width, height))  # JPEG: decode at reduced scale
+            resized = img.resize((width, height), Image.Resampling.LANCZOS)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            resized.save(target_path, format=img.format, quality=82, optimize=True)
+    return target.replace(os.sep, '/')
+
+
+def _process_image(img):
+    # Promote the real URL hidden by lazy-load plugins.
+    for attr in _LAZY_SRC_ATTRS:
+        if img.get(attr):
+            img.set('src', img.get(attr))
+            break
+    for attr in _LAZY_ATTRS + ('srcset', 'sizes'):
+        img.attrib.pop(attr, None)
+
+    img.set('loading', 'lazy')
+    img.set('decoding', 'async')
+
+    relative = _media_path(img.get('src', ''))
+    source = relative and os.path.join(settings.MEDIA_ROOT, relative)
+    if not relative or not os.path.isfile(source):
+        return  # remote or missing image: nothing local to measure
+    try:
+        signature = _source_signature(source)
+        with Image.open(source) as probe:
+            width, height = probe.size  # header only, no pixel decode
+        img.set('width', str(width))
+        img.set('height', str(height))
+
+        srcset = [
+            f'{settings.MEDIA_URL}{_derivative(relative, w, signature)} {w}w'
+            for w in RESPONSIVE_WIDTHS if w < width
+        ]
+        if srcset:
+            srcset.append(f"{img.get('src')} {width}w")
+            img.set('srcset', ', '.join(srcset))
+            img.set('sizes', CONTENT_IMAGE_SIZES)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not process content image %s: %s", relative, e)
+
+
+def _strip_wp_cruft(root):
+    for comment in list(root.iter(etree.Comment)):
+        comment.drop_tree()
+
+    # Lazy-load plugins repeat the image in a <noscript> right after it.
+    for noscript in list(root.iter('noscript')):
+        image = noscript.getprevious()
+        if image is not None and image.tag == 'img' and any(image.get(a) for a in _LAZY_SRC_ATTRS):
+            noscript.drop_tree()
+
+    for el in root.iter(etree.Element):
+        classes = [c for c in el.get('class', '').split() if not _WP_CLASS_RE.match(c)]
+        if classes:
+            el.set('class', ' '.join(classes))
+        elif 'class' in el.attrib:
+            del el.attrib['class']
+
+    for p in list(root.iter('p')):
+        if len(p) == 0 and not (p.text or '').replace('\xa0', '').strip():
+            p.drop_tree()
+
+
+def render_content(content):
+    """Render WordPress post HTML into the markup served by blog_detail."""
+    if not content or not content.strip():
+        return ''
+
+    root = lxml.html.fragment_fromstring(content, create_parent='div')
+    _strip_wp_cruft(root)
+    for img in root.iter('img'):
+        _process_image(img)
+
+    leading = html.escape(root.text, quote=False) if root.text else ''
+    return leading + ''.join(lxml.html.tostring(child, encoding='unicode') for child in root)
@@ -0,0 +1,152 @@
+# blog/search.py
+"""
+Full-text search over blog posts, backed by an SQLite FTS5 table.
+
+``blog_post_fts`` holds one row per Post (rowid = Post.id) with the title,
+excerpt, meta keywords and the tag-stripped body. It is created by a
+migration, kept in sync by the signals in blog/signals.py and can be rebuilt
+from scratch with ``python manage.py rebuild_search_index``.
+"""
+import html
+import re
+
+from django.db import connection
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'blog_post_fts'
+
+# Fields on Post that feed the index; saves touching none of them skip reindexing.
+INDEXED_FIELDS = {'title', 'excerpt', 'meta_keywords', 'content'}
+
+# bm25() weights, in FTS column order: title, excerpt, meta_keywords, body
+COLUMN_WEIGHTS = (10.0, 4.0, 6.0, 1.0)
+
+# Markers wrapped around matches by snippet()/highlight(). They can't occur in
+# stripped text, so the snippet can be HTML-escaped first and marked up after.
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fts_available():
+    """FTS5 only exists on SQLite; other backends fall back to icontains."""
+    return connection.vendor == 'sqlite'
+
+
+def document_for(title, excerpt, meta_keywords, content):
+    """Build the FTS row for a post: plain text, no markup or entities."""
+    def plain(value):
+        return _SPACE_RE.sub(' ', html.unescape(strip_tags(value or ''))).strip()
+    return plain(title), plain(excerpt), plain(meta_keywords), plain(content)
+
+
+def _insert_rows(cursor, rows):
+    cursor.executemany(
+        f'INSERT INTO {FTS_TABLE} (rowid, title, excerpt, meta_keywords, body) VALUES (%s, %s, %s, %s, %s)',
+        rows,
+    )
+
+
+def index_post(post):
+    """Insert or refresh the FTS row for one post."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        _insert_rows(cursor, [[post.pk, *document_for(post.title, post.excerpt, post.meta_keywords, post.content)]])
+
+
+def remove_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild_index(batch_size=500):
+    """Re-index every post in batches. Returns the number of posts indexed."""
+    rows = Post.objects.order_by('id').values_list('id', 'title', 'excerpt', 'meta_keywords', 'content')
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        batch = []
+        for pk, title, excerpt, keywords, content in rows.iterator(chunk_size=batch_size):
+            batch.append([pk, *document_for(title, excerpt, keywords, content)])
+            if len(batch) >= batch_size:
+                _insert_rows(cursor, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            _insert_rows(cursor, batch)
+            total += len(batch)
+        # Merge the b-tree segments written above into one for faster queries.
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def build_match_query(query):
+    """
+    Turn free text from the search box into a safe FTS5 MATCH expression.
+
+    Every word is quoted (so FTS5 operators typed by users are inert) and
+    the terms are ANDed. The last word is a prefix query, so a partly typed
+    or truncated word still matches.
+    """
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _marked(text):
+    """Escape FTS output and turn the match markers into <mark> tags."""
+    return mark_safe(escape(text).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+def search_posts(query, limit=30):
+    """
+    Return up to ``limit`` posts matching ``query``, best match first.
+
+    Each post carries ``search_title`` and ``search_snippet`` attributes with
+    the matched words wrapped in <mark>.
+    """
+    card_fields = ('id', 'title', 'slug', 'excerpt', 'featured_image', 'image_meta', 'published_date')
+
+    if not fts_available():
+        posts = list(Post.objects.filter(title__icontains=query).only(*card_fields).order_by('-published_date')[:limit])
+        for post in posts:
+            post.search_title = post.title
+            post.search_snippet = post.excerpt
+        return posts
+
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid,
+                   highlight({FTS_TABLE}, 0, %s, %s),
+                   snippet({FTS_TABLE}, 3, %s, %s, '…', 24)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY bm25({FTS_TABLE}, {', '.join(str(w) for w in COLUMN_WEIGHTS)})
+            LIMIT %s
+            """,
+            [_MARK_OPEN, _MARK_CLOSE, _MARK_OPEN, _MARK_CLOSE, match, limit],
+        )
+        hits = cursor.fetchall()
+
+    posts = Post.objects.only(*card_fields).in_bulk([pk for pk, _, _ in hits])
+    results = []
+    for pk, title, snippet in hits:
+        post = posts.get(pk)
+        if post is None:  # index row for a post deleted outside the ORM
+            continue
+        post.search_title = _marked(title)
+        post.search_snippet = _marked(snippet)
+        results.append(post)
+    return results
@@ -0,0 +1,150 @@
+# blog/signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from influencer.models import Influencer
+from website import image_meta, suggest
+from website.sitemap_files import LASTMOD_FIELDS, mark_dirty
+from webstory.models import WebStory
+
+from . import related, search
+from .models import Category, Post, RelatedPost
+
+# Post fields rendered on category pages; saves touching none of them leave
+# the category's Last-Modified alone.
+CARD_FIELDS = {'title', 'slug', 'excerpt', 'content', 'featured_image', 'published_date', 'author'}
+
+
+def touch_categories(**filters):
+    """Bump Category.updated_at (the category page's Last-Modified) without a full save."""
+    if Category.objects.filter(**filters).update(updated_at=timezone.now()):
+        mark_dirty('category')
+
+
+@receiver(post_save, sender=Post)
+def index_post_on_save(sender, instance, update_fields=None, **kwargs):
+    """Keep the FTS index in step with the post, in the same transaction."""
+    if not search.fts_available():
+        return
+    if update_fields is not None and not search.INDEXED_FIELDS.intersection(update_fields):
+        return  # e.g. an og_image or timestamp-only save
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_on_delete(sender, instance, **kwargs):
+    if search.fts_available():
+        search.remove_post(instance.pk)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Post.categories.through)
+def refresh_related_on_terms_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Re-rank related posts after commit when a post's tags or categories change."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        related.schedule_refresh(instance.pk)
+    elif pk_set:
+        # tag.post_set.add(...) and friends: the posts are on the other side.
+        for post_id in pk_set:
+            related.schedule_refresh(post_id)
+
+
+@receiver(pre_delete, sender=Post)
+def refresh_related_on_delete(sender, instance, **kwargs):
+    """Posts listing a deleted post need a replacement neighbour."""
+    for post_id in RelatedPost.objects.filter(related=instance).values_list('post_id', flat=True):
+        related.schedule_refresh(post_id)
+
+
+@receiver(post_save, sender=Post)
+def touch_categories_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return  # a new post has no categories until they are added
+    if update_fields is not None and not CARD_FIELDS.intersection(update_fields):
+        return
+    touch_categories(post=instance)
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+def touch_categories_on_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Both the categories a post joins and those it leaves list it differently now."""
+    if action in ('post_add', 'post_remove') and pk_set:
+        if reverse:
+            touch_categories(pk=instance.pk)
+        else:
+            touch_categories(pk__in=pk_set)
+    elif action == 'pre_clear':
+        # After the clear there is nothing left to find the categories by.
+        if reverse:
+            touch_categories(pk=instance.pk)
+        else:
+            touch_categories(post=instance)
+
+
+@receiver(pre_delete, sender=Post)
+def touch_categories_on_delete(sender, instance, **kwargs):
+    touch_categories(post=instance)
+
+
+# Static sitemaps (website/sitemap_files.py): flag the section, build_sitemaps rewrites it.
+SITEMAP_SECTIONS = {Post: 'post', Category: 'category', WebStory: 'webstory', Influencer: 'profiles'}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=WebStory)
+@receiver(post_save, sender=Influencer)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=WebStory)
+@receiver(post_delete, sender=Influencer)
+def mark_sitemap_dirty(sender, instance, update_fields=None, **kwargs):
+    # Partial saves of fields that aren't in the sitemap (slug, lastmod) don't count.
+    # Influencer.save() always passes update_fields, with updated_at on every edit.
+    section = SITEMAP_SECTIONS[sender]
+    if update_fields is not None and not {'slug', LASTMOD_FIELDS[section]}.intersection(update_fields):
+        return
+    mark_dirty(section)
+
+
+# Header search typeahead (website/suggest.py): saves touching a suggested
+# field append the entry to the delta log, which every worker overlays.
+SUGGEST_FIELDS = {
+    Influencer: ({'name', 'slug', 'nickname', 'instagram_handle'},
+                 lambda i: suggest.influencer_entry(i.name, i.slug, i.nickname, i.instagram_handle, i.pk)),
+    Post: ({'title', 'slug'}, lambda p: suggest.post_entry(p.title, p.slug, p.pk)),
+    WebStory: ({'title', 'slug'}, lambda s: suggest.webstory_entry(s.title, s.slug, s.pk)),
+}
+SUGGEST_KINDS = {Influencer: 'influencer', Post: 'post', WebStory: 'webstory'}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=WebStory)
+@receiver(post_save, sender=Influencer)
+def update_suggestions_on_save(sender, instance, update_fields=None, **kwargs):
+    fields, entry = SUGGEST_FIELDS[sender]
+    if update_fields is not None and not fields.intersection(update_fields):
+        return  # e.g. a follower refresh or an og_image save
+    suggest.record_upsert(entry(instance))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=WebStory)
+@receiver(post_delete, sender=Influencer)
+def update_suggestions_on_delete(sender, instance, **kwargs):
+    suggest.record_delete(SUGGEST_KINDS[sender], instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=WebStory)
+@receiver(post_save, sender=Influencer)
+@receiver(post_save, sender=UserProfile)
+def refresh_image_meta(sender, instance, update_fields=None, **kwargs):
+    """Measure new or replaced images once, so templates never open the files (website/image_meta.py)."""
+    if update_fields is not None and not set(sender.IMAGE_META_FIELDS).intersection(update_fields):
+        return
+    image_meta.refresh(instance)
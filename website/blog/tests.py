@@ -1,3 +1,361 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from website import file_cleanup
+from website.pagination import encode_cursor
+
+from . import related
+from .models import Category, Post, RelatedPost, Tag
+from .rendering import render_content
+from .search import build_match_query
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), (200, 40, 40)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class FakeWordPress(ThreadingHTTPServer):
+    """A local WordPress REST API: ``/wp-json/wp/v2/posts`` pages and ``/img/<n>.png`` images."""
+
+    per_page = 2
+
+    def __init__(self, posts):
+        super().__init__(('127.0.0.1', 0), FakeWordPressHandler)
+        self.posts = posts
+        self.image = _png()
+        self.base_url = f'http://127.0.0.1:{self.server_port}'
+
+    def post(self, wp_id):
+        return {
+            'id': wp_id,
+            'slug': f'post-{wp_id}',
+            'date_gmt': '2025-01-02T10:00:00',
+            'title': {'rendered': f'Post {wp_id}'},
+            'content': {'rendered': f'<p>Body</p><img src="{self.base_url}/img/{wp_id}.png">'},
+            'excerpt': {'rendered': 'Excerpt'},
+            '_embedded': {
+                'author': [{'id': 1, 'name': 'Author', 'slug': 'author'}],
+                'wp:term': [
+                    [{'id': 10, 'name': 'News', 'slug': 'news', 'taxonomy': 'category'}],
+                    [{'id': 20, 'name': 'Tag', 'slug': 'tag', 'taxonomy': 'post_tag'}],
+                ],
+                'wp:featuredmedia': [{'source_url': f'{self.base_url}/img/featured-{wp_id}.png'}],
+            },
+        }
+
+
+class FakeWordPressHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith('/img/'):
+            return self.reply(200, self.server.image, 'image/png')
+        page = int(parse_qs(url.query)['page'][0])
+        per_page = self.server.per_page
+        total_pages = -(-len(self.server.posts) // per_page)
+        if page > total_pages:
+            return self.reply(400, b'{}', 'application/json')
+        posts = [self.server.post(wp_id) for wp_id in self.server.posts[(page - 1) * per_page:page * per_page]]
+        self.reply(200, json.dumps(posts).encode(), 'application/json', {'X-WP-TotalPages': str(total_pages)})
+
+    def reply(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class WordPressImportTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root, SITEMAP_ROOT=f'{root}/sitemaps', SUGGEST_ROOT=f'{root}/suggest')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.server = FakeWordPress(posts=[101, 102, 103])
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_import_posts_from_rest_api(self):
+        from tools.import_from_wordpress import import_posts
+
+        import_posts(base_url=f'{self.server.base_url}/wp-json/wp/v2', workers=2,
+                     per_page=FakeWordPress.per_page, checkpoint_path=None)
+
+        self.assertEqual(sorted(Post.objects.values_list('wp_id', flat=True)), [101, 102, 103])
+        post = Post.objects.get(wp_id=101)
+        self.assertEqual(post.slug, 'post-101')
+        self.assertTrue(post.featured_image.name.startswith('downloads/'))
+        self.assertIn('/media/downloads/', post.content)
+        self.assertNotIn(self.server.base_url, post.content)
+        self.assertEqual([c.name for c in post.categories.all()], ['News'])
+        self.assertEqual([t.name for t in post.tags.all()], ['Tag'])
+
+        # Importing again updates the same rows.
+        import_posts(base_url=f'{self.server.base_url}/wp-json/wp/v2', workers=2,
+                     per_page=FakeWordPress.per_page, checkpoint_path=None)
+        self.assertEqual(Post.objects.count(), 3)
+
+
+def _raw_cursor(value):
+    """A cursor token for an arbitrary decoded value, as a tampering client would send."""
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+class BlogCursorTests(TestCase):
+    MALFORMED = [
+        'not-base64!', _raw_cursor(['abc', 1]), _raw_cursor([5, 1]), _raw_cursor([[1], 1]),
+        _raw_cursor(['2025-01-01T00:00:00+00:00', 'x']), _raw_cursor(['2025-01-01T00:00:00+00:00', True]),
+        _raw_cursor({'a': 1}), _raw_cursor([None]), _raw_cursor(None),
+    ]
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root, SITEMAP_ROOT=f'{root}/sitemaps',
+                                     SUGGEST_ROOT=f'{root}/suggest', BLOG_POSTS_PER_PAGE=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for wp_id in range(1, 4):
+            Post.objects.create(wp_id=wp_id, title=f'Post {wp_id}', slug=f'post-{wp_id}', content='<p>Body</p>')
+
+    def test_malformed_cursor_restarts_blog_list(self):
+        for cursor in self.MALFORMED:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(reverse('blog_list'), {'cursor': cursor}).status_code, 200)
+
+    def test_malformed_cursor_is_400_on_load_more(self):
+        for cursor in self.MALFORMED:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('blog_list_more'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+    def test_cursor_pages_through_every_post(self):
+        response = self.client.get(reverse('blog_list_more')).json()
+        cursor = response['next_cursor']
+        self.assertTrue(cursor)
+        response = self.client.get(reverse('blog_list_more'), {'cursor': cursor}).json()
+        self.assertTrue(response['success'])
+        self.assertIsNone(response['next_cursor'])
+        first = Post.objects.order_by('-published_date', '-id').first()
+        self.assertEqual(
+            self.client.get(reverse('blog_list_more'),
+                            {'cursor': encode_cursor(first.published_date, first.pk)}).status_code,
+            200,
+        )
+
+
+class RenderContentTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.root, MEDIA_URL='/media/')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def save_image(self, name, width, color):
+        os.makedirs(os.path.join(self.root, os.path.dirname(name)), exist_ok=True)
+        Image.new('RGB', (width, width // 2), color).save(os.path.join(self.root, name))
+
+    def test_strips_only_lazy_load_cruft(self):
+        rendered = render_content(
+            '<figure class="wp-block-image alignleft size-large">'
+            '<img class="wp-image-7 is-style-rounded" data-lazy-src="/media/a.png" data-id="7" src="data:,">'
+            '<noscript><img src="/media/a.png"></noscript></figure>'
+            '<p class="has-text-align-center">Hi</p><noscript><p>Enable JavaScript</p></noscript>'
+        )
+        self.assertIn('class="wp-block-image alignleft"', rendered)
+        self.assertIn('class="is-style-rounded"', rendered)
+        self.assertIn('data-id="7"', rendered)
+        self.assertNotIn('data-lazy-src', rendered)
+        self.assertIn('src="/media/a.png"', rendered)
+        self.assertEqual(rendered.count('<noscript>'), 1)
+        self.assertIn('Enable JavaScript', rendered)
+        self.assertIn('class="has-text-align-center"', rendered)
+
+    def test_replaced_original_gets_new_derivatives(self):
+        self.save_image('uploads/photo.png', 1000, (255, 0, 0))
+        first = render_content('<img src="/media/uploads/photo.png">')
+        self.assertIn('480w', first)
+
+        self.save_image('uploads/photo.png', 900, (0, 0, 255))
+        os.utime(os.path.join(self.root, 'uploads/photo.png'), ns=(1, 1))
+        second = render_content('<img src="/media/uploads/photo.png">')
+        self.assertNotEqual(first, second)
+        derivative = second.split('srcset="/media/')[1].split(' ')[0]
+        with Image.open(os.path.join(self.root, derivative)) as img:
+            self.assertEqual(img.getpixel((0, 0)), (0, 0, 255))
+
+
+class OgImageTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.root, SITEMAP_ROOT=f'{self.root}/sitemaps',
+                                     SUGGEST_ROOT=f'{self.root}/suggest')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.replace_featured_image((255, 0, 0))
+        self.post = Post.objects.create(wp_id=1, title='Card', slug='card', featured_image='blog_images/f.png')
+
+    def replace_featured_image(self, color, mtime_ns=None):
+        os.makedirs(f'{self.root}/blog_images', exist_ok=True)
+        Image.new('RGB', (400, 300), color).save(f'{self.root}/blog_images/f.png')
+        if mtime_ns:
+            os.utime(f'{self.root}/blog_images/f.png', ns=(mtime_ns, mtime_ns))
+
+    def og_name(self):
+        return Post.objects.values_list('og_image', flat=True).get(pk=self.post.pk)
+
+    def test_new_source_gets_new_card_name_and_old_card_goes(self):
+        self.assertTrue(self.post.generate_og_image())
+        first = self.og_name()
+        self.replace_featured_image((0, 0, 255), mtime_ns=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.post.generate_og_image())
+        file_cleanup.flush()
+        second = self.og_name()
+        self.assertNotEqual(first, second)
+        self.assertTrue(os.path.exists(os.path.join(self.root, second)))
+        self.assertFalse(os.path.exists(os.path.join(self.root, first)))
+
+    def test_command_renames_changed_cards(self):
+        call_command('generate_og_images', workers=1, stdout=io.StringIO())
+        first = self.og_name()
+        self.replace_featured_image((0, 0, 255), mtime_ns=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('generate_og_images', workers=1, stdout=io.StringIO())
+        file_cleanup.flush()
+        second = self.og_name()
+        self.assertNotEqual(first, second)
+        self.assertFalse(os.path.exists(os.path.join(self.root, first)))
+
+
+class SearchRouteTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root, SITEMAP_ROOT=f'{root}/sitemaps', SUGGEST_ROOT=f'{root}/suggest')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_old_search_url_redirects(self):
+        response = self.client.get('/search/', {'q': 'news'})
+        self.assertRedirects(response, f"{reverse('blog_search')}?q=news", status_code=301)
+        self.assertEqual(self.client.get(reverse('blog_search'), {'q': 'news'}).status_code, 200)
+
+    def test_post_slugged_search_is_reachable(self):
+        Post.objects.create(wp_id=1, title='Search', slug='search', content='<p>Body</p>')
+        response = self.client.get('/search/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['post'].slug, 'search')
+
+    def test_match_query_quotes_words_and_prefixes_the_last(self):
+        self.assertEqual(build_match_query('bolly OR wood'), '"bolly" "OR" "wood"*')
+        self.assertEqual(build_match_query('  '), '')
+
+
+class RelatedPostsTests(TestCase):
+    """refresh_related() must leave the same lists as a full rebuild_related()."""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root, SITEMAP_ROOT=f'{root}/sitemaps', SUGGEST_ROOT=f'{root}/suggest')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.rng = random.Random(7)
+        self.tags = [Tag.objects.create(wp_id=n, name=f'Tag {n}', slug=f'tag-{n}') for n in range(12)]
+        categories = [Category.objects.create(wp_id=n, name=f'Cat {n}', slug=f'cat-{n}') for n in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = []
+            for n in range(30):
+                post = Post.objects.create(wp_id=n, title=f'Post {n}', slug=f'post-{n}', content='<p>x</p>')
+                post.tags.set(self.rng.sample(self.tags, self.rng.randint(1, 4)))
+                post.categories.set([self.rng.choice(categories)])
+                self.posts.append(post)
+        related.rebuild_related()
+
+    def lists(self):
+        lists = {}
+        for post_id, related_id, score in RelatedPost.objects.order_by('post_id', 'rank').values_list(
+                'post_id', 'related_id', 'score'):
+            lists.setdefault(post_id, []).append((related_id, round(score, 9)))
+        return lists
+
+    def test_incremental_matches_full_rebuild(self):
+        # Moving a tag from one post to another keeps every term's document
+        # frequency, so the IDF weights (and the full rebuild) are comparable.
+        for _ in range(10):
+            giver, taker = self.rng.sample(self.posts, 2)
+            movable = set(giver.tags.all()) - set(taker.tags.all())
+            if not movable:
+                continue
+            tag = self.rng.choice(sorted(movable, key=lambda t: t.pk))
+            with self.captureOnCommitCallbacks(execute=True):
+                giver.tags.remove(tag)
+                taker.tags.add(tag)
+            incremental = self.lists()
+            related.rebuild_related()
+            self.assertEqual(incremental, self.lists())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root, SITEMAP_ROOT=f'{root}/sitemaps', SUGGEST_ROOT=f'{root}/suggest')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.post = Post.objects.create(wp_id=1, title='Cached', slug='cached', content='<p>Body</p>')
+        self.url = reverse('blog_detail', kwargs={'slug': 'cached'})
+
+    def test_unchanged_post_is_304_without_rendering(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(1):  # the validator query only
+            again = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+    def test_edit_changes_the_validators(self):
+        first = self.client.get(self.url)
+        self.post.title = 'Edited'
+        self.post.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_logged_in_pages_are_not_conditional(self):
+        first = self.client.get(self.url)
+        self.client.force_login(User.objects.create_user('reader'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_unknown_slug_is_still_404(self):
+        self.assertEqual(self.client.get(reverse('blog_detail', kwargs={'slug': 'missing'})).status_code, 404)
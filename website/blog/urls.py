@@ -5,6 +5,8 @@ from . import views # Import views from the current app (blog)
 urlpatterns = [
     path('', views.home_view, name='home'), # This will map to example.com/
     path('blogs/', views.blog_list, name='blog_list'), # This will map to example.com/blogs/
+    path('blogs/more/', views.blog_list_more, name='blog_list_more'), # JSON "load more" for the post grids
+    path('blogs/search/', views.search, name='blog_search'), # Under blogs/, so no post slug can shadow it
     path('<slug:slug>/', views.blog_detail, name='blog_detail'), # This will map to example.com/your-blog-post-slug/
     path('category/<slug:slug>/', views.category_detail, name='category_detail'), # This will map to example.com/category/your-category-slug/
 ]
\ No newline at end of file
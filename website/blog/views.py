@@ -1,7 +1,18 @@
 # blog/views.py
-from django.shortcuts import render, get_object_or_404
+from django.conf import settings
+from django.db.models import Max
+from django.db.models.functions import Substr
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.template.loader import render_to_string
+from . import og
 from .models import Post, Category # Ensure Category is imported
+from .search import search_posts
+from influencer.directory import CARD_FIELDS
 from influencer.models import Influencer
+from website.conditional import conditional_page
+from website.pagination import keyset_page
 
 
 def home_view(request):
@@ -18,58 +29,135 @@ def home_view(request):
         'twitter_description': "Your daily dose of celebrity buzz, lifestyle tips and health updates at Bavaal.",
         'twitter_image': None,  # Same as above
     }
-    influencers = Influencer.objects.order_by('-created_at')[:4]
+    influencers = Influencer.objects.only(*CARD_FIELDS).order_by('-created_at')[:4]
 
     return render(request, 'home.html', {'seo': seo, 'influencers': influencers,})
     
+def _post_cards(queryset):
+    """Restrict a Post queryset to the columns the list cards render."""
+    # Cards only need the start of the body as an excerpt fallback, so the
+    # full content TextField never leaves the database.
+    return (
+        queryset.select_related('author')
+        .only('id', 'title', 'slug', 'excerpt', 'featured_image', 'image_meta', 'published_date', 'author__name')
+        .annotate(content_head=Substr('content', 1, 600))
+    )
+
+
+def _post_page(request, queryset):
+    """Return (posts, next_cursor) for the page named by ?cursor=."""
+    per_page = getattr(settings, 'BLOG_POSTS_PER_PAGE', 12)
+    try:
+        return keyset_page(_post_cards(queryset), 'published_date', request.GET.get('cursor'), per_page)
+    except ValueError:
+        # A stale or mangled cursor just restarts from the newest posts.
+        return keyset_page(_post_cards(queryset), 'published_date', None, per_page)
+
+
 def blog_list(request):
     selected_category_slug = request.GET.get('category') # Get the category slug from the URL
+    posts = Post.objects.all()
 
     if selected_category_slug:
         # If a category is selected, filter posts by that category
-        try:
-            category = Category.objects.get(slug=selected_category_slug)
-            # Removed 'published=True' filter as it does not exist in your Post model
-            posts = Post.objects.filter(categories=category).order_by('-published_date')
-        except Category.DoesNotExist:
+        category = Category.objects.filter(slug=selected_category_slug).first()
+        if category:
+            posts = posts.filter(categories=category)
+        else:
             # Handle case where category slug is invalid (e.g., show all posts)
-            posts = Post.objects.all().order_by('-published_date')
             selected_category_slug = None # Clear selected slug if category not found
-            # You might consider adding a Django messages framework notification here for the user
-    else:
-        # If no category is selected, show all posts
-        # Removed 'published=True' filter
-        posts = Post.objects.all().order_by('-published_date')
+
+    posts, next_cursor = _post_page(request, posts)
 
     # Fetch all categories to display in the filter section of the template
     categories = Category.objects.all().order_by('name')
 
     context = {
         'posts': posts,
+        'next_cursor': next_cursor,
         'categories': categories,
         'selected_category_slug': selected_category_slug,
     }
     return render(request, 'blog/blog_list.html', context)
 
+def blog_list_more(request):
+    """JSON "load more" endpoint for the infinite-scroll post grids."""
+    posts = Post.objects.all()
+    category_slug = request.GET.get('category')
+    if category_slug:
+        posts = posts.filter(categories__slug=category_slug)
+
+    try:
+        page, next_cursor = keyset_page(
+            _post_cards(posts), 'published_date', request.GET.get('cursor'),
+            getattr(settings, 'BLOG_POSTS_PER_PAGE', 12),
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    html = render_to_string('blog/_post_cards.html', {'posts': page}, request)
+    return JsonResponse({'success': True, 'html': html, 'next_cursor': next_cursor})
+
+def _post_state(request, slug):
+    # The related-posts block is on the page too: its list (related_updated_at)
+    # and the cards in it (their modified_date) count as changes.
+    row = (
+        Post.objects.filter(slug=slug)
+        .annotate(related_modified=Max('related_links__related__modified_date'))
+        .values_list('id', 'modified_date', 'related_updated_at', 'related_modified')
+        .first()
+    )
+    return (max(filter(None, row[1:])), row) if row else None
+
+
+@conditional_page(_post_state)
 def blog_detail(request, slug):
     # Retrieve the post based on slug
-    post = get_object_or_404(Post, slug=slug)
+    # The raw content is only needed if the post hasn't been rendered yet.
+    post = Post.objects.defer('content').filter(slug=slug).first()
+    if post is None:
+        if slug == 'search':
+            # Search used to live at /search/; keep old links working while no post claims the slug.
+            query = request.GET.urlencode()
+            return redirect(f"{reverse('blog_search')}?{query}" if query else reverse('blog_search'), permanent=True)
+        raise Http404('No Post matches the given query.')
     canonical_url = request.build_absolute_uri(post.get_absolute_url())
+    share_image = post.og_image or post.featured_image
     seo = {
         'canonical_url' : canonical_url,
         'og_type' :  'article',
         'twitter_card' : 'summary_large_image',
-        'image': request.build_absolute_uri(post.featured_image.url) if post.featured_image else None,
+        'image': request.build_absolute_uri(share_image.url) if share_image else None,
+        'image_width': og.OG_SIZE[0] if post.og_image else None,
+        'image_height': og.OG_SIZE[1] if post.og_image else None,
 
     }
+    # Neighbours are precomputed (blog/related.py): one indexed join, no scoring here.
+    related_posts = _post_cards(Post.objects.filter(related_to__post=post).order_by('related_to__rank'))
     # If you only want to show posts where published_date is in the past,
     # you would add a filter here, e.g., published_date__lte=timezone.now()
-    return render(request, 'blog/blog_detail.html', {'post': post, 'seo': seo})
+    return render(request, 'blog/blog_detail.html', {'post': post, 'seo': seo, 'related_posts': related_posts})
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = search_posts(query) if query else []
+    seo = {
+        'meta_title': f"Search results for {query} - Bavaal" if query else "Search - Bavaal",
+        'canonical_url': request.build_absolute_uri(request.path),
+    }
+    return render(request, 'blog/search_results.html', {'query': query, 'results': results, 'seo': seo})
+
+def _category_state(request, slug):
+    row = Category.objects.filter(slug=slug).values_list('id', 'updated_at').first()
+    return (row[1], row) if row else None
 
+
+@conditional_page(_category_state)
 def category_detail(request, slug):
     category = get_object_or_404(Category, slug=slug)
-    posts = Post.objects.filter(categories=category).order_by('-published_date')
+    posts, next_cursor = _post_page(request, Post.objects.filter(categories=category))
     return render(request, 'blog/category_detail.html', {
         'category': category,
-        'posts': posts
+        'posts': posts,
+        'next_cursor': next_cursor,
     })
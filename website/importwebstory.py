@@ -3,6 +3,7 @@ import xml.etree.ElementTree as ET
 
 # Your existing import function
 from tools.import_webstory import import_webstory_from_url  # adjust the path to where your function is
+from website.downloader import Downloader
 
 SITEMAP_URL = "https://bavaal.com/web-story-sitemap.xml"
 
@@ -18,10 +19,12 @@ def import_all_webstories_from_sitemap():
     urls = [loc.text for loc in root.findall(".//ns:loc", namespaces)]
     print(f"Found {len(urls)} web stories")
 
+    # One downloader for the whole run: shared connection pool and URL memo.
+    downloader = Downloader()
     for url in urls:
         print(f"Importing: {url}")
         try:
-            import_webstory_from_url(url)
+            import_webstory_from_url(url, downloader)
         except Exception as e:
             print(f"❌ Failed to import {url}: {e}")
 
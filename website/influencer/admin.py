@@ -1,6 +1,6 @@
 # admin.py
 from django.contrib import admin
-from .models import Influencer, InfluencerImage, InfluencerVideo, InfluencerTweet, InfluencerCommunityPost
+from .models import Influencer, InfluencerImage, InfluencerVideo, InfluencerTweet, InfluencerCommunityPost, SocialFetchState
 
 class BaseAdmin(admin.ModelAdmin):
     def get_list_display(self, request):
@@ -34,3 +34,7 @@ class InfluencerTweetAdmin(BaseAdmin):
 class InfluencerCommunityPostAdmin(BaseAdmin):
     pass
 
+
+@admin.register(SocialFetchState)
+class SocialFetchStateAdmin(BaseAdmin):
+    list_filter = ('platform', 'last_status')
@@ -0,0 +1,175 @@
+# influencer/community.py
+"""
+Loading of influencer community threads.
+
+The profile page shows top-level posts with their replies nested below.
+Rendering that straight off the ORM (post.replies.all, post.user.userprofile
+per node) costs several queries per message, so the template is handed a
+prebuilt tree instead (each post's replies in ``post.thread_replies``).
+
+Threads are keyset-paginated on (last_activity_at, id) like the blog lists,
+so threads with new replies come back to the top: thread_page() returns one
+page of top-level posts, each with a short preview of its newest replies;
+reply_page() pages through the rest of a thread's replies, on (updated_at,
+id), behind its "show more replies" button.
+
+Like and reply counts are read from the denormalized columns on the post;
+toggle_like() and reconcile_counters() are the two ways they are written
+besides the reply receivers in models.py.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+
+from website.pagination import encode_cursor, keyset_page
+
+from .models import InfluencerCommunityPost, touch_influencer
+
+Like = InfluencerCommunityPost.likes.through
+
+# Newest activity first, id as the tie-breaker (matches Meta.ordering).
+THREAD_ORDERING = ('-updated_at', '-id')
+
+
+def approved_posts(influencer):
+    return (
+        InfluencerCommunityPost.objects
+        .filter(influencer=influencer, is_approved=True)
+        .select_related('user__userprofile')
+    )
+
+
+def build_tree(posts):
+    """
+    Attach every post to its parent's ``thread_replies`` list and return the
+    top-level posts. ``posts`` must already be in display order; replies
+    whose parent isn't in ``posts`` (unapproved or outside the page) are dropped.
+    """
+    by_id = {post.id: post for post in posts}
+    roots = []
+    for post in posts:
+        post.thread_replies = []
+    for post in posts:
+        if post.parent_id is None:
+            roots.append(post)
+        elif post.parent_id in by_id:
+            by_id[post.parent_id].thread_replies.append(post)
+    return roots
+
+
+def thread_page(influencer, cursor=None, per_page=None):
+    """
+    Return ``(threads, next_cursor)`` for one page of top-level posts.
+
+    Each thread carries ``thread_replies`` (the newest COMMUNITY_REPLY_PREVIEW
+    replies), ``more_replies`` (how many are hidden) and ``replies_cursor``
+    (where reply_page() continues). Raises ValueError on a bad cursor.
+    """
+    per_page = per_page or settings.COMMUNITY_THREADS_PER_PAGE
+    roots_qs = approved_posts(influencer).filter(parent__isnull=True)
+    roots, next_cursor = keyset_page(roots_qs, 'last_activity_at', cursor, per_page)
+    if not roots:
+        return [], None
+
+    # The newest few replies of every thread on the page, in one query.
+    preview = list(
+        approved_posts(influencer)
+        .filter(parent_id__in=[root.id for root in roots])
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=F('parent_id'),
+            order_by=[F('updated_at').desc(), F('id').desc()],
+        ))
+        .filter(position__lte=settings.COMMUNITY_REPLY_PREVIEW)
+        .order_by(*THREAD_ORDERING)
+    )
+    threads = build_tree(roots + preview)
+    for thread in threads:
+        shown = thread.thread_replies
+        thread.more_replies = thread.reply_count - len(shown)
+        thread.replies_cursor = encode_cursor(shown[-1].updated_at, shown[-1].id) if shown else ''
+    return threads, next_cursor
+
+
+def reply_page(parent, cursor=None, per_page=None):
+    """
+    Return ``(replies, next_cursor, remaining)`` for one page of a thread's
+    approved replies, newest first. Raises ValueError on a bad cursor.
+    """
+    per_page = per_page or settings.COMMUNITY_REPLIES_PER_PAGE
+    replies_qs = approved_posts(parent.influencer_id).filter(parent=parent)
+    replies, next_cursor = keyset_page(replies_qs, 'updated_at', cursor, per_page)
+    remaining = 0
+    if next_cursor:
+        last = replies[-1]
+        remaining = replies_qs.filter(
+            Q(updated_at__lt=last.updated_at) | Q(updated_at=last.updated_at, id__lt=last.id)
+        ).count()
+    return replies, next_cursor, remaining
+
+
+def mark_liked(posts, user):
+    """Set ``post.liked`` on each post (and its previewed replies) for ``user``, in one query."""
+    posts = [p for post in posts for p in (post, *getattr(post, 'thread_replies', ()))]
+    liked = set()
+    if user.is_authenticated and posts:
+        liked = set(
+            Like.objects.filter(user=user, influencercommunitypost_id__in=[p.id for p in posts])
+            .values_list('influencercommunitypost_id', flat=True)
+        )
+    for post in posts:
+        post.liked = post.id in liked
+
+
+def toggle_like(post, user):
+    """Like or unlike ``post`` for ``user``. Returns ``(liked, like_count)``."""
+    counter = InfluencerCommunityPost.objects.filter(pk=post.pk)
+    with transaction.atomic():
+        removed, _ = Like.objects.filter(influencercommunitypost=post, user=user).delete()
+        if removed:
+            liked = False
+            counter.update(like_count=F('like_count') - 1)
+        else:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(influencercommunitypost=post, user=user)
+            except IntegrityError:
+                liked = True  # a concurrent request already liked it and counted it
+            else:
+                liked = True
+                counter.update(like_count=F('like_count') + 1)
+        like_count = counter.values_list('like_count', flat=True).get()
+    touch_influencer(post.influencer_id)
+    return liked, like_count
+
+
+def reconcile_counters(queryset=None):
+    """
+    Recompute like_count, reply_count and last_activity_at from the source
+    rows for ``queryset`` (default: every post) with set-based UPDATEs.
+    Returns the number of posts whose counters had drifted.
+    """
+    queryset = InfluencerCommunityPost.objects.all() if queryset is None else queryset
+    likes = (
+        Like.objects.filter(influencercommunitypost_id=OuterRef('pk'))
+        .order_by().values('influencercommunitypost_id').annotate(n=Count('id')).values('n')
+    )
+    approved_replies = InfluencerCommunityPost.objects.filter(parent_id=OuterRef('pk'), is_approved=True).order_by()
+    replies = approved_replies.values('parent_id').annotate(n=Count('id')).values('n')
+    latest_reply = approved_replies.values('parent_id').annotate(latest=Max('updated_at')).values('latest')
+
+    actual = {
+        'like_count': Coalesce(Subquery(likes), 0),
+        'reply_count': Coalesce(Subquery(replies), 0),
+        'last_activity_at': Greatest('updated_at', Coalesce(Subquery(latest_reply), 'updated_at')),
+    }
+    drifted = queryset.annotate(**{f'actual_{name}': expr for name, expr in actual.items()}).exclude(
+        like_count=F('actual_like_count'),
+        reply_count=F('actual_reply_count'),
+        last_activity_at=F('actual_last_activity_at'),
+    )
+    ids = list(drifted.values_list('id', flat=True))
+    for start in range(0, len(ids), 500):
+        InfluencerCommunityPost.objects.filter(id__in=ids[start:start + 500]).update(**actual)
+    return len(ids)
@@ -0,0 +1,181 @@
+# influencer/directory.py
+"""
+The /influencers/ directory: filtering, sorting and facet counts.
+
+Listing pages are keyset-paginated (website/pagination.py) on the sort
+column and only load the columns the cards render.
+
+Facet counts are never computed per request. build_facets() runs two
+GROUP BY queries, over (follower band, profession) and over (category,
+follower band, profession), and caches the resulting cells. facet_counts()
+then sums the matching cells in memory for whatever filters are active, so
+every facet shows how many results picking it would give. Receivers in
+models.py call invalidate_facets() only when a change can move a count:
+new or deleted influencers, category changes, or a profession or follower
+band change. A routine follower refresh within the same band leaves the
+cache alone.
+"""
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+
+from website.pagination import keyset_page
+
+from .models import Category, Influencer
+
+# (key, label, lower bound inclusive, upper bound exclusive)
+FOLLOWER_BANDS = (
+    ('nano', 'Under 10K', None, 10_000),
+    ('micro', '10K – 100K', 10_000, 100_000),
+    ('macro', '100K – 1M', 100_000, 1_000_000),
+    ('mega', '1M+', 1_000_000, None),
+)
+BANDS = {key: (low, high) for key, _, low, high in FOLLOWER_BANDS}
+
+SORTS = {
+    'followers': 'instagram_followers',
+    'recent': 'created_at',
+}
+DEFAULT_SORT = 'followers'
+
+# Everything the directory cards render (plus the sort columns for the cursor).
+CARD_FIELDS = ('id', 'name', 'slug', 'profile_pic', 'image_meta', 'profession', 'instagram_followers', 'created_at')
+
+PROFESSION_FACET_LIMIT = 20
+FACETS_CACHE_KEY = 'influencer:directory:facets'
+
+
+def follower_band(followers):
+    """The FOLLOWER_BANDS key for a follower count ('' when unknown)."""
+    if followers is None:
+        return ''
+    for key, _, low, high in FOLLOWER_BANDS:
+        if (low is None or followers >= low) and (high is None or followers < high):
+            return key
+    return ''
+
+
+def _band_case(field):
+    whens = [When(**{f'{field}__isnull': True}, then=Value(''))]
+    for key, _, _, high in FOLLOWER_BANDS:
+        if high is not None:
+            whens.append(When(**{f'{field}__lt': high}, then=Value(key)))
+    return Case(*whens, default=Value(FOLLOWER_BANDS[-1][0]))
+
+
+def parse_filters(params):
+    """Validated filters from a query dict; unknown values are dropped rather than erroring."""
+    category = params.get('category', '')
+    band = params.get('band', '')
+    sort = params.get('sort', '')
+    return {
+        'category': int(category) if category.isdigit() else None,
+        'band': band if band in BANDS else '',
+        'profession': params.get('profession', ''),
+        'sort': sort if sort in SORTS else DEFAULT_SORT,
+    }
+
+
+def filtered_influencers(filters):
+    influencers = Influencer.objects.all()
+    if filters['category']:
+        influencers = influencers.filter(categories=filters['category'])
+    if filters['band']:
+        low, high = BANDS[filters['band']]
+        if low is not None:
+            influencers = influencers.filter(instagram_followers__gte=low)
+        if high is not None:
+            influencers = influencers.filter(instagram_followers__lt=high)
+    if filters['profession']:
+        influencers = influencers.filter(profession=filters['profession'])
+    return influencers
+
+
+def directory_page(filters, cursor=None, per_page=None):
+    """Return ``(influencers, next_cursor)``. Raises ValueError on a bad cursor."""
+    per_page = per_page or settings.INFLUENCER_DIRECTORY_PER_PAGE
+    influencers = filtered_influencers(filters).only(*CARD_FIELDS)
+    return keyset_page(influencers, SORTS[filters['sort']], cursor, per_page)
+
+
+def build_facets():
+    """The cached facet cells: ``{'cells': [(category_id or None, band, profession, count)], 'categories': [...]}``."""
+    cells = [
+        (None, band, profession or '', n)
+        for band, profession, n in (
+            Influencer.objects.order_by()
+            .annotate(band=_band_case('instagram_followers'))
+            .values('band', 'profession').annotate(n=Count('id'))
+            .values_list('band', 'profession', 'n')
+        )
+    ]
+    Membership = Influencer.categories.through
+    cells += [
+        (category_id, band, profession or '', n)
+        for category_id, band, profession, n in (
+            Membership.objects.order_by()
+            .annotate(band=_band_case('influencer__instagram_followers'), profession=F('influencer__profession'))
+            .values('category_id', 'band', 'profession').annotate(n=Count('influencer_id'))
+            .values_list('category_id', 'band', 'profession', 'n')
+        )
+    ]
+    categories = list(Category.objects.order_by('name').values_list('id', 'name'))
+    return {'cells': cells, 'categories': categories}
+
+
+def get_facets():
+    facets = cache.get(FACETS_CACHE_KEY)
+    if facets is None:
+        facets = build_facets()
+        cache.set(FACETS_CACHE_KEY, facets, settings.INFLUENCER_FACETS_CACHE_SECONDS)
+    return facets
+
+
+def invalidate_facets():
+    """Drop the cached facet cells once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(FACETS_CACHE_KEY))
+
+
+def facet_counts(filters, facets=None):
+    """
+    Counts for every facet value under the other active filters, summed
+    from the cached cells: ``{'total', 'categories', 'bands', 'professions'}``.
+    """
+    facets = facets or get_facets()
+    category, band, profession = filters['category'], filters['band'], filters['profession']
+    by_category, by_band, by_profession = Counter(), Counter(), Counter()
+    total = 0
+    for cell_category, cell_band, cell_profession, n in facets['cells']:
+        band_ok = not band or cell_band == band
+        profession_ok = not profession or cell_profession == profession
+        if cell_category is not None:
+            if band_ok and profession_ok:
+                by_category[cell_category] += n
+        if cell_category != category:
+            continue  # the all-influencer cells, or the picked category's cells
+        if profession_ok:
+            by_band[cell_band] += n
+        if band_ok:
+            by_profession[cell_profession] += n
+            if profession_ok:
+                total += n
+    by_profession.pop('', None)
+    return {
+        'total': total,
+        'categories': [(pk, name, by_category[pk]) for pk, name in facets['categories'] if by_category[pk]],
+        'bands': [(key, label, by_band[key]) for key, label, _, _ in FOLLOWER_BANDS if by_band[key]],
+        'professions': by_profession.most_common(PROFESSION_FACET_LIMIT),
+    }
+
+
+def filter_url(base_url, filters, **changes):
+    """``base_url`` with the current filters, as changed by ``changes``, in the query string."""
+    params = {**filters, **changes}
+    if params.get('sort') == DEFAULT_SORT:
+        params['sort'] = ''
+    query = urlencode({key: value for key, value in params.items() if value})
+    return f'{base_url}?{query}' if query else base_url
@@ -77,16 +77,14 @@ class InfluencerProfileForm(forms.ModelForm):
     def clean_slug(self):
         """
         Custom validation for the slug field.
-        Ensures uniqueness for user-provided slugs, or auto-generates if empty.
+        Ensures uniqueness for user-provided slugs; a blank one is generated on save.
         """
         slug = self.cleaned_data.get('slug')
-        name = self.cleaned_data.get('name')
 
-        if not slug and name:
-            slug = slugify(name)
-        elif slug:
-            slug = slugify(slug)
-        
+        if not slug:
+            return ''  # auto-generated from the name on save, with a free suffix if needed
+        slug = slugify(slug)
+
         if slug:
             qs = Influencer.objects.filter(slug=slug)
             if self.instance and self.instance.pk:
@@ -102,15 +100,8 @@ class InfluencerProfileForm(forms.ModelForm):
         Overrides save to ensure slug is generated if not provided and valid.
         """
         instance = super().save(commit=False)
-        
-        if not instance.slug and instance.name:
-            instance.slug = slugify(instance.name)
-            base_slug = instance.slug
-            num = 1
-            while Influencer.objects.filter(slug=instance.slug).exists() and \
-                  (self.instance is None or Influencer.objects.get(pk=self.instance.pk).slug != instance.slug):
-                instance.slug = f"{base_slug}-{num}"
-                num += 1
+
+        # A blank slug is allocated by Influencer.save() (website/slugs.py).
 
         if commit:
             instance.save()
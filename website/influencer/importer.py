@@ -0,0 +1,473 @@
+# influencer/importer.py
+"""
+Bulk import of influencer profiles from YAML (``manage.py populate_influencer``).
+
+The file is a list of influencer mappings, keyed by ``name``:
+
+    - name: Hande Erçel
+      instagram_followers: 31800000
+      categories: [Actors, Fashion]
+      images:
+        - image_url: https://...
+          caption: ...
+      videos: [...]
+      tweets: [...]
+
+Records are read and written in chunks of ``chunk_size``. iter_chunks()
+cuts the top-level list at its ``- `` lines and parses one chunk at a time
+with the C loader, so the whole file never sits in memory. Each chunk:
+
+* resolves its existing influencers, categories and media URLs with one
+  query each;
+* plans the changes in memory: new influencers get free slugs from a set of
+  taken slugs loaded once per run;
+* writes them in one transaction with bulk_create/bulk_update. The SQLite
+  write lock is held for the length of a few bulk statements per chunk.
+
+If the chunk's transaction fails with an IntegrityError, it is imported
+again one record at a time, each in its own transaction, so a bad record
+fails alone. A record that renames an existing influencer to a slug that
+is already taken keeps its old slug, with a warning.
+
+The semantics are those of the old per-record importer. An existing
+influencer gets every field in its record, and its categories are replaced
+when the record lists any. Media are added if their URL isn't there yet,
+within each model's per-influencer cap. Bulk writes skip save() and the
+post_save receivers, so apply() does their work itself: directory facets,
+search suggestions, sitemaps, follower history and image metadata. With
+``dry_run`` nothing is written and the plan is reported as a diff.
+"""
+import yaml
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from website import image_meta, suggest
+from website.sitemap_files import mark_dirty
+from website.slugs import first_free, slug_base
+
+from .directory import invalidate_facets
+from .models import Category, Influencer, InfluencerImage, InfluencerTweet, InfluencerVideo
+from .stats import record_samples
+
+YAMLLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# YAML key -> (model, URL field)
+MEDIA = {
+    'images': (InfluencerImage, 'image_url'),
+    'videos': (InfluencerVideo, 'video_url'),
+    'tweets': (InfluencerTweet, 'tweet_url'),
+}
+RELATED_KEYS = {'categories', *MEDIA}
+IGNORED_KEYS = {'age'}  # a computed property, not a stored field
+# Columns the importer never sets
+PROTECTED_FIELDS = {'id', 'uuid', 'created_at', 'updated_at', 'image_meta', 'recent_views'}
+SUGGEST_FIELDS = {'name', 'slug', 'nickname', 'instagram_handle'}
+LONG_TEXT = 40  # dry-run diffs show longer values as "changed"
+
+
+class ImportFormatError(Exception):
+    """The file isn't a YAML list of influencer mappings."""
+
+
+def iter_chunks(lines, chunk_size):
+    """
+    Parse a YAML list ``chunk_size`` items at a time. Items start at a ``-``
+    in the first column, which nothing nested inside an item can have. The
+    one limit is that an anchor can't be referenced from another chunk.
+    """
+    def load(text):
+        try:
+            data = yaml.load(text, Loader=YAMLLoader)
+        except yaml.YAMLError as e:
+            raise ImportFormatError(f"Error parsing YAML file: {e}") from e
+        if data is None:
+            return []
+        if not isinstance(data, list):
+            raise ImportFormatError("YAML file must contain a list of influencer dictionaries.")
+        return data
+
+    buffer, items = [], 0
+    for line in lines:
+        if line.startswith('-') and line[1:2] in (' ', '\t', '\n', '\r', ''):
+            if items == chunk_size:
+                yield load(''.join(buffer))
+                buffer, items = [], 0
+            items += 1
+        buffer.append(line)
+    data = load(''.join(buffer))
+    if data:
+        yield data
+
+
+def _infer_source(url):
+    if 'youtube.com' in url or 'youtu.be' in url:
+        return 'youtube'
+    if 'instagram.com' in url:
+        return 'instagram'
+    if 'tiktok.com' in url:
+        return 'tiktok'
+    return ''
+
+
+FIELDS = {
+    field.name: field for field in Influencer._meta.concrete_fields
+    if field.name not in PROTECTED_FIELDS
+}
+
+
+class Record:
+    """One influencer mapping, validated: model field values, categories and media."""
+
+    def __init__(self, data, warn):
+        self.name = str(data['name'])
+        self.fields = {}
+        for key, value in data.items():
+            if key in RELATED_KEYS or key in IGNORED_KEYS:
+                continue
+            field = FIELDS.get(key)
+            if field is None:
+                warn(f"{self.name}: unknown field '{key}' ignored.")
+                continue
+            try:
+                self.fields[key] = field.to_python(value)
+            except ValidationError:
+                # Unparseable dates and numbers are dropped, as before.
+                warn(f"{self.name}: invalid {key} {value!r}; {'cleared' if field.null else 'ignored'}.")
+                if field.null:
+                    self.fields[key] = None
+        self.categories = [str(name) for name in data.get('categories') or []]
+        self.media = {key: [] for key in MEDIA}
+        for key, (model, url_field) in MEDIA.items():
+            for i, item in enumerate(data.get(key) or []):
+                url = (item or {}).get(url_field)
+                if not url:
+                    warn(f"{self.name}: {key} entry without '{url_field}' skipped.")
+                    continue
+                values = {
+                    'caption': item.get('caption', ''),
+                    'display_order': item.get('display_order', i + 1),
+                }
+                if model is InfluencerVideo:
+                    values['source'] = item.get('source') or _infer_source(url)
+                    if not values['source']:
+                        warn(f"{self.name}: could not determine the source of video {url}; skipped.")
+                        continue
+                self.media[key].append((url, values))
+
+
+class Importer:
+    """
+    ``Importer(log).run(lines)`` imports a YAML list; ``log(level, message)``
+    receives 'info'/'warning'/'error'/'diff' lines. Returns the counts.
+    """
+
+    def __init__(self, log, chunk_size=500, dry_run=False):
+        self.log = log
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'media': 0, 'skipped': 0, 'failed': 0}
+        self._taken_slugs = None
+        self._dry_run_created = set()
+
+    def warn(self, message):
+        self.log('warning', message)
+
+    @property
+    def taken_slugs(self):
+        if self._taken_slugs is None:
+            self._taken_slugs = set(Influencer.objects.values_list('slug', flat=True))
+        return self._taken_slugs
+
+    def run(self, lines):
+        for number, chunk in enumerate(iter_chunks(lines, self.chunk_size), 1):
+            self.import_chunk(chunk, number)
+        return self.stats
+
+    def import_chunk(self, chunk, number):
+        records = {}
+        for data in chunk:
+            if not isinstance(data, dict) or not data.get('name'):
+                self.log('error', "Skipping entry: 'name' is a required field for an influencer.")
+                self.stats['skipped'] += 1
+                continue
+            record = Record(data, self.warn)
+            if record.name in records:
+                # The same influencer twice in a chunk: like two get_or_creates, the later wins.
+                earlier = records[record.name]
+                record.fields = {**earlier.fields, **record.fields}
+                record.categories = record.categories or earlier.categories
+                for key in MEDIA:
+                    record.media[key] = earlier.media[key] + record.media[key]
+            records[record.name] = record
+        if not records:
+            return
+
+        if self.dry_run:
+            self.report(self.plan(records))
+            return
+        try:
+            with transaction.atomic():
+                self.apply(self.plan(records))
+        except IntegrityError as e:
+            # Most likely a slug taken by another writer since the set was
+            # loaded, or one bad record: reload the set and import the chunk
+            # record by record, so only the offending records fail.
+            self._taken_slugs = None
+            self.warn(f"Chunk {number} rolled back ({e}); importing its records one at a time.")
+            self.import_each(records)
+            return
+        self.log('info', f"Chunk {number}: {len(records)} records imported.")
+
+    def import_each(self, records):
+        for name, record in records.items():
+            try:
+                with transaction.atomic():
+                    self.apply(self.plan({name: record}))
+            except IntegrityError as e:
+                self.log('error', f"{name}: failed and rolled back: {e}")
+                self.stats['failed'] += 1
+
+    # ---- planning (reads only) ----
+
+    def plan(self, records):
+        existing = {}
+        for influencer in Influencer.objects.filter(name__in=list(records)).order_by('pk'):
+            existing.setdefault(influencer.name, influencer)  # get_or_create took the first
+
+        plan = {'create': [], 'update': [], 'unchanged': [], 'records': records}
+        for name, record in records.items():
+            influencer = existing.get(name)
+            if influencer is None:
+                influencer = Influencer(**record.fields)
+                influencer.name = name
+                if not influencer.slug or influencer.slug in self.taken_slugs:
+                    influencer.slug = first_free(slug_base(Influencer, name), self.taken_slugs)
+                self.taken_slugs.add(influencer.slug)
+                plan['create'].append(influencer)
+                continue
+            changes = {
+                field: (getattr(influencer, field), value)
+                for field, value in record.fields.items()
+                if getattr(influencer, field) != value
+            }
+            if 'slug' in changes:
+                slug = changes['slug'][1]
+                if not slug or slug in self.taken_slugs:
+                    self.warn(f"{name}: slug {slug!r} is empty or taken; keeping '{influencer.slug}'.")
+                    del changes['slug']
+                else:
+                    self.taken_slugs.add(slug)
+            plan['update' if changes else 'unchanged'].append((influencer, changes))
+        return plan
+
+    def _category_ids(self, names, create):
+        categories = Category.objects.in_bulk(names, field_name='name')
+        missing = [name for name in names if name not in categories]
+        if missing and create:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            categories = Category.objects.in_bulk(names, field_name='name')
+        return {name: category.pk for name, category in categories.items()}
+
+    # ---- writing ----
+
+    def apply(self, plan):
+        now = timezone.now()
+        records = plan['records']
+
+        created = Influencer.objects.bulk_create(plan['create'], batch_size=200)
+        if any(influencer.pk is None for influencer in created):
+            # Backends that can't return ids from a bulk insert: slugs are unique.
+            pks = dict(Influencer.objects.filter(slug__in=[i.slug for i in created]).values_list('slug', 'pk'))
+            for influencer in created:
+                influencer.pk = pks[influencer.slug]
+
+        updated = []
+        update_fields = set()
+        for influencer, changes in plan['update']:
+            for field, (_old, new) in changes.items():
+                setattr(influencer, field, new)
+            influencer.updated_at = now
+            update_fields.update(changes)
+            updated.append(influencer)
+        if updated:
+            Influencer.objects.bulk_update(updated, sorted(update_fields | {'updated_at'}), batch_size=100)
+
+        influencers = {i.name: i for i in created}
+        influencers.update({i.name: i for i, _ in plan['update'] + plan['unchanged']})
+        touched = self._apply_categories(records, influencers)
+        media_added = self._apply_media(records, influencers)
+        touched |= set(media_added)
+        # Profiles whose related rows changed are stale too (cf. touch_influencer).
+        stale = touched - {i.pk for i in created} - {i.pk for i in updated}
+        if stale:
+            Influencer.objects.filter(pk__in=stale).update(updated_at=now)
+
+        self._after_write(created, plan['update'], bool(touched))
+        self.stats['created'] += len(created)
+        self.stats['updated'] += len(updated)
+        self.stats['unchanged'] += len(plan['unchanged'])
+        self.stats['media'] += sum(media_added.values())
+
+    def _apply_categories(self, records, influencers):
+        """Replace the categories of the records that list any; returns the influencer ids changed."""
+        wanted = {
+            influencers[name].pk: set(record.categories)
+            for name, record in records.items() if record.categories
+        }
+        if not wanted:
+            return set()
+        ids = self._category_ids(sorted(set().union(*wanted.values())), create=True)
+        wanted = {pk: {ids[name] for name in names} for pk, names in wanted.items()}
+
+        Membership = Influencer.categories.through
+        current = {}
+        stale_rows, changed = [], set()
+        for row_id, influencer_id, category_id in Membership.objects.filter(
+                influencer_id__in=wanted).values_list('id', 'influencer_id', 'category_id'):
+            if category_id in wanted[influencer_id]:
+                current.setdefault(influencer_id, set()).add(category_id)
+            else:
+                stale_rows.append(row_id)
+                changed.add(influencer_id)
+        new_rows = [
+            Membership(influencer_id=influencer_id, category_id=category_id)
+            for influencer_id, category_ids in wanted.items()
+            for category_id in category_ids - current.get(influencer_id, set())
+        ]
+        if stale_rows:
+            Membership.objects.filter(pk__in=stale_rows).delete()
+        Membership.objects.bulk_create(new_rows, ignore_conflicts=True)
+        return changed | {row.influencer_id for row in new_rows}
+
+    def _media_plan(self, records, influencers):
+        """``{key: [(influencer, url, values)]}`` of the media to add, and the ones skipped."""
+        plan, skipped = {}, []
+        for key, (model, url_field) in MEDIA.items():
+            pks = {influencers[name].pk for name, record in records.items() if record.media[key]} - {None}
+            existing = set(
+                model.objects.filter(influencer_id__in=pks).values_list('influencer_id', url_field)
+            ) if pks else set()
+            counts = dict(
+                model.objects.filter(influencer_id__in=pks).order_by()
+                .values_list('influencer_id').annotate(n=Count('id'))
+            ) if pks else {}
+            plan[key] = []
+            for name, record in records.items():
+                influencer = influencers[name]
+                # Dry runs plan for influencers that have no id yet.
+                owner = influencer.pk if influencer.pk is not None else ('new', name)
+                count = counts.get(owner, 0)
+                for url, values in record.media[key]:
+                    if (owner, url) in existing:
+                        continue
+                    if count >= model.MAX_PER_INFLUENCER:
+                        skipped.append(f"{name}: more than {model.MAX_PER_INFLUENCER} {key}; {url} skipped.")
+                        continue
+                    existing.add((owner, url))
+                    count += 1
+                    plan[key].append((influencer, url, values))
+        return plan, skipped
+
+    def _apply_media(self, records, influencers):
+        """Add the new media; returns ``{influencer_id: rows added}``."""
+        plan, skipped = self._media_plan(records, influencers)
+        for message in skipped:
+            self.warn(message)
+        added = {}
+        for key, (model, url_field) in MEDIA.items():
+            rows = [model(influencer_id=influencer.pk, **{url_field: url}, **values) for influencer, url, values in plan[key]]
+            model.objects.bulk_create(rows, batch_size=500)
+            for row in rows:
+                added[row.influencer_id] = added.get(row.influencer_id, 0) + 1
+        return added
+
+    def _after_write(self, created, updates, related_changed):
+        """What the skipped post_save/m2m_changed receivers would have done."""
+        if not (created or updates or related_changed):
+            return
+        invalidate_facets()
+        mark_dirty('profiles')
+
+        samples, entries = [], []
+        for influencer in created:
+            entries.append(suggest.influencer_entry(
+                influencer.name, influencer.slug, influencer.nickname, influencer.instagram_handle, influencer.pk))
+            if influencer.instagram_followers is not None:
+                samples.append((influencer.pk, 'instagram', 'followers', influencer.instagram_followers))
+            if influencer.profile_pic or influencer.poster_pic:
+                image_meta.refresh(influencer)
+        for influencer, changes in updates:
+            if SUGGEST_FIELDS.intersection(changes):
+                entries.append(suggest.influencer_entry(
+                    influencer.name, influencer.slug, influencer.nickname, influencer.instagram_handle, influencer.pk))
+            if 'instagram_followers' in changes and influencer.instagram_followers is not None:
+                samples.append((influencer.pk, 'instagram', 'followers', influencer.instagram_followers))
+            if set(Influencer.IMAGE_META_FIELDS).intersection(changes):
+                image_meta.refresh(influencer)
+        suggest.record_upsert(*entries)
+        record_samples(samples, touch=False)
+
+    # ---- dry run ----
+
+    def _show(self, value):
+        text = '' if value is None else str(value)
+        return 'changed' if len(text) > LONG_TEXT or '\n' in text else repr(value)
+
+    def report(self, plan):
+        records = plan['records']
+        influencers = {i.name: i for i in plan['create']}
+        influencers.update({i.name: i for i, _ in plan['update'] + plan['unchanged']})
+        media_plan, skipped = self._media_plan(records, influencers)
+        new_media = {}
+        for key, rows in media_plan.items():
+            for influencer, _, _ in rows:
+                new_media.setdefault(influencer.name, []).append(key)
+
+        category_names = sorted({name for record in records.values() for name in record.categories})
+        category_ids = self._category_ids(category_names, create=False)
+        current = {}
+        existing_pks = [i.pk for i, _ in plan['update'] + plan['unchanged']]
+        for influencer_id, name in Influencer.categories.through.objects.filter(
+                influencer_id__in=existing_pks).values_list('influencer_id', 'category__name'):
+            current.setdefault(influencer_id, set()).add(name)
+        for name in category_names:
+            if name not in category_ids:
+                self.log('diff', f"+ category {name}")
+
+        def extras(influencer, record):
+            parts = []
+            if record.categories:
+                old = current.get(influencer.pk, set())
+                new = set(record.categories)
+                if new != old:
+                    parts.append('categories ' + ' '.join(
+                        [f'+{n}' for n in sorted(new - old)] + [f'-{n}' for n in sorted(old - new)]))
+            media = new_media.get(influencer.name, [])
+            for key in MEDIA:
+                if media.count(key):
+                    parts.append(f"+{media.count(key)} {key}")
+            return parts
+
+        for influencer in plan['create']:
+            record = records[influencer.name]
+            again = influencer.name in self._dry_run_created
+            self._dry_run_created.add(influencer.name)
+            parts = extras(influencer, record)
+            label = "(created earlier in this file)" if again else f"(new, slug {influencer.slug})"
+            self.log('diff', f"+ {influencer.name} {label}" + (": " + ", ".join(parts) if parts else ""))
+            self.stats['created'] += 1
+            self.stats['media'] += len(new_media.get(influencer.name, []))
+        for influencer, changes in plan['update'] + plan['unchanged']:
+            record = records[influencer.name]
+            parts = [f"{field} {self._show(old)} -> {self._show(new)}" for field, (old, new) in changes.items()]
+            parts += extras(influencer, record)
+            if parts:
+                self.log('diff', f"~ {influencer.name}: " + "; ".join(parts))
+                self.stats['updated'] += 1
+            else:
+                self.stats['unchanged'] += 1
+            self.stats['media'] += len(new_media.get(influencer.name, []))
+        for message in skipped:
+            self.warn(message)
@@ -0,0 +1,199 @@
+# influencer/live.py
+"""
+Live community posts over Server-Sent Events.
+
+When a community post is created, a receiver in models.py calls
+publish_post() after commit. It renders the post's HTML fragment once and
+hands it to the broker on the influencer's channel. Every open
+``community_live`` stream for that influencer (an async view served by the
+ASGI app, see website/asgi.py) receives it and writes it out as an SSE event.
+
+An idle stream is one coroutine waiting on a small queue, so one ASGI
+process holds thousands of them. The sync gunicorn workers only publish.
+
+The broker is pluggable (COMMUNITY_LIVE_BROKER):
+
+* InMemoryBroker fans out inside one process. It is used for tests.
+* RedisBroker publishes through Redis. Posts are created by the WSGI
+  workers and streamed by a separate ASGI process, so the site needs it.
+  Each process keeps one Redis subscription and fans out locally.
+
+Streams are off unless COMMUNITY_LIVE_ENABLED is set and the broker reaches
+other processes (live_enabled()). A stream served by a sync gunicorn worker
+would hold that worker until its timeout, so without the ASGI service and
+Redis the profile page doesn't open one and the view answers 204.
+"""
+import abc
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'community:'
+
+
+def channel_for(influencer_id):
+    return f'{CHANNEL_PREFIX}{influencer_id}'
+
+
+class Broker(abc.ABC):
+    """
+    Pub/sub interface. ``publish()`` is synchronous and may be called from
+    any thread; ``subscribe()`` is an async context manager yielding an
+    object whose ``await get()`` returns the next message (a str).
+    """
+    # True if messages only reach subscribers in the publishing process.
+    in_process = False
+
+    @abc.abstractmethod
+    def publish(self, channel, message):
+        """Send ``message`` to every subscriber of ``channel``."""
+
+    @abc.abstractmethod
+    def subscribe(self, channel):
+        """Async context manager: a queue of ``channel``'s messages while it is open."""
+
+    def has_subscribers(self, channel):
+        """False only when nobody can be listening, so publishers may skip rendering."""
+        return True
+
+
+class InMemoryBroker(Broker):
+    """Fan-out to subscribers in this process, each on its own event loop's queue."""
+    in_process = True
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.COMMUNITY_LIVE_QUEUE_SIZE
+        self._subscribers = defaultdict(set)  # channel -> {(loop, queue)}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, message)
+            except RuntimeError:
+                pass  # that subscriber's loop is closed; it unsubscribes itself
+
+    @staticmethod
+    def _put(queue, message):
+        # A client that stops reading loses messages rather than growing memory.
+        with contextlib.suppress(asyncio.QueueFull):
+            queue.put_nowait(message)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(entry)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def has_subscribers(self, channel):
+        with self._lock:
+            return bool(self._subscribers.get(channel))
+
+
+class RedisBroker(InMemoryBroker):
+    """Publish through Redis; one pattern subscription per process feeds the local fan-out."""
+    in_process = False
+
+    def __init__(self, url=None, queue_size=None):
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured('RedisBroker needs the "redis" package.') from exc
+        super().__init__(queue_size)
+        self._client = redis.Redis.from_url(url or settings.COMMUNITY_LIVE_REDIS_URL)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, channel, message):
+        self._client.publish(channel, message)
+
+    def has_subscribers(self, channel):
+        return True  # the listeners are in other processes
+
+    def _deliver(self, event):
+        super().publish(event['channel'].decode(), event['data'].decode())
+
+    def _listen(self):
+        with self._listener_lock:
+            if self._listener is None:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(**{f'{CHANNEL_PREFIX}*': self._deliver})
+                self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        self._listen()
+        async with super().subscribe(channel) as queue:
+            yield queue
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured by COMMUNITY_LIVE_BROKER."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.COMMUNITY_LIVE_BROKER)()
+        return _broker
+
+
+def live_enabled():
+    """Whether profile pages open a live stream (see the module docstring)."""
+    return settings.COMMUNITY_LIVE_ENABLED and not import_string(settings.COMMUNITY_LIVE_BROKER).in_process
+
+
+def publish_post(post):
+    """Push a new community post's fragment to everyone watching its influencer."""
+    channel = channel_for(post.influencer_id)
+    try:
+        broker = get_broker()
+        if not broker.has_subscribers(channel):
+            return  # bulk imports in a process with no open streams
+        html = render_to_string('influencer/_community_post.html', {'post': post})
+        message = json.dumps({'id': post.id, 'parent_id': post.parent_id, 'html': html})
+        broker.publish(channel, message)
+    except Exception:
+        # The post is saved either way; live viewers just see it on their next load.
+        logger.exception('Could not publish community post %s', post.pk)
+
+
+def format_event(message, event='post'):
+    """Frame one message as an SSE event (its data is single-line JSON)."""
+    event_id = json.loads(message).get('id', '')
+    return f'id: {event_id}\nevent: {event}\ndata: {message}\n\n'
+
+
+async def event_stream(influencer_id):
+    """Yield SSE frames for an influencer's new posts until the client goes away."""
+    keepalive = settings.COMMUNITY_LIVE_KEEPALIVE_SECONDS
+    yield f'retry: {settings.COMMUNITY_LIVE_RETRY_MS}\n\n'
+    async with get_broker().subscribe(channel_for(influencer_id)) as queue:
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'  # keeps proxies from closing an idle stream
+                continue
+            yield format_event(message)
@@ -1,17 +1,75 @@
 # management/commands/populate_users.py
-from django.core.management.base import BaseCommand
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.core.files.base import ContentFile
+from django.db import transaction
 from faker import Faker
 from faker.providers import person
 import random
 import requests
+import time
 from io import BytesIO
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
 import os
 
 # Import your UserProfile model
 from accounts.models import UserProfile
+from website import image_meta
+
+PASSWORD = '!@#$qwertyu'
+INDIAN_SURNAMES = ['Singh', 'Kumar', 'Patel', 'Sharma', 'Gupta', 'Khan', 'Verma', 'Reddy', 'Mehta', 'Choudhury', 'Yadav']
+
+# --load-test avatars: one file per (initial, palette colour), shared by every
+# user with that initial and colour, so 100k users need a few hundred images.
+AVATAR_DIR = 'userprofile_pics/loadtest'
+AVATAR_PALETTE = [(100 + (i * 37) % 101, 100 + (i * 61) % 101, 100 + (i * 83) % 101) for i in range(16)]
+
+
+def draw_avatar(initial, bg_color, width=200, height=200):
+    """PNG bytes of ``initial`` in white on a ``bg_color`` square."""
+    image = Image.new('RGB', (width, height), bg_color)
+    draw = ImageDraw.Draw(image)
+
+    # Try to use a font, fallback to default if not available
+    try:
+        font = ImageFont.truetype("arial.ttf", 80)
+    except:
+        font = ImageFont.load_default()
+
+    # Calculate text position (center)
+    try:
+        # For newer PIL versions
+        bbox = draw.textbbox((0, 0), initial, font=font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+    except:
+        # For older PIL versions
+        text_width, text_height = draw.textsize(initial, font=font)
+
+    position = ((width - text_width) // 2, (height - text_height) // 2)
+    draw.text(position, initial, fill=(255, 255, 255), font=font)
+
+    img_byte_arr = BytesIO()
+    image.save(img_byte_arr, format='PNG')
+    return img_byte_arr.getvalue()
+
+
+def _avatar_job(job):
+    """Worker entry point: draw one shared avatar. Returns (name, meta, error)."""
+    name, initial, bg_color = job
+    try:
+        data = draw_avatar(initial, bg_color)
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return name, {'name': name, **image_meta.read_meta(BytesIO(data))}, None
+    except Exception as e:
+        return name, None, str(e)
+
 
 class Command(BaseCommand):
     help = 'Populate database with fake users with country-specific names and profile pictures'
@@ -30,6 +88,13 @@ class Command(BaseCommand):
             choices=['india', 'us', 'uk', 'germany', 'france', 'japan', 'china', 'brazil', 'mexico', 'russia'],
             help='Country for name generation (india, us, uk, germany, france, japan, china, brazil, mexico, russia)'
         )
+        parser.add_argument(
+            '--load-test',
+            action='store_true',
+            help='Seed many users fast and offline: one password hash, shared generated avatars, bulk inserts'
+        )
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Avatar worker processes (--load-test)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users per transaction (--load-test)')
 
     def get_faker_for_country(self, country):
         """Get Faker instance with appropriate locale for the country"""
@@ -53,47 +118,32 @@ class Command(BaseCommand):
             # Fallback to English if locale not available
             return Faker('en_US')
 
+    def fake_name(self, fake, country):
+        """A country-specific (first_name, last_name)"""
+        first_name = fake.first_name()
+        last_name = fake.last_name()
+        if country == 'india':
+            # Indian names might have common surnames
+            if random.random() > 0.7:  # 30% chance to use Indian surname
+                last_name = random.choice(INDIAN_SURNAMES)
+        return first_name, last_name
+
+    def email_domain(self, country):
+        if country == 'india':
+            return '@stackvalue.in'
+        elif country == 'japan':
+            return '@stackvalue.jp'
+        elif country == 'china':
+            return '@stackvalue.cn'
+        return '@example.com'
+
     def generate_fake_image(self, first_name, email, width=200, height=200):
         """Generate a simple colored image with the user's initial"""
-        from PIL import Image, ImageDraw, ImageFont
-        import random
-        
         try:
             # Create a random background color
             bg_color = (random.randint(100, 200), random.randint(100, 200), random.randint(100, 200))
-            
-            # Create image
-            image = Image.new('RGB', (width, height), bg_color)
-            draw = ImageDraw.Draw(image)
-            
-            # Try to use a font, fallback to default if not available
-            try:
-                font = ImageFont.truetype("arial.ttf", 80)
-            except:
-                font = ImageFont.load_default()
-            
-            # Add user initial
             initial = first_name[0].upper() if first_name else email[0].upper()
-            
-            # Calculate text position (center)
-            try:
-                # For newer PIL versions
-                bbox = draw.textbbox((0, 0), initial, font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-            except:
-                # For older PIL versions
-                text_width, text_height = draw.textsize(initial, font=font)
-            
-            position = ((width - text_width) // 2, (height - text_height) // 2)
-            draw.text(position, initial, fill=(255, 255, 255), font=font)
-            
-            # Save to bytes
-            img_byte_arr = BytesIO()
-            image.save(img_byte_arr, format='PNG')
-            img_byte_arr.seek(0)
-            
-            return img_byte_arr, None
+            return BytesIO(draw_avatar(initial, bg_color, width, height)), None
         except Exception as e:
             return None, f"Image generation failed: {e}"
 
@@ -125,7 +175,6 @@ class Command(BaseCommand):
             
             # Small delay between attempts
             if attempt < max_attempts:
-                import time
                 time.sleep(0.3)
         
         return None, None, max_attempts
@@ -133,10 +182,16 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         num_users = options['num_users']
         country = options['country'].lower()
+        self.verbosity = options['verbosity']
         max_image_attempts = 5
         
         # Get country-specific faker
         fake = self.get_faker_for_country(country)
+
+        if options['load_test']:
+            if options['workers'] < 1 or options['batch_size'] < 1:
+                raise CommandError("--workers and --batch-size must be at least 1.")
+            return self.load_test(fake, country, num_users, options)
         
         self.stdout.write(self.style.SUCCESS(f"Creating {num_users} users with {country.upper()} names..."))
         
@@ -146,28 +201,9 @@ class Command(BaseCommand):
         while users_created < num_users:
             total_attempts += 1
             
-            # Generate country-specific name
-            if country == 'india':
-                # Indian names often have specific patterns
-                first_name = fake.first_name()
-                last_name = fake.last_name()
-                # Indian names might have common surnames
-                indian_surnames = ['Singh', 'Kumar', 'Patel', 'Sharma', 'Gupta', 'Khan', 'Verma', 'Reddy', 'Mehta', 'Choudhury', 'Yadav']
-                if random.random() > 0.7:  # 30% chance to use Indian surname
-                    last_name = random.choice(indian_surnames)
-            else:
-                first_name = fake.first_name()
-                last_name = fake.last_name()
-            
-            # Generate email based on country
-            if country == 'india':
-                email_domain = random.choice(['@stackvalue.in'])
-            elif country == 'japan':
-                email_domain = random.choice(['@stackvalue.jp'])
-            elif country == 'china':
-                email_domain = random.choice(['@stackvalue.cn'])
-            else:
-                email_domain = '@example.com'
+            # Generate country-specific name and email
+            first_name, last_name = self.fake_name(fake, country)
+            email_domain = self.email_domain(country)
             
             base_email = f"{first_name.lower()}.{last_name.lower()}"
             email = f"{base_email}{email_domain}"
@@ -193,7 +229,7 @@ class Command(BaseCommand):
                 user = User.objects.create_user(
                     username=email,
                     email=email,
-                    password='!@#$qwertyu',
+                    password=PASSWORD,
                     first_name=first_name,
                     last_name=last_name
                 )
@@ -229,6 +265,85 @@ class Command(BaseCommand):
             for user in sample_users:
                 self.stdout.write(f"  {user.first_name} {user.last_name} - {user.email} ✅")
 
+    def load_test(self, fake, country, num_users, options):
+        """
+        Seed ``num_users`` users for benchmarks without a request or a query
+        per user: the password is hashed once, emails are reserved in memory,
+        the few distinct avatars are drawn in a process pool (with their
+        image_meta) and rows are written with bulk_create, one transaction
+        per --batch-size users.
+        """
+        started = time.monotonic()
+        password = make_password(PASSWORD)  # One PBKDF2 run; every user shares the hash.
+        email_domain = self.email_domain(country)
+
+        # username is the email, so both columns are reserved.
+        taken = set(User.objects.values_list('email', flat=True))
+        taken.update(User.objects.values_list('username', flat=True))
+        next_suffix = {}
+
+        people = []
+        avatar_jobs = {}
+        for _ in range(num_users):
+            first_name, last_name = self.fake_name(fake, country)
+            base_email = f"{first_name.lower()}.{last_name.lower()}"
+            email = f"{base_email}{email_domain}"
+            counter = next_suffix.get(base_email, 1)
+            while email in taken:
+                email = f"{base_email}{counter}{email_domain}"
+                counter += 1
+            next_suffix[base_email] = counter
+            taken.add(email)
+
+            initial = first_name[0].upper() if first_name else email[0].upper()
+            colour = random.randrange(len(AVATAR_PALETTE))
+            avatar = f"{AVATAR_DIR}/{ord(initial):x}_{colour}.png"
+            avatar_jobs.setdefault(avatar, (avatar, initial, AVATAR_PALETTE[colour]))
+            people.append((first_name, last_name, email, avatar))
+
+        metas = {}
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            chunksize = max(1, len(avatar_jobs) // (options['workers'] * 4))
+            for name, meta, error in pool.map(_avatar_job, avatar_jobs.values(), chunksize=chunksize):
+                if error:
+                    self.stdout.write(self.style.ERROR(f"❌ Avatar {name}: {error}"))
+                    continue
+                metas[name] = meta
+        self.stdout.write(f"{len(metas)} shared avatar(s) drawn for {len(people)} users.")
+
+        created = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(people), batch_size):
+            batch = people[start:start + batch_size]
+            users = [
+                User(username=email, email=email, password=password, first_name=first_name, last_name=last_name)
+                for first_name, last_name, email, _ in batch
+            ]
+            # bulk_create: no save() or post_save receivers, so image_meta is filled in here.
+            with transaction.atomic():
+                users = User.objects.bulk_create(users)
+                if users and users[0].pk is None:
+                    # Backends that can't return ids from a bulk insert.
+                    ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+                    for user in users:
+                        user.pk = ids[user.username]
+                UserProfile.objects.bulk_create([
+                    UserProfile(
+                        user=user,
+                        profile_picture=avatar if avatar in metas else None,
+                        image_meta={'profile_picture': metas[avatar]} if avatar in metas else {},
+                    )
+                    for user, (_, _, _, avatar) in zip(users, batch)
+                ])
+            created += len(users)
+            if self.verbosity >= 2:
+                self.stdout.write(f"Inserted {created}/{len(people)} users")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n=== {country.upper()} LOAD-TEST USERS CREATED: {created} in {time.monotonic() - started:.1f}s ==="
+        ))
+
+
 # Additional function to create mixed country users
 def create_mixed_country_users(num_users_per_country=5):
     """Create users from multiple countries"""
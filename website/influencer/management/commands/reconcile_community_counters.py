@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from influencer.community import reconcile_counters
+from influencer.models import Influencer, InfluencerCommunityPost
+
+
+class Command(BaseCommand):
+    help = "Recompute community posts' like_count, reply_count and last_activity_at from the source rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--influencer', help='Only this influencer (slug)')
+
+    def handle(self, *args, **options):
+        posts = InfluencerCommunityPost.objects.all()
+        if options['influencer']:
+            if not Influencer.objects.filter(slug=options['influencer']).exists():
+                raise CommandError(f"Influencer not found: {options['influencer']}")
+            posts = posts.filter(influencer__slug=options['influencer'])
+
+        fixed = reconcile_counters(posts)
+        self.stdout.write(self.style.SUCCESS(f'✅ Reconciled counters: {fixed} post(s) corrected.'))
@@ -0,0 +1,81 @@
+# influencer/management/commands/refresh_worker.py
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from influencer.refresh import decay_views, flush_views, next_jobs, sync_states
+from influencer.scraping import PLATFORMS, RateLimiter, run
+
+
+class Command(BaseCommand):
+    help = (
+        "Keep influencer social stats fresh: repeatedly scrape the due profiles with the highest "
+        "staleness x traffic priority, within a requests-per-minute budget (see influencer/refresh.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--per-minute", type=int, default=None,
+            help="Scrape requests per minute across all platforms (default REFRESH_REQUESTS_PER_MINUTE).",
+        )
+        parser.add_argument(
+            "--platform", action="append", choices=PLATFORMS,
+            help="Limit to this platform (repeatable). Default: all.",
+        )
+        parser.add_argument("--once", action="store_true", help="Run one round and exit (for cron).")
+        parser.add_argument(
+            "--idle-seconds", type=int, default=60,
+            help="How long to sleep when nothing is due.",
+        )
+
+    def handle(self, *args, **opts):
+        per_minute = opts["per_minute"] or settings.REFRESH_REQUESTS_PER_MINUTE
+        platforms = tuple(opts["platform"] or PLATFORMS)
+        self.verbosity = opts["verbosity"]
+        # One limiter for the whole run, so the budget holds across rounds.
+        budget = RateLimiter(per_minute)
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+
+        while not self.stopping:
+            # Views recorded in this process (the web workers flush their own).
+            flush_views()
+            if decay_views():
+                self.stdout.write("Halved recent profile views.")
+            created, deleted = sync_states(platforms)
+            if created or deleted:
+                self.stdout.write(f"Fetch states: {created} added, {deleted} removed.")
+
+            # About a minute of budget per round; the queue is re-ranked between rounds.
+            jobs = next_jobs(per_minute, platforms)
+            if jobs:
+                started = time.monotonic()
+                stats = run(jobs, budget=budget, log=self.log_job)
+                self.stdout.write(
+                    f"Refreshed {stats['ok']} profiles, {stats['failed']} failed "
+                    f"({time.monotonic() - started:.0f}s)."
+                )
+            if opts["once"]:
+                break
+            if not jobs:
+                self.sleep(opts["idle_seconds"])
+
+        self.stdout.write(self.style.SUCCESS("Refresh worker stopped."))
+
+    def stop(self, signum, frame):
+        """SIGTERM: finish the current round, then exit."""
+        self.stopping = True
+
+    def sleep(self, seconds):
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(1, deadline - time.monotonic()))
+
+    def log_job(self, job, error):
+        if error:
+            self.stderr.write(f"[{job['platform']}] influencer {job['influencer_id']}: {error}")
+        elif self.verbosity >= 2:
+            self.stdout.write(f"[{job['platform']}] influencer {job['influencer_id']}: ok")
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from influencer.community import reconcile_counters
 from influencer.models import Influencer, InfluencerCommunityPost
 from django.utils import timezone
 from datetime import timedelta
@@ -79,6 +80,9 @@ class Command(BaseCommand):
             # Cascade to replies
             update_replies(post, post_time)
 
+        # Thread order follows last_activity_at, which the rewritten timestamps invalidate.
+        reconcile_counters(posts)
+
         self.stdout.write(
             self.style.SUCCESS(
                 f"Updated {posts.count()} posts (including nested replies) for influencer '{influencer.name}' ({slug})"
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0008_alter_influencercommunitypost_options'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='influencer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0009_alter_influencer_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='influencercommunitypost',
+            index=models.Index(fields=['influencer', 'parent', 'updated_at', 'id'], name='influencer_post_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:12
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('influencer', 'InfluencerCommunityPost')
+    Like = Post.likes.through
+    likes = (
+        Like.objects.filter(influencercommunitypost_id=OuterRef('pk'))
+        .order_by().values('influencercommunitypost_id').annotate(n=Count('id')).values('n')
+    )
+    approved_replies = Post.objects.filter(parent_id=OuterRef('pk'), is_approved=True).order_by()
+    Post.objects.update(
+        like_count=Coalesce(Subquery(likes), 0),
+        reply_count=Coalesce(Subquery(approved_replies.values('parent_id').annotate(n=Count('id')).values('n')), 0),
+        last_activity_at=Greatest('updated_at', Coalesce(
+            Subquery(approved_replies.values('parent_id').annotate(latest=Max('updated_at')).values('latest')),
+            'updated_at',
+        )),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0010_community_thread_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='influencercommunitypost',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='influencercommunitypost',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='influencercommunitypost',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='influencercommunitypost',
+            index=models.Index(fields=['influencer', 'parent', 'last_activity_at', 'id'], name='influencer_post_activity_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    PostNotification = apps.get_model('influencer', 'PostNotification')
+    NotificationCounter = apps.get_model('influencer', 'NotificationCounter')
+    unread = (
+        PostNotification.objects.filter(is_read=False)
+        .order_by().values('user_id').annotate(n=Count('id')).values_list('user_id', 'n')
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread=n) for user_id, n in unread.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0011_community_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postnotification',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='notification_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postnotification',
+            index=models.Index(fields=['user', 'is_read'], name='notification_unread_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
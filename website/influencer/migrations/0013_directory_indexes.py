@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0012_notification_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='influencer',
+            index=models.Index(fields=['instagram_followers', 'id'], name='influencer_followers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='influencer',
+            index=models.Index(fields=['created_at', 'id'], name='influencer_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='influencer',
+            index=models.Index(fields=['profession', 'instagram_followers'], name='influencer_profession_idx'),
+        ),
+    ]
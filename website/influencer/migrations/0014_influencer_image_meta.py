@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0013_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='influencer',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
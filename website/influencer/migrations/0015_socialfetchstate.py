@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0014_influencer_image_meta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SocialFetchState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(choices=[('instagram', 'Instagram'), ('youtube', 'YouTube'), ('twitter', 'Twitter/X')], max_length=20)),
+                ('last_fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('influencer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fetch_states', to='influencer.influencer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('influencer', 'platform'), name='unique_fetch_state_per_platform')],
+            },
+        ),
+    ]
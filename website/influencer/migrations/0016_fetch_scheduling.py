@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0015_socialfetchstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='influencer',
+            name='recent_views',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='socialfetchstate',
+            name='failure_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='socialfetchstate',
+            name='last_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='socialfetchstate',
+            name='last_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='socialfetchstate',
+            name='last_status',
+            field=models.CharField(blank=True, choices=[('ok', 'OK'), ('failed', 'Failed')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='socialfetchstate',
+            name='next_due_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('influencer', '0016_fetch_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SocialGrowth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(choices=[('instagram', 'Instagram'), ('youtube', 'YouTube'), ('twitter', 'Twitter/X')], max_length=20)),
+                ('metric', models.CharField(choices=[('followers', 'Followers'), ('likes', 'Likes'), ('views', 'Views')], max_length=20)),
+                ('value', models.BigIntegerField()),
+                ('sampled_at', models.DateTimeField()),
+                ('growth_7d', models.BigIntegerField(blank=True, null=True)),
+                ('growth_30d', models.BigIntegerField(blank=True, null=True)),
+                ('growth_90d', models.BigIntegerField(blank=True, null=True)),
+                ('growth_30d_pct', models.FloatField(blank=True, null=True)),
+                ('daily', models.JSONField(blank=True, default=list)),
+                ('influencer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='growth', to='influencer.influencer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['platform', 'metric', '-growth_30d'], name='growth_30d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('influencer', 'platform', 'metric'), name='unique_growth_per_metric')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SocialStatMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(choices=[('instagram', 'Instagram'), ('youtube', 'YouTube'), ('twitter', 'Twitter/X')], max_length=20)),
+                ('metric', models.CharField(choices=[('followers', 'Followers'), ('likes', 'Likes'), ('views', 'Views')], max_length=20)),
+                ('month', models.DateField(help_text='First day of the month (UTC)')),
+                ('data', models.BinaryField()),
+                ('influencer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stat_months', to='influencer.influencer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('influencer', 'platform', 'metric', 'month'), name='unique_stat_month')],
+            },
+        ),
+    ]
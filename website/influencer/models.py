@@ -1,16 +1,23 @@
 from django.db import models
 from django.conf import settings
-from django.utils.text import slugify
 from django.urls import reverse
+import copy
 import uuid
 import os # Import the os module
-from django.db.models.signals import post_delete
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 import datetime # Import datetime for age calculation
 from django.core.exceptions import ValidationError # Import ValidationError
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
+from website.file_cleanup import delete_on_commit
+from website.sitemap_files import mark_dirty
+from website.slugs import save_with_unique_slug
+
 
 class Category(models.Model):
     """
@@ -41,6 +48,9 @@ class Influencer(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     profile_pic = models.ImageField(upload_to=profile_pic_upload_path, blank=True, null=True)
     poster_pic = models.ImageField(upload_to=poster_pic_upload_path, blank=True, null=True)
+    # Size, colour and placeholder of both pictures (website/image_meta.py)
+    image_meta = models.JSONField(default=dict, blank=True, editable=False)
+    IMAGE_META_FIELDS = ('profile_pic', 'poster_pic')
 
     # Personal Details
     full_name = models.CharField(max_length=255, blank=True, null=True)
@@ -89,46 +99,87 @@ class Influencer(models.Model):
     categories = models.ManyToManyField(Category, related_name='influencers', blank=True,
                                         help_text="Select categories this influencer specializes in.")
 
+    # Profile page views, halved every REFRESH_VIEW_HALF_LIFE so it tracks
+    # current traffic; weights social refreshes (influencer/refresh.py)
+    recent_views = models.PositiveIntegerField(default=0, editable=False)
+
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Also bumped when the influencer's media or community posts change, so it
+    # doubles as the profile page's Last-Modified.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
-    # Removed _old_profile_pic and _old_poster_pic attributes
-    # and __init__ method as we will fetch the old instance directly in save()
+    class Meta:
+        indexes = [
+            # Keyset pagination of the /influencers/ directory (influencer/directory.py).
+            models.Index(fields=['instagram_followers', 'id'], name='influencer_followers_idx'),
+            models.Index(fields=['created_at', 'id'], name='influencer_recent_idx'),
+            models.Index(fields=['profession', 'instagram_followers'], name='influencer_profession_idx'),
+        ]
+
+    # Stored values of the concrete fields as last loaded or saved
+    # (attname -> value, file fields by name), so save() can tell what
+    # changed without reading the row back.
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_values = instance._current_values()
+        return instance
+
+    def _current_values(self):
+        values = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__:  # deferred fields that were never loaded are skipped
+                value = self.__dict__[field.attname]
+                if isinstance(field, models.FileField):
+                    value = getattr(value, 'name', value) or ''  # NULL and '' both mean no file
+                elif isinstance(field, models.JSONField):
+                    # A copy, or editing image_meta in place would change the snapshot too.
+                    value = copy.deepcopy(value)
+                values[field.attname] = value
+        return values
+
+    def changed_fields(self):
+        """Names of fields changed since the row was loaded or saved, or None if that isn't known."""
+        stored = getattr(self, '_stored_values', None)
+        if stored is None or self._state.adding:
+            return None
+        return [
+            self._meta.get_field(attname).name
+            for attname, value in self._current_values().items()
+            if attname not in stored or stored[attname] != value
+        ]
 
     def save(self, *args, **kwargs):
-        # Handle slug generation if not already set
+        # Handle slug generation if not already set (re-enters save() with the slug)
         if not self.slug:
-            base_slug = slugify(self.name)
-            unique_slug = base_slug
-            num = 1
-            while Influencer.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{num}"
-                num += 1
-            self.slug = unique_slug
-        
+            return save_with_unique_slug(self, self.name, lambda: self.save(*args, **kwargs))
+
+        changed = self.changed_fields()
+        if changed is not None and not args and 'update_fields' not in kwargs and not kwargs.get('force_insert'):
+            # Write only the changed columns; updated_at (auto_now) is always bumped.
+            kwargs['update_fields'] = set(changed) | {'updated_at'}
+
         # --- File Cleanup Logic for Replacements ---
-        if self.pk: # Only if it's an existing object being updated
-            try:
-                # Get the existing instance from the database BEFORE saving the new data
-                # This old_instance still holds references to the old file paths
-                old_instance = Influencer.objects.get(pk=self.pk)
-
-                # Check if profile_pic has changed
-                if old_instance.profile_pic and self.profile_pic.name != old_instance.profile_pic.name:
-                    # Delete the old file using its FieldFile object
-                    old_instance.profile_pic.delete(save=False) # save=False prevents an extra save operation
-
-                # Check if poster_pic has changed
-                if old_instance.poster_pic and self.poster_pic.name != old_instance.poster_pic.name:
-                    # Delete the old file using its FieldFile object
-                    old_instance.poster_pic.delete(save=False)
-
-            except Influencer.DoesNotExist:
-                # This should ideally not happen if self.pk exists, but good for robustness
-                pass
+        # The replaced files are deleted after commit, off the request (website/file_cleanup.py).
+        if changed:
+            for field_name in ('profile_pic', 'poster_pic'):
+                old_name = self._stored_values.get(field_name)
+                if field_name in changed and old_name:
+                    field = self._meta.get_field(field_name)
+                    delete_file_if_exists(field.attr_class(self, field, old_name))
 
         super().save(*args, **kwargs) # Save the current instance with its new (or kept) files
+        self._stored_values = {**getattr(self, '_stored_values', {}), **self._current_values()}
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        refreshed = self._current_values()
+        if fields is not None:
+            attnames = {self._meta.get_field(name).attname for name in fields}
+            refreshed = {attname: value for attname, value in refreshed.items() if attname in attnames}
+        self._stored_values = {**getattr(self, '_stored_values', {}), **refreshed}
 
     @property
     def age(self):
@@ -147,6 +198,8 @@ class Influencer(models.Model):
 # ---- Related Models for Media ---- #
 
 class InfluencerImage(models.Model):
+    MAX_PER_INFLUENCER = 6  # also enforced by the bulk upsert in influencer/scraping.py
+
     influencer = models.ForeignKey(Influencer, on_delete=models.CASCADE, related_name="images")
     image_url = models.URLField(help_text="Direct Instagram image link")
     caption = models.CharField(max_length=255, blank=True, null=True)
@@ -155,8 +208,8 @@ class InfluencerImage(models.Model):
     def save(self, *args, **kwargs):
         # Enforce limit of 6 images per influencer when creating new ones
         if not self.pk: # This is a new object being created
-            if self.influencer.images.count() >= 6:
-                raise ValidationError("An influencer cannot have more than 6 images.")
+            if self.influencer.images.count() >= self.MAX_PER_INFLUENCER:
+                raise ValidationError(f"An influencer cannot have more than {self.MAX_PER_INFLUENCER} images.")
         super().save(*args, **kwargs)
 
 
@@ -165,6 +218,8 @@ class InfluencerImage(models.Model):
 
 
 class InfluencerVideo(models.Model):
+    MAX_PER_INFLUENCER = 3  # also enforced by the bulk upsert in influencer/scraping.py
+
     VIDEO_SOURCE_CHOICES = [
         ('youtube', 'YouTube'),
         ('instagram', 'Instagram Reels'),
@@ -178,8 +233,8 @@ class InfluencerVideo(models.Model):
     def save(self, *args, **kwargs):
         # Enforce limit of 3 videos per influencer when creating new ones
         if not self.pk: # This is a new object being created
-            if self.influencer.videos.count() >= 3:
-                raise ValidationError("An influencer cannot have more than 3 videos.")
+            if self.influencer.videos.count() >= self.MAX_PER_INFLUENCER:
+                raise ValidationError(f"An influencer cannot have more than {self.MAX_PER_INFLUENCER} videos.")
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -187,6 +242,8 @@ class InfluencerVideo(models.Model):
 
 
 class InfluencerTweet(models.Model):
+    MAX_PER_INFLUENCER = 4  # also enforced by the bulk upsert in influencer/scraping.py
+
     influencer = models.ForeignKey(Influencer, on_delete=models.CASCADE, related_name="tweets")
     tweet_url = models.URLField(help_text="Full Twitter/X post link")
     caption = models.CharField(max_length=255, blank=True, null=True)
@@ -195,12 +252,114 @@ class InfluencerTweet(models.Model):
     def save(self, *args, **kwargs):
         # Enforce limit of 4 tweets per influencer when creating new ones
         if not self.pk: # This is a new object being created
-            if self.influencer.tweets.count() >= 4:
-                raise ValidationError("An influencer cannot have more than 4 tweets.")
+            if self.influencer.tweets.count() >= self.MAX_PER_INFLUENCER:
+                raise ValidationError(f"An influencer cannot have more than {self.MAX_PER_INFLUENCER} tweets.")
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Tweet for {self.influencer.name}"
+
+
+class SocialFetchState(models.Model):
+    """
+    When a platform was last scraped for an influencer, how that went, and
+    when it is next due (see influencer/scraping.py and influencer/refresh.py).
+    """
+    PLATFORM_CHOICES = [
+        ('instagram', 'Instagram'),
+        ('youtube', 'YouTube'),
+        ('twitter', 'Twitter/X'),
+    ]
+    STATUS_CHOICES = [
+        ('ok', 'OK'),
+        ('failed', 'Failed'),
+    ]
+    influencer = models.ForeignKey(Influencer, on_delete=models.CASCADE, related_name="fetch_states")
+    platform = models.CharField(max_length=20, choices=PLATFORM_CHOICES)
+    last_fetched_at = models.DateTimeField(null=True, blank=True)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=10, choices=STATUS_CHOICES, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+    # Failures in a row; each one doubles the wait before the next attempt.
+    failure_count = models.PositiveIntegerField(default=0)
+    # Not refreshed again before this (null: due now)
+    next_due_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['influencer', 'platform'], name='unique_fetch_state_per_platform'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_platform_display()} fetch state for influencer {self.influencer_id}"
+
+
+class ViewDecayState(models.Model):
+    """
+    One row: when Influencer.recent_views was last halved (influencer/refresh.py).
+    Kept in the database so every process, cron run and restart shares it.
+    """
+    decayed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Views last halved at {self.decayed_at}"
+
+
+class SocialStatMonth(models.Model):
+    """
+    One month of samples of one metric, packed into a delta-encoded blob
+    (influencer/stats.py). A sample is only stored when the value changed.
+    """
+    METRIC_CHOICES = [
+        ('followers', 'Followers'),
+        ('likes', 'Likes'),
+        ('views', 'Views'),
+    ]
+    influencer = models.ForeignKey(Influencer, on_delete=models.CASCADE, related_name="stat_months")
+    platform = models.CharField(max_length=20, choices=SocialFetchState.PLATFORM_CHOICES)
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    month = models.DateField(help_text="First day of the month (UTC)")
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['influencer', 'platform', 'metric', 'month'], name='unique_stat_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.platform} {self.metric} for influencer {self.influencer_id}, {self.month:%Y-%m}"
+
+
+class SocialGrowth(models.Model):
+    """
+    Precomputed growth of one metric, refreshed whenever a sample is
+    recorded, so profile charts and "fastest growing" lists read one row
+    instead of the samples.
+    """
+    influencer = models.ForeignKey(Influencer, on_delete=models.CASCADE, related_name="growth")
+    platform = models.CharField(max_length=20, choices=SocialFetchState.PLATFORM_CHOICES)
+    metric = models.CharField(max_length=20, choices=SocialStatMonth.METRIC_CHOICES)
+    value = models.BigIntegerField()
+    sampled_at = models.DateTimeField()
+    # Change over the last 7/30/90 days (null: no sample that old yet)
+    growth_7d = models.BigIntegerField(null=True, blank=True)
+    growth_30d = models.BigIntegerField(null=True, blank=True)
+    growth_90d = models.BigIntegerField(null=True, blank=True)
+    growth_30d_pct = models.FloatField(null=True, blank=True)
+    # Value at the end of each of the last 90 days, oldest first (null before the first sample)
+    daily = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['influencer', 'platform', 'metric'], name='unique_growth_per_metric'),
+        ]
+        indexes = [
+            # "Fastest growing" lists (stats.fastest_growing).
+            models.Index(fields=['platform', 'metric', '-growth_30d'], name='growth_30d_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.platform} {self.metric} growth for influencer {self.influencer_id}"
     
 # ------------------------------
 # File Cleanup Signals
@@ -208,11 +367,9 @@ class InfluencerTweet(models.Model):
 
 # This helper is now specifically for FieldFile instances
 def delete_file_if_exists(field_file_instance):
-    """Helper to delete a FieldFile from storage."""
-    # Check if the field_file_instance actually refers to a file that exists
-    # and if its name is not empty (i.e., it's not a dummy file object)
-    if field_file_instance and field_file_instance.name and field_file_instance.storage.exists(field_file_instance.name):
-        field_file_instance.delete(save=False) # delete() method handles the storage interaction
+    """Helper to delete a FieldFile from storage once the transaction commits."""
+    # Skips empty names and files in the shared download store; see website/file_cleanup.py.
+    delete_on_commit(field_file_instance)
 
 
 @receiver(post_delete, sender=Influencer)
@@ -232,8 +389,33 @@ class InfluencerCommunityPost(models.Model):
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
     is_approved = models.BooleanField(default=True)  # for moderation
 
+    # Denormalized counters, kept current with F() updates (see the receivers
+    # below and community.toggle_like) and rebuilt by reconcile_community_counters.
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)  # approved replies only
+    # Latest updated_at of the post and its approved replies; threads sort on it.
+    last_activity_at = models.DateTimeField(editable=False)
+
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Keyset pagination of each thread's replies on (updated_at, id).
+            models.Index(fields=['influencer', 'parent', 'updated_at', 'id'], name='influencer_post_thread_idx'),
+            # Keyset pagination of a profile's threads on (last_activity_at, id).
+            models.Index(fields=['influencer', 'parent', 'last_activity_at', 'id'], name='influencer_post_activity_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored approval so a moderation change can adjust the parent's reply_count.
+        instance._loaded_is_approved = instance.__dict__.get('is_approved')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.last_activity_at is None:
+            self.last_activity_at = self.updated_at
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.user.username} on {self.influencer.name}'
@@ -244,5 +426,198 @@ class PostNotification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # A user's notification list, keyset-paginated on (created_at, id).
+            models.Index(fields=['user', 'created_at', 'id'], name='notification_list_idx'),
+            # "Mark all read" and counter rebuilds touch only the unread rows.
+            models.Index(fields=['user', 'is_read'], name='notification_unread_idx'),
+        ]
+
     def __str__(self):
         return f'Notify {self.user.username} about post {self.post.id}'
+
+
+class NotificationCounter(models.Model):
+    """
+    Per-user unread notification count, so the header badge never counts
+    PostNotification rows. Maintained by the receivers below and
+    notifications.mark_read(); updated_at moves whenever the count does.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.user.username}: {self.unread} unread'
+
+
+# ------------------------------
+# Profile Last-Modified
+# ------------------------------
+
+def touch_influencer(influencer_id):
+    """Bump Influencer.updated_at without a full save (profile conditional GETs key off it)."""
+    if Influencer.objects.filter(pk=influencer_id).update(updated_at=timezone.now()):
+        mark_dirty('profiles')  # the profile's sitemap lastmod moved too
+
+
+@receiver(post_save, sender=InfluencerImage)
+@receiver(post_save, sender=InfluencerVideo)
+@receiver(post_save, sender=InfluencerTweet)
+@receiver(post_save, sender=InfluencerCommunityPost)
+@receiver(post_delete, sender=InfluencerImage)
+@receiver(post_delete, sender=InfluencerVideo)
+@receiver(post_delete, sender=InfluencerTweet)
+@receiver(post_delete, sender=InfluencerCommunityPost)
+def touch_influencer_on_profile_change(sender, instance, **kwargs):
+    """Anything shown on the profile page changing makes the page stale."""
+    touch_influencer(instance.influencer_id)
+
+
+@receiver(m2m_changed, sender=InfluencerCommunityPost.likes.through)
+def touch_influencer_on_like(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        touch_influencer(instance.influencer_id)
+
+
+
+# ------------------------------
+# Community counters
+# ------------------------------
+
+def _count_reply(reply, delta):
+    """Apply an approved-reply count change to the reply's parent, atomically."""
+    changes = {'reply_count': models.F('reply_count') + delta}
+    if delta > 0:
+        changes['last_activity_at'] = Greatest(
+            'last_activity_at', models.Value(reply.updated_at, output_field=models.DateTimeField())
+        )
+    else:
+        # A hidden or deleted reply no longer counts as activity (as in
+        # community.reconcile_counters): fall back to the newest approved one.
+        latest = InfluencerCommunityPost.objects.filter(
+            parent_id=reply.parent_id, is_approved=True).aggregate(latest=models.Max('updated_at'))['latest']
+        changes['last_activity_at'] = models.F('updated_at') if latest is None else Greatest(
+            'updated_at', models.Value(latest, output_field=models.DateTimeField())
+        )
+    InfluencerCommunityPost.objects.filter(pk=reply.parent_id).update(**changes)
+
+
+@receiver(post_save, sender=InfluencerCommunityPost)
+def count_reply_on_save(sender, instance, created, **kwargs):
+    if instance.parent_id is not None:
+        was_approved = False if created else getattr(instance, '_loaded_is_approved', instance.is_approved)
+        if was_approved is not None and instance.is_approved != was_approved:
+            _count_reply(instance, 1 if instance.is_approved else -1)
+    instance._loaded_is_approved = instance.is_approved
+
+
+@receiver(post_delete, sender=InfluencerCommunityPost)
+def count_reply_on_delete(sender, instance, **kwargs):
+    if instance.parent_id is not None and instance.is_approved:
+        _count_reply(instance, -1)
+
+
+# ------------------------------
+# Follower history
+# ------------------------------
+
+@receiver(post_save, sender=Influencer)
+def record_follower_history(sender, instance, created, **kwargs):
+    """Keep a sample of every follower count that is saved, scraped or typed in (see stats.py)."""
+    changed = instance.changed_fields()
+    if instance.instagram_followers is None or not (created or changed is None or 'instagram_followers' in changed):
+        return
+    from .stats import record_samples
+    # This save already moved updated_at, so no touch.
+    record_samples([(instance.pk, 'instagram', 'followers', instance.instagram_followers)], touch=False)
+
+
+# ------------------------------
+# Directory facets
+# ------------------------------
+
+@receiver(post_save, sender=Influencer)
+def invalidate_facets_on_save(sender, instance, created, **kwargs):
+    """Drop the cached facet counts only when this save can move one (see directory.py)."""
+    from .directory import follower_band, invalidate_facets
+    changed = instance.changed_fields()  # still the pre-save diff while post_save runs
+    stored = getattr(instance, '_stored_values', {})
+    if (
+        created or changed is None or 'profession' in changed
+        or follower_band(stored.get('instagram_followers')) != follower_band(instance.instagram_followers)
+    ):
+        invalidate_facets()
+
+
+@receiver(post_delete, sender=Influencer)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_facets_on_change(sender, **kwargs):
+    from .directory import invalidate_facets
+    invalidate_facets()
+
+
+@receiver(m2m_changed, sender=Influencer.categories.through)
+def invalidate_facets_on_categories(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        from .directory import invalidate_facets
+        invalidate_facets()
+
+
+# ------------------------------
+# Live community posts
+# ------------------------------
+
+@receiver(post_save, sender=InfluencerCommunityPost)
+def publish_new_post(sender, instance, created, **kwargs):
+    """Stream new approved posts to open profile pages (see live.py) once committed."""
+    if created and instance.is_approved:
+        from .live import publish_post
+        transaction.on_commit(lambda: publish_post(instance))
+
+
+# ------------------------------
+# Notifications
+# ------------------------------
+
+def notification_cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def bump_unread(user_id, delta=None, value=None):
+    """
+    Add ``delta`` to a user's unread count (or set it to ``value``) with a
+    single UPDATE, and drop the cached copy once the transaction commits.
+    """
+    unread = value if value is not None else Greatest(models.F('unread') + delta, 0)
+    counter = NotificationCounter.objects.filter(user_id=user_id)
+    if not counter.update(unread=unread, updated_at=timezone.now()):
+        try:
+            with transaction.atomic():
+                NotificationCounter.objects.create(user_id=user_id, unread=max(value if value is not None else delta, 0))
+        except IntegrityError:
+            counter.update(unread=unread, updated_at=timezone.now())  # created concurrently
+    transaction.on_commit(lambda: cache.delete(notification_cache_key(user_id)))
+
+
+@receiver(post_save, sender=InfluencerCommunityPost)
+def notify_parent_author(sender, instance, created, **kwargs):
+    """Every new reply notifies the author of the post it answers (not themselves)."""
+    if created and instance.parent_id is not None:
+        parent_user_id = InfluencerCommunityPost.objects.filter(pk=instance.parent_id).values_list('user_id', flat=True).first()
+        if parent_user_id and parent_user_id != instance.user_id:
+            PostNotification.objects.create(post=instance, user_id=parent_user_id)
+
+
+@receiver(post_save, sender=PostNotification)
+def count_notification_on_save(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        bump_unread(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=PostNotification)
+def count_notification_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        bump_unread(instance.user_id, -1)
@@ -0,0 +1,62 @@
+# influencer/notifications.py
+"""
+Reply notifications.
+
+PostNotification rows are created by a receiver in models.py whenever a
+community post gets a reply. Each user's unread count lives in
+NotificationCounter and is cached, so the header badge (polled by every
+logged-in tab) reads the cache and never counts notification rows:
+
+* unread_state() returns ``(unread, updated_at)`` from the cache, falling
+  back to the one-row counter lookup on a miss.
+* notification_page() keyset-paginates a user's notifications on
+  (created_at, id), newest first.
+* mark_read() flips read flags with one UPDATE and adjusts the counter by
+  the number of rows it changed.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from website.pagination import keyset_page
+
+from .models import NotificationCounter, PostNotification, bump_unread, notification_cache_key
+
+
+def unread_state(user_id):
+    """Return ``(unread, updated_at)`` for a user; ``updated_at`` is None before the first notification."""
+    key = notification_cache_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = NotificationCounter.objects.filter(user_id=user_id).values_list('unread', 'updated_at').first()
+        state = row or (0, None)
+        cache.set(key, state, settings.NOTIFICATION_COUNT_CACHE_SECONDS)
+    return state
+
+
+def notification_page(user, cursor=None, per_page=None):
+    """Return ``(notifications, next_cursor)``. Raises ValueError on a bad cursor."""
+    per_page = per_page or settings.NOTIFICATIONS_PER_PAGE
+    notifications = (
+        PostNotification.objects
+        .filter(user=user)
+        .select_related('post__user', 'post__influencer')
+    )
+    return keyset_page(notifications, 'created_at', cursor, per_page)
+
+
+def mark_read(user, ids=None):
+    """
+    Mark the given notification ids (default: all) read for ``user``.
+    Returns the number of notifications that were unread.
+    """
+    unread = PostNotification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    marked = unread.update(is_read=True)
+    if ids is None:
+        # Everything is read now, whatever the counter had drifted to.
+        if marked or unread_state(user.id)[0]:
+            bump_unread(user.id, value=0)
+    elif marked:
+        bump_unread(user.id, -marked)
+    return marked
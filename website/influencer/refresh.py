@@ -0,0 +1,159 @@
+# influencer/refresh.py
+"""
+Which social profiles to refresh next, and the profile traffic that decides it.
+
+Every (influencer, platform) with a handle has a SocialFetchState
+(sync_states). ``manage.py refresh_worker`` takes the states that are due,
+i.e. whose next_due_at has passed or was never set, and scrapes them in order
+of
+
+    priority = staleness x (recent_views + REFRESH_POPULARITY_PRIOR)
+
+where staleness is the time since the last successful fetch, or
+REFRESH_NEVER_FETCHED_AGE if there has been none. A popular profile is
+refreshed soon after it becomes due. A quiet one still gets its turn as it
+ages. Failures push next_due_at back with a doubling delay
+(scraping.retry_delay), so a dead handle doesn't eat the budget.
+
+Profile views are counted in process memory by record_view(). A background
+thread adds them to Influencer.recent_views every REFRESH_VIEW_FLUSH_SECONDS,
+with one UPDATE per distinct count, so a page view costs no write, and the
+rest of the buffer is flushed when the process exits.
+decay_views() halves the counts. The worker calls it every round, and it
+acts at most once per REFRESH_VIEW_HALF_LIFE (the time of the last halving
+is a database row), so recent_views tracks current traffic rather than
+all-time traffic, however often the worker restarts or cron runs it.
+"""
+import atexit
+import heapq
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Influencer, SocialFetchState, ViewDecayState
+from .scraping import HANDLE_FIELDS, JOB_FIELDS, PLATFORMS, make_jobs
+
+logger = logging.getLogger(__name__)
+
+_views = Counter()
+_views_lock = threading.Lock()
+_flusher = None
+
+
+def record_view(influencer_id):
+    """Count one profile page view; the buffer is written out by a background thread."""
+    global _flusher
+    with _views_lock:
+        _views[influencer_id] += 1
+        if _flusher is None:
+            # Started on first use, so each web worker (after any fork) gets its own.
+            _flusher = threading.Thread(target=_flush_periodically, name='view-flush', daemon=True)
+            _flusher.start()
+            atexit.register(flush_views)
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(settings.REFRESH_VIEW_FLUSH_SECONDS)
+        flush_views()
+        # Don't hold a database connection open between flushes.
+        connection.close()
+
+
+def flush_views():
+    """Add the buffered view counts to Influencer.recent_views and empty the buffer."""
+    with _views_lock:
+        pending = dict(_views)
+        _views.clear()
+    if not pending:
+        return
+    by_count = defaultdict(list)
+    for influencer_id, count in pending.items():
+        by_count[count].append(influencer_id)
+    try:
+        for count, influencer_ids in by_count.items():
+            # update(): no save() or receivers, and updated_at (Last-Modified) is left alone.
+            Influencer.objects.filter(pk__in=influencer_ids).update(recent_views=F('recent_views') + count)
+    except DatabaseError:
+        # Dropping a minute of view counts is better than losing the flush thread.
+        logger.warning("Could not record profile views", exc_info=True)
+
+
+def decay_views(force=False):
+    """
+    Halve every influencer's recent_views if REFRESH_VIEW_HALF_LIFE has passed
+    since the last time (the ViewDecayState row). Returns True if it did.
+    The first call only starts the clock.
+    """
+    now = timezone.now()
+    _, created = ViewDecayState.objects.get_or_create(pk=1, defaults={'decayed_at': now})
+    if created and not force:
+        return False
+    due = ViewDecayState.objects.filter(pk=1)
+    if not force:
+        due = due.filter(decayed_at__lte=now - settings.REFRESH_VIEW_HALF_LIFE)
+    with transaction.atomic():
+        # The conditional UPDATE claims the decay, so concurrent workers halve once.
+        if not due.update(decayed_at=now):
+            return False
+        Influencer.objects.filter(recent_views__gt=0).update(recent_views=F('recent_views') / 2)
+    return True
+
+
+def sync_states(platforms=PLATFORMS):
+    """
+    Create a SocialFetchState (due at once) for every influencer handle that
+    lacks one, and drop the states of handles that were removed.
+    Returns ``(created, deleted)``.
+    """
+    handles = set()
+    for row in Influencer.objects.values_list('id', *(HANDLE_FIELDS[platform] for platform in platforms)):
+        for platform, handle in zip(platforms, row[1:]):
+            if handle and handle.strip():
+                handles.add((row[0], platform))
+    existing = {
+        (influencer_id, platform): pk
+        for pk, influencer_id, platform in SocialFetchState.objects.filter(platform__in=platforms)
+        .values_list('pk', 'influencer_id', 'platform')
+    }
+    missing = [
+        SocialFetchState(influencer_id=influencer_id, platform=platform)
+        for influencer_id, platform in handles - existing.keys()
+    ]
+    SocialFetchState.objects.bulk_create(missing, ignore_conflicts=True, batch_size=500)
+    orphaned = [pk for key, pk in existing.items() if key not in handles]
+    if orphaned:
+        SocialFetchState.objects.filter(pk__in=orphaned).delete()
+    return len(missing), len(orphaned)
+
+
+def next_jobs(count, platforms=PLATFORMS, limits=None):
+    """The ``count`` due jobs with the highest priority, highest first (see the module docstring)."""
+    now = timezone.now()
+    never_fetched = settings.REFRESH_NEVER_FETCHED_AGE.total_seconds()
+    prior = settings.REFRESH_POPULARITY_PRIOR
+
+    def priority(row):
+        _, _, last_fetched_at, recent_views = row
+        staleness = (now - last_fetched_at).total_seconds() if last_fetched_at else never_fetched
+        return staleness * (recent_views + prior)
+
+    due = (
+        SocialFetchState.objects.filter(platform__in=platforms)
+        .filter(Q(next_due_at__isnull=True) | Q(next_due_at__lte=now))
+        .values_list('influencer_id', 'platform', 'last_fetched_at', 'influencer__recent_views')
+    )
+    top = heapq.nlargest(count, due.iterator(chunk_size=2000), key=priority)
+
+    influencers = Influencer.objects.only(*JOB_FIELDS).in_bulk({influencer_id for influencer_id, *_ in top})
+    jobs = []
+    for influencer_id, platform, *_ in top:
+        if influencer_id in influencers:
+            jobs += make_jobs([influencers[influencer_id]], [platform], limits)
+    return jobs
@@ -0,0 +1,500 @@
+# influencer/scraping.py
+"""
+Batch scraping of influencer profiles from Instagram, YouTube and Twitter/X.
+
+Network work and database work are kept apart:
+
+* Each platform has its own thread pool and rate limiter (SCRAPE_PLATFORMS).
+  Workers only talk to the network: they scrape one (influencer, platform)
+  job and download a profile picture if one is needed. They return plain
+  data and never touch the database.
+* The calling thread collects the results and writes them
+  SCRAPE_WRITE_BATCH at a time, each batch in one short transaction
+  (apply_results). The SQLite write lock is held for milliseconds per batch
+  and never across a network round-trip.
+
+Media rows are upserted in bulk. Every scraped URL in a batch is looked up
+in one query per model; existing rows are bulk_update()d and new ones
+bulk_create()d, up to each model's per-influencer cap. SocialFetchState
+records when each platform was last fetched for an influencer and how the
+last attempt went, so ``fetch_influencer_data --stale-for`` can skip fresh
+ones. A success is next due after REFRESH_INTERVAL. Each failure in a row
+doubles the wait (retry_delay()). ``refresh_worker`` (influencer/refresh.py)
+works through whatever is due.
+
+    jobs = stale_jobs(Influencer.objects.all(), timedelta(days=1))
+    stats = run(jobs)
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from website.downloader import Downloader, DownloadError
+from website.sitemap_files import mark_dirty
+
+from .models import Influencer, InfluencerImage, InfluencerTweet, InfluencerVideo, SocialFetchState
+from .stats import record_samples
+
+logger = logging.getLogger(__name__)
+
+# ---- Instagram (instaloader) ----
+try:
+    import instaloader
+except Exception:
+    instaloader = None
+
+# ---- YouTube (yt-dlp) ----
+try:
+    import yt_dlp
+except Exception:
+    yt_dlp = None
+
+# ---- Twitter/X (snscrape) ----
+try:
+    import snscrape.modules.twitter as sntwitter
+except Exception:
+    sntwitter = None
+
+PLATFORMS = ('instagram', 'youtube', 'twitter')
+# The Influencer field holding each platform's handle or channel.
+HANDLE_FIELDS = {'instagram': 'instagram_handle', 'youtube': 'youtube_channel', 'twitter': 'twitter_handle'}
+DEFAULT_LIMITS = {'instagram': 6, 'youtube': 6, 'twitter': 6}
+# The Influencer columns make_jobs() reads.
+JOB_FIELDS = ('id', 'profile_pic', 'poster_pic', *HANDLE_FIELDS.values())
+
+# Media model -> natural key column
+MEDIA_URL_FIELDS = {InfluencerImage: 'image_url', InfluencerVideo: 'video_url', InfluencerTweet: 'tweet_url'}
+
+
+class ScrapeError(Exception):
+    """A platform could not be scraped for one influencer."""
+
+
+def clean_handle(value):
+    if not value:
+        return ""
+    return value.strip().lstrip("@")
+
+
+def normalize_youtube_channel(value):
+    """
+    Accepts:
+      - Full channel URL: https://www.youtube.com/channel/UCxxxx
+      - Handle URL: https://www.youtube.com/@handle
+      - Handle only: @handle
+      - Custom URL: https://www.youtube.com/c/CustomName
+    Returns a URL suitable for yt-dlp.
+    """
+    if not value:
+        return ""
+    v = value.strip()
+    if not v.startswith("http"):
+        # Assume handle
+        if not v.startswith("@"):
+            v = "@" + v
+        return f"https://www.youtube.com/{v}"
+    return v
+
+
+class RateLimiter:
+    """Spaces calls at least 60/per_minute seconds apart, across all threads."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# -------------------------
+# Network side (worker threads; no database access)
+# -------------------------
+
+_local = threading.local()
+
+
+def scrape_instagram(handle, limit):
+    if not instaloader:
+        raise ScrapeError("instaloader is not installed")
+    username = clean_handle(handle)
+    if not hasattr(_local, 'instaloader'):
+        _local.instaloader = instaloader.Instaloader(download_pictures=False, download_videos=False, quiet=True)
+    # No login: you can still fetch public profiles; login improves reliability
+    try:
+        profile = instaloader.Profile.from_username(_local.instaloader.context, username)
+    except Exception as e:
+        raise ScrapeError(f"failed to load profile '{username}': {e}") from e
+
+    result = {
+        'profile': {
+            'full_name': profile.full_name or None,
+            'biography': profile.biography or None,
+            'instagram_followers': profile.followers or None,
+        },
+        'pic_url': str(profile.profile_pic_url or ''),
+        'media': [],
+        'stats': {'followers': profile.followers},
+    }
+    likes = 0
+    try:
+        for post in profile.get_posts():
+            if len(result['media']) >= limit:
+                break
+            likes += post.likes or 0
+            caption = (post.caption or "").strip()[:250] or None
+            if post.is_video:
+                # Use the post page: video URLs may require login.
+                shortcode = getattr(post, "shortcode", "")
+                page_url = f"https://www.instagram.com/p/{shortcode}/" if shortcode else post.url
+                result['media'].append((InfluencerVideo, page_url, caption, {'source': 'instagram'}))
+            else:
+                result['media'].append((InfluencerImage, post.url, caption, {}))
+        # Likes on the latest posts; a partial sum would read as a drop.
+        result['stats']['likes'] = likes
+    except Exception as e:
+        # Keep the profile data and whatever posts were read.
+        logger.warning("[Instagram] Error fetching posts for %s: %s", username, e)
+    return result
+
+
+def _youtube_entries(info):
+    for ent in info.get("entries") or []:
+        if ent and ent.get("_type") == "url" and "watch" in ent.get("url", ""):
+            yield ent
+        # sometimes entries are playlists/sections that contain their own entries
+        if ent and "entries" in ent:
+            for sub in ent["entries"] or []:
+                if sub and sub.get("_type") == "url" and "watch" in sub.get("url", ""):
+                    yield sub
+
+
+def scrape_youtube(channel, limit):
+    if not yt_dlp:
+        raise ScrapeError("yt-dlp is not installed")
+    ydl_opts = {"quiet": True, "skip_download": True, "extract_flat": True}
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(normalize_youtube_channel(channel), download=False)
+            videos = list(_youtube_entries(info))
+            # If empty, try the channel's /videos tab
+            if not videos and info.get("webpage_url"):
+                alt = info["webpage_url"].rstrip("/") + "/videos"
+                videos = list(_youtube_entries(ydl.extract_info(alt, download=False)))
+    except Exception as e:
+        raise ScrapeError(f"failed to extract channel: {e}") from e
+
+    media = []
+    # Views of the listed videos, when the flat listing reports them all
+    view_counts = [v.get("view_count") for v in videos[:limit]]
+    stats = {
+        'followers': info.get("channel_follower_count"),
+        'views': sum(view_counts) if view_counts and None not in view_counts else None,
+    }
+    for v in videos:
+        if len(media) >= limit:
+            break
+        url = v.get("url") or v.get("webpage_url")
+        if not url:
+            continue
+        if not url.startswith("http"):
+            url = "https://www.youtube.com" + url
+        media.append((InfluencerVideo, url, (v.get("title") or "").strip()[:250] or None, {'source': 'youtube'}))
+    return {'media': media, 'stats': stats}
+
+
+def scrape_twitter(handle, limit):
+    if not sntwitter:
+        raise ScrapeError("snscrape is not installed")
+    handle = clean_handle(handle)
+    media = []
+    stats = {'followers': None, 'likes': 0}
+    try:
+        for tweet in sntwitter.TwitterUserScraper(handle).get_items():
+            if len(media) >= limit:
+                break
+            if stats['followers'] is None and getattr(tweet, "user", None):
+                stats['followers'] = tweet.user.followersCount
+            stats['likes'] += getattr(tweet, "likeCount", 0) or 0
+            url = f"https://twitter.com/{handle}/status/{tweet.id}"
+            text = tweet.rawContent[:250] if getattr(tweet, "rawContent", None) else None
+            media.append((InfluencerTweet, url, text, {}))
+    except Exception as e:
+        raise ScrapeError(f"error scraping @{handle}: {e}") from e
+    return {'media': media, 'stats': stats}
+
+
+SCRAPERS = {'instagram': scrape_instagram, 'youtube': scrape_youtube, 'twitter': scrape_twitter}
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader():
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = Downloader(workers=4)
+        return _downloader
+
+
+def scrape_job(job, limiters):
+    """
+    Run one job in a worker thread once every limiter allows it. Returns
+    ``(job, result, error)``; result is None on failure.
+    """
+    for limiter in limiters:
+        limiter.wait()
+    try:
+        result = SCRAPERS[job['platform']](job['handle'], job['limit'])
+        # The profile picture goes to whichever picture fields are still empty.
+        if result.get('pic_url') and job.get('wants_pic'):
+            try:
+                result['pic_name'] = get_downloader().fetch(result['pic_url'])
+            except DownloadError as e:
+                logger.warning("Could not download %s: %s", result['pic_url'], e)
+        return job, result, None
+    except ScrapeError as e:
+        return job, None, str(e)
+    except Exception as e:  # a scraper library failing in some new way
+        logger.exception("Unexpected error scraping %s for influencer %s", job['platform'], job['influencer_id'])
+        return job, None, str(e)
+
+
+# -------------------------
+# Database side (calling thread, short transactions)
+# -------------------------
+
+def make_jobs(influencers, platforms=PLATFORMS, limits=None):
+    """One job per influencer and platform it has a handle for."""
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    jobs = []
+    for influencer in influencers:
+        for platform in platforms:
+            handle = getattr(influencer, HANDLE_FIELDS[platform])
+            if handle and handle.strip():
+                jobs.append({
+                    'influencer_id': influencer.pk,
+                    'platform': platform,
+                    'handle': handle,
+                    'limit': limits[platform],
+                    'wants_pic': platform == 'instagram' and not (influencer.profile_pic and influencer.poster_pic),
+                })
+    return jobs
+
+
+def stale_jobs(influencers, max_age, platforms=PLATFORMS, limits=None):
+    """make_jobs() for the (influencer, platform) pairs not fetched within ``max_age``."""
+    cutoff = timezone.now() - max_age
+    fresh = set(
+        SocialFetchState.objects.filter(platform__in=platforms, last_fetched_at__gte=cutoff)
+        .values_list('influencer_id', 'platform')
+    )
+    jobs = make_jobs(influencers.only(*JOB_FIELDS).iterator(chunk_size=2000), platforms, limits)
+    return [job for job in jobs if (job['influencer_id'], job['platform']) not in fresh]
+
+
+def _apply_profile(influencer, result):
+    """Copy scraped profile data onto the influencer; True if anything changed."""
+    changed = False
+    for field, value in result.get('profile', {}).items():
+        current = getattr(influencer, field)
+        # Counts are refreshed; text the editors may have written is only filled in.
+        if value and (field == 'instagram_followers' or not current) and current != value:
+            setattr(influencer, field, value)
+            changed = True
+    if result.get('pic_name'):
+        for field in ('profile_pic', 'poster_pic'):
+            if not getattr(influencer, field):
+                getattr(influencer, field).name = result['pic_name']
+                changed = True
+    return changed
+
+
+def _upsert_media(results):
+    """
+    Bulk-upsert the scraped media of ``results`` by URL, keeping each model's
+    per-influencer cap. Returns the ids of the influencers whose media changed.
+    """
+    touched = set()
+    for model, url_field in MEDIA_URL_FIELDS.items():
+        scraped = {}  # url -> row values; the first influencer to list a URL in this batch wins
+        for job, result in results:
+            for order, (_model, url, caption, extra) in enumerate(m for m in result['media'] if m[0] is model):
+                scraped.setdefault(url, {'influencer_id': job['influencer_id'], 'caption': caption,
+                                         'display_order': order, **extra})
+        if not scraped:
+            continue
+
+        existing = {}
+        for row in model.objects.filter(**{f'{url_field}__in': list(scraped)}).order_by('pk'):
+            existing.setdefault(getattr(row, url_field), row)
+        influencer_ids = {values['influencer_id'] for values in scraped.values()}
+        counts = dict(
+            model.objects.filter(influencer_id__in=influencer_ids).order_by()
+            .values_list('influencer_id').annotate(n=Count('id'))
+        )
+
+        to_update, to_create, update_fields = [], [], set()
+        for url, values in scraped.items():
+            row = existing.get(url)
+            if row is None:
+                if counts.get(values['influencer_id'], 0) >= model.MAX_PER_INFLUENCER:
+                    continue
+                counts[values['influencer_id']] = counts.get(values['influencer_id'], 0) + 1
+                to_create.append(model(**{url_field: url}, **values))
+                touched.add(values['influencer_id'])
+                continue
+            changed = [field for field, value in values.items() if getattr(row, field) != value]
+            if changed:
+                # May move the URL to another influencer, as the old per-item upsert did.
+                touched.update({row.influencer_id, values['influencer_id']})
+                for field in changed:
+                    setattr(row, field, values[field])
+                update_fields.update(changed)
+                to_update.append(row)
+        if to_update:
+            model.objects.bulk_update(to_update, sorted(update_fields))
+        if to_create:
+            model.objects.bulk_create(to_create)
+    return touched
+
+
+def retry_delay(failure_count):
+    """How long to wait after ``failure_count`` failures in a row: doubling, capped."""
+    base = settings.REFRESH_RETRY_BASE.total_seconds()
+    return timedelta(seconds=min(base * 2 ** (failure_count - 1), settings.REFRESH_RETRY_MAX.total_seconds()))
+
+
+def _record_failures(failures, now):
+    """Count the failed jobs against their fetch states and push them back by retry_delay()."""
+    keys = {(job['influencer_id'], job['platform']): error for job, error in failures}
+    counts = dict(
+        ((influencer_id, platform), failure_count)
+        for influencer_id, platform, failure_count in SocialFetchState.objects.filter(
+            influencer_id__in={influencer_id for influencer_id, _ in keys},
+            platform__in={platform for _, platform in keys},
+        ).values_list('influencer_id', 'platform', 'failure_count')
+    )
+    states = []
+    for (influencer_id, platform), error in keys.items():
+        failure_count = counts.get((influencer_id, platform), 0) + 1
+        states.append(SocialFetchState(
+            influencer_id=influencer_id, platform=platform, last_attempt_at=now, last_status='failed',
+            last_error=error[:255], failure_count=failure_count, next_due_at=now + retry_delay(failure_count),
+        ))
+    SocialFetchState.objects.bulk_create(
+        states,
+        update_conflicts=True,
+        unique_fields=['influencer', 'platform'],
+        update_fields=['last_attempt_at', 'last_status', 'last_error', 'failure_count', 'next_due_at'],
+    )
+
+
+def apply_results(results, failures=()):
+    """
+    Write one batch in a single short transaction: profile fields, media
+    upserts, fetch states and stat samples for the successful
+    ``(job, result)`` pairs, and the fetch states of the failed
+    ``(job, error)`` pairs.
+    """
+    if not results and not failures:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        influencers = Influencer.objects.in_bulk({job['influencer_id'] for job, _ in results})
+        results = [(job, result) for job, result in results if job['influencer_id'] in influencers]
+        changed = {}
+        for job, result in results:
+            influencer = influencers[job['influencer_id']]
+            if _apply_profile(influencer, result):
+                changed[influencer.pk] = influencer
+        # save(), not bulk_update: it writes only the changed columns and runs
+        # the receivers (directory facets, suggestions, image metadata).
+        for influencer in changed.values():
+            influencer.save()
+
+        # Bulk writes skip the media receivers that bump updated_at (the
+        # profile's Last-Modified/ETag), so bump it here, as the importer does.
+        touched = _upsert_media(results) - changed.keys()
+        if touched and Influencer.objects.filter(pk__in=touched).update(updated_at=now):
+            mark_dirty('profiles')
+
+        SocialFetchState.objects.bulk_create(
+            [SocialFetchState(influencer_id=job['influencer_id'], platform=job['platform'], last_fetched_at=now,
+                              last_attempt_at=now, last_status='ok', last_error='', failure_count=0,
+                              next_due_at=now + settings.REFRESH_INTERVAL)
+             for job, _ in results],
+            update_conflicts=True,
+            unique_fields=['influencer', 'platform'],
+            update_fields=['last_fetched_at', 'last_attempt_at', 'last_status', 'last_error', 'failure_count', 'next_due_at'],
+        )
+        record_samples(
+            [(job['influencer_id'], job['platform'], metric, value)
+             for job, result in results
+             for metric, value in result.get('stats', {}).items() if value is not None],
+            now,
+        )
+        if failures:
+            # Influencers deleted mid-run have nothing left to record against.
+            alive = set(Influencer.objects.filter(
+                pk__in={job['influencer_id'] for job, _ in failures}).values_list('pk', flat=True))
+            failures = [(job, error) for job, error in failures if job['influencer_id'] in alive]
+            _record_failures(failures, now)
+
+
+def run(jobs, platforms_config=None, batch_size=None, log=None, budget=None):
+    """
+    Scrape ``jobs`` on per-platform pools and write the results in batches.
+    ``log(job, error)`` is called per job (error is None on success).
+    ``budget`` is an optional RateLimiter shared by every platform, on top
+    of each platform's own. Returns ``{'ok': n, 'failed': n}``.
+    """
+    config = platforms_config or settings.SCRAPE_PLATFORMS
+    batch_size = batch_size or settings.SCRAPE_WRITE_BATCH
+    stats = {'ok': 0, 'failed': 0}
+    pending, failed = [], []
+
+    pools = {
+        platform: ThreadPoolExecutor(max_workers=config[platform]['workers'], thread_name_prefix=f'scrape-{platform}')
+        for platform in {job['platform'] for job in jobs}
+    }
+    limiters = {
+        platform: [limiter for limiter in (budget, RateLimiter(config[platform]['per_minute'])) if limiter]
+        for platform in pools
+    }
+    try:
+        futures = [pools[job['platform']].submit(scrape_job, job, limiters[job['platform']]) for job in jobs]
+        for future in as_completed(futures):
+            job, result, error = future.result()
+            if log:
+                log(job, error)
+            if error:
+                stats['failed'] += 1
+                failed.append((job, error))
+            else:
+                stats['ok'] += 1
+                pending.append((job, result))
+            if len(pending) + len(failed) >= batch_size:
+                apply_results(pending, failed)
+                pending, failed = [], []
+        apply_results(pending, failed)
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+    return stats
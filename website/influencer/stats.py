@@ -0,0 +1,244 @@
+# influencer/stats.py
+"""
+Follower, like and view history per influencer and platform.
+
+Every scrape (influencer/scraping.py) records a sample of each metric it
+read, and so does every follower count saved through the Influencer model.
+Samples are stored one row per influencer, platform, metric and month
+(SocialStatMonth). Each row is a blob of
+
+    a version byte, then for each sample:
+        varint(seconds since the previous sample)
+        zigzag varint(change since the previous sample)
+
+The first sample of a row is measured from the start of the month and from 0,
+so every month can be decoded on its own. A sample equal to the previous
+one is not stored, because the value holds until it changes. A month of
+daily samples is a few hundred bytes.
+
+Whenever samples are recorded, the SocialGrowth rollup of each metric
+sampled is recomputed from the last few months. The rollup holds the change
+over 7, 30 and 90 days and the value at the end of each of the last 90 days.
+Profile charts (growth_summary) and fastest_growing() only read rollups.
+"""
+import bisect
+import datetime
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from website.sitemap_files import mark_dirty
+
+from .directory import CARD_FIELDS
+from .models import Influencer, SocialGrowth, SocialStatMonth
+
+FORMAT_VERSION = 1
+WINDOWS = (7, 30, 90)  # days
+DAILY_POINTS = 90
+DAY = 24 * 3600
+
+FASTEST_GROWING_LIMIT = 10
+FASTEST_GROWING_CACHE_SECONDS = 600
+
+SPARKLINE_SIZE = (120, 32)
+
+
+def month_start(moment):
+    """The first day of ``moment``'s month, in UTC."""
+    return moment.astimezone(datetime.timezone.utc).date().replace(day=1)
+
+
+def _month_epoch(month):
+    return int(datetime.datetime(month.year, month.month, 1, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def _write_varint(out, n):
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if not n:
+            out.append(byte)
+            return
+        out.append(byte | 0x80)
+
+
+def _append(out, dt, dv):
+    _write_varint(out, dt)
+    _write_varint(out, dv * 2 if dv >= 0 else -dv * 2 - 1)  # zigzag: small changes either way stay short
+
+
+def decode(data, month):
+    """The ``[(unix time, value)]`` samples of a month's blob."""
+    data = bytes(data)
+    if not data:
+        return []
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"Unknown stat blob version {data[0]}")
+    samples = []
+    t, v = _month_epoch(month), 0
+    numbers, n, shift = [], 0, 0
+    for byte in data[1:]:
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if byte & 0x80:
+            continue
+        numbers.append(n)
+        n, shift = 0, 0
+        if len(numbers) == 2:
+            dt, zz = numbers
+            t += dt
+            v += zz // 2 if not zz & 1 else -(zz + 1) // 2
+            samples.append((t, v))
+            numbers = []
+    return samples
+
+
+def encode(samples, month):
+    """A month's blob for ``[(unix time, value)]`` samples, oldest first."""
+    out = bytearray([FORMAT_VERSION])
+    t, v = _month_epoch(month), 0
+    for sample_t, sample_v in samples:
+        _append(out, sample_t - t, sample_v - v)
+        t, v = sample_t, sample_v
+    return bytes(out)
+
+
+def record_samples(samples, now=None, touch=True):
+    """
+    Store ``[(influencer_id, platform, metric, value)]`` measured at ``now``
+    and refresh their rollups. With ``touch``, influencers with a changed
+    value get their updated_at bumped, because their profile page shows the
+    growth.
+    """
+    if not samples:
+        return
+    now = now or timezone.now()
+    month = month_start(now)
+    t = int(now.timestamp())
+
+    rows = {
+        (row.influencer_id, row.platform, row.metric): row
+        for row in SocialStatMonth.objects.filter(influencer_id__in={s[0] for s in samples}, month=month)
+    }
+    changed = {}
+    for influencer_id, platform, metric, value in samples:
+        key = (influencer_id, platform, metric)
+        row = changed.get(key) or rows.get(key)
+        data = bytes(row.data) if row else b''
+        last = decode(data, month)[-1:] if data else []
+        if last and last[0][1] == value:
+            continue
+        # Appending needs only the last sample: the blob is a chain of deltas.
+        out = bytearray(data or bytes([FORMAT_VERSION]))
+        last_t, last_v = last[0] if last else (_month_epoch(month), 0)
+        _append(out, max(t - last_t, 0), value - last_v)
+        changed[key] = SocialStatMonth(
+            influencer_id=influencer_id, platform=platform, metric=metric, month=month, data=bytes(out),
+        )
+    if changed:
+        SocialStatMonth.objects.bulk_create(
+            changed.values(),
+            update_conflicts=True,
+            unique_fields=['influencer', 'platform', 'metric', 'month'],
+            update_fields=['data'],
+        )
+    # Even unchanged values move the windows along.
+    update_growth({(s[0], s[1], s[2]) for s in samples}, now)
+
+    if touch and changed:
+        if Influencer.objects.filter(pk__in={key[0] for key in changed}).update(updated_at=now):
+            mark_dirty('profiles')
+
+
+def update_growth(keys, now=None):
+    """Recompute the SocialGrowth rows of ``{(influencer_id, platform, metric)}``."""
+    now = now or timezone.now()
+    # The month holding the start of the longest window, and the one before
+    # it: the value at that moment may be the previous month's last sample.
+    start = month_start(now - datetime.timedelta(days=max(WINDOWS)))
+    start = (start - datetime.timedelta(days=1)).replace(day=1)
+
+    series = defaultdict(list)
+    months = (
+        SocialStatMonth.objects.filter(influencer_id__in={key[0] for key in keys}, month__gte=start)
+        .order_by('month')
+    )
+    for row in months:
+        key = (row.influencer_id, row.platform, row.metric)
+        if key in keys:
+            series[key].extend(decode(row.data, row.month))
+
+    now_t = now.timestamp()
+    today = now.astimezone(datetime.timezone.utc).date()
+    day_end = int(datetime.datetime(today.year, today.month, today.day, tzinfo=datetime.timezone.utc).timestamp()) + DAY - 1
+    rollups = []
+    for key, samples in series.items():
+        times = [sample_t for sample_t, _ in samples]
+
+        def value_at(moment):
+            i = bisect.bisect_right(times, moment)
+            return samples[i - 1][1] if i else None
+
+        value = samples[-1][1]
+        changes = {}
+        for days in WINDOWS:
+            past = value_at(now_t - days * DAY)
+            changes[days] = value - past if past is not None else None
+        past_30d = value_at(now_t - 30 * DAY)
+        rollups.append(SocialGrowth(
+            influencer_id=key[0], platform=key[1], metric=key[2],
+            value=value,
+            sampled_at=now,
+            growth_7d=changes[7],
+            growth_30d=changes[30],
+            growth_90d=changes[90],
+            growth_30d_pct=round((value - past_30d) * 100 / past_30d, 2) if past_30d else None,
+            daily=[value_at(day_end - i * DAY) for i in range(DAILY_POINTS - 1, -1, -1)],
+        ))
+    SocialGrowth.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['influencer', 'platform', 'metric'],
+        update_fields=['value', 'sampled_at', 'growth_7d', 'growth_30d', 'growth_90d', 'growth_30d_pct', 'daily'],
+    )
+
+
+def sparkline(daily, size=SPARKLINE_SIZE):
+    """SVG polyline points for a rollup's daily values ('' with fewer than two)."""
+    points = [(i, value) for i, value in enumerate(daily) if value is not None]
+    if len(points) < 2:
+        return ''
+    width, height = size
+    low = min(value for _, value in points)
+    high = max(value for _, value in points)
+    span = (high - low) or 1
+    step = width / (len(daily) - 1)
+    return ' '.join(
+        f'{i * step:.1f},{height - (value - low) * height / span:.1f}' for i, value in points
+    )
+
+
+def growth_summary(influencer):
+    """The influencer's rollups for the profile page, each with ``changes`` and ``sparkline`` set."""
+    rows = list(SocialGrowth.objects.filter(influencer=influencer).order_by('platform', 'metric'))
+    for row in rows:
+        row.changes = [('7d', row.growth_7d), ('30d', row.growth_30d), ('90d', row.growth_90d)]
+        row.sparkline = sparkline(row.daily)
+    return rows
+
+
+def fastest_growing(platform='instagram', metric='followers', limit=FASTEST_GROWING_LIMIT):
+    """The rollups with the largest 30-day gain, with their influencers' card fields; cached."""
+    cache_key = f'influencer:stats:fastest:{platform}:{metric}:{limit}'
+    rows = cache.get(cache_key)
+    if rows is None:
+        rows = list(
+            SocialGrowth.objects.filter(platform=platform, metric=metric, growth_30d__gt=0)
+            .order_by('-growth_30d')
+            .select_related('influencer')
+            .only('influencer_id', 'value', 'growth_30d', 'growth_30d_pct',
+                  *(f'influencer__{field}' for field in CARD_FIELDS))[:limit]
+        )
+        cache.set(cache_key, rows, FASTEST_GROWING_CACHE_SECONDS)
+    return rows
@@ -0,0 +1,51 @@
+from django import template
+from django.utils.html import format_html_join
+
+from website.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+def _image_meta(image):
+    """The stored size/colour/placeholder of an ImageField value, if current (website/image_meta.py)."""
+    meta = (getattr(image.instance, 'image_meta', None) or {}).get(image.field.name) or {}
+    return meta if meta.get('name') == image.name and 'w' in meta else None
+
+
+@register.simple_tag
+def thumbnail(image, width, height=0, format=None, quality=None, style=''):
+    """
+    ``src``, ``srcset`` (1x and 2x), width/height and a placeholder
+    background for an <img> showing ``image`` (an ImageField value) at
+    ``width`` x ``height`` CSS pixels:
+
+        <img {% thumbnail influencer.profile_pic 80 80 %} alt="...">
+
+    A height of 0 keeps the aspect ratio. The height attribute and the
+    blurred placeholder come from the model's image_meta, so no file is
+    opened. Empty when there is no image.
+    """
+    if not image:
+        return ''
+    name = image.name
+    src = thumbnail_url(name, width, height, format, quality)
+    retina = thumbnail_url(name, width * 2, height * 2, format, quality)
+    attrs = [('src', src), ('srcset', f'{src} 1x, {retina} 2x'), ('width', width)]
+
+    meta = _image_meta(image)
+    if height:
+        attrs.append(('height', height))
+    elif meta:
+        attrs.append(('height', round(width * meta['h'] / meta['w'])))
+    if meta:
+        # Shown until the image arrives; lazy images reserve their space too.
+        style = f"background: {meta['color']} url({meta['lqip']}) center / cover no-repeat; {style}"
+    if style:
+        attrs.append(('style', style.strip()))
+    return format_html_join(' ', '{}="{}"', attrs)
+
+
+@register.simple_tag
+def thumbnail_src(image, width, height=0, format=None, quality=None):
+    """Just the URL, for places that need one (CSS backgrounds, <source> elements)."""
+    return thumbnail_url(image.name, width, height, format, quality) if image else ''
@@ -1,3 +1,692 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.urls import reverse
+from PIL import Image
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from website.sitemap_files import build, dirty_sections
+from website import image_meta
+from website.sitemaps import section_state
+
+from . import community, directory, live, notifications, refresh, scraping, stats
+from .importer import Importer
+from .models import (
+    Category, Influencer, InfluencerCommunityPost, InfluencerImage, SocialFetchState, SocialGrowth, SocialStatMonth,
+)
+
+
+class TempRootsTestCase(TestCase):
+    """Points MEDIA_ROOT, SITEMAP_ROOT and SUGGEST_ROOT at a throwaway directory."""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root,
+                                     SITEMAP_ROOT=os.path.join(root, 'sitemaps'),
+                                     SUGGEST_ROOT=os.path.join(root, 'suggest'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class SitemapDirtyTests(TempRootsTestCase):
+    """Influencer.save() passes update_fields; lastmod changes must still dirty the profiles sitemap."""
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.influencer = Influencer.objects.create(name='Test Person')
+        build(['profiles'], base_url='http://testserver')
+        self.assertNotIn('profiles', dirty_sections())
+
+    def test_admin_edit_marks_profiles_dirty(self):
+        # What the admin change form does: load, change a field, save().
+        influencer = Influencer.objects.get(pk=self.influencer.pk)
+        influencer.biography = 'New biography'
+        with self.captureOnCommitCallbacks(execute=True):
+            influencer.save()
+        self.assertIn('profiles', dirty_sections())
+
+    def test_partial_save_outside_sitemap_leaves_profiles_clean(self):
+        influencer = Influencer.objects.get(pk=self.influencer.pk)
+        influencer.recent_views = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            influencer.save(update_fields=['recent_views'])
+        self.assertNotIn('profiles', dirty_sections())
+
+
+class ApplyResultsTests(TempRootsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.influencer = Influencer.objects.create(name='Scraped Person', instagram_handle='scraped')
+        self.long_ago = timezone.now() - timedelta(days=30)
+        Influencer.objects.filter(pk=self.influencer.pk).update(updated_at=self.long_ago)
+        self.job = scraping.make_jobs([self.influencer], ['instagram'])[0]
+
+    def result(self, *urls):
+        return {'profile': {}, 'media': [(InfluencerImage, url, 'caption', {}) for url in urls], 'stats': {}}
+
+    def updated_at(self):
+        return Influencer.objects.values_list('updated_at', flat=True).get(pk=self.influencer.pk)
+
+    def test_new_media_bumps_updated_at(self):
+        scraping.apply_results([(self.job, self.result('https://example.com/p/1/'))])
+        self.assertEqual(self.influencer.images.count(), 1)
+        self.assertGreater(self.updated_at(), self.long_ago)
+
+    def test_unchanged_media_leaves_updated_at(self):
+        scraping.apply_results([(self.job, self.result('https://example.com/p/1/'))])
+        Influencer.objects.filter(pk=self.influencer.pk).update(updated_at=self.long_ago)
+        scraping.apply_results([(self.job, self.result('https://example.com/p/1/'))])
+        self.assertEqual(self.updated_at(), self.long_ago)
+
+
+class SitemapValidatorTests(TempRootsTestCase):
+    def test_deletion_changes_validator_without_counting(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Influencer.objects.create(name='Kept')
+            gone = Influencer.objects.create(name='Gone', updated_at=timezone.now() - timedelta(days=1))
+        build(['profiles'], base_url='http://testserver')
+        with CaptureQueriesContext(connection) as queries:
+            before = section_state('profiles')
+        self.assertFalse(any('COUNT(' in q['sql'] for q in queries.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            gone.delete()
+        self.assertNotEqual(section_state('profiles'), before)
+
+
+class RecordViewTests(TempRootsTestCase):
+    def test_views_reach_recent_views_without_another_visit(self):
+        influencer = Influencer.objects.create(name='Quiet Person')
+        for _ in range(3):
+            refresh.record_view(influencer.pk)
+        influencer.refresh_from_db()
+        self.assertEqual(influencer.recent_views, 0)  # buffered, not written per view
+        self.assertTrue(refresh._flusher.is_alive())
+        refresh.flush_views()
+        influencer.refresh_from_db()
+        self.assertEqual(influencer.recent_views, 3)
+
+
+class InMemoryBrokerTests(SimpleTestCase):
+    def test_broker_is_abstract(self):
+        with self.assertRaises(TypeError):
+            live.Broker()
+
+    def test_publish_reaches_only_that_channels_subscribers(self):
+        broker = live.InMemoryBroker(queue_size=10)
+
+        async def scenario():
+            async with broker.subscribe('community:1') as one, broker.subscribe('community:2') as two:
+                self.assertTrue(broker.has_subscribers('community:1'))
+                # publish() is called from sync worker threads, not the subscriber's loop.
+                await asyncio.to_thread(broker.publish, 'community:1', 'hello')
+                self.assertEqual(await asyncio.wait_for(one.get(), 1), 'hello')
+                self.assertTrue(two.empty())
+            self.assertFalse(broker.has_subscribers('community:1'))
+
+        asyncio.run(scenario())
+
+    def test_slow_subscriber_drops_instead_of_growing(self):
+        broker = live.InMemoryBroker(queue_size=2)
+
+        async def scenario():
+            async with broker.subscribe('community:1') as queue:
+                for n in range(5):
+                    broker.publish('community:1', str(n))
+                await asyncio.sleep(0)  # let the call_soon_threadsafe puts run
+                return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        self.assertEqual(asyncio.run(scenario()), ['0', '1'])
+
+    def test_publish_without_subscribers_is_a_no_op(self):
+        broker = live.InMemoryBroker(queue_size=2)
+        broker.publish('community:1', 'nobody')
+        self.assertFalse(broker.has_subscribers('community:1'))
+
+    def test_format_event(self):
+        self.assertEqual(live.format_event('{"id": 7}'), 'id: 7\nevent: post\ndata: {"id": 7}\n\n')
+
+
+class ChangedFieldsTests(TempRootsTestCase):
+    def test_in_place_json_edit_is_saved(self):
+        influencer = Influencer.objects.create(name='Meta Person', image_meta={'profile_pic': {'w': 1}})
+        influencer = Influencer.objects.get(pk=influencer.pk)
+        influencer.image_meta['profile_pic']['w'] = 2
+        self.assertIn('image_meta', influencer.changed_fields())
+        influencer.save()
+        self.assertEqual(Influencer.objects.get(pk=influencer.pk).image_meta, {'profile_pic': {'w': 2}})
+
+
+class CommunityCounterTests(TempRootsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.influencer = Influencer.objects.create(name='Community Person')
+        self.users = [User.objects.create_user(f'user{n}') for n in range(3)]
+        self.thread = self.post(self.users[0])
+
+    def post(self, user, parent=None, **fields):
+        return InfluencerCommunityPost.objects.create(
+            influencer=self.influencer, user=user, parent=parent, content='Hello', **fields)
+
+    def counters(self):
+        return InfluencerCommunityPost.objects.values_list('like_count', 'reply_count').get(pk=self.thread.pk)
+
+    def test_receivers_and_toggle_like_keep_counters(self):
+        reply = self.post(self.users[1], parent=self.thread)
+        self.post(self.users[2], parent=self.thread, is_approved=False)
+        self.assertEqual(community.toggle_like(self.thread, self.users[1]), (True, 1))
+        self.assertEqual(community.toggle_like(self.thread, self.users[2]), (True, 2))
+        self.assertEqual(community.toggle_like(self.thread, self.users[1]), (False, 1))
+        self.assertEqual(self.counters(), (1, 1))
+
+        reply = InfluencerCommunityPost.objects.get(pk=reply.pk)
+        reply.is_approved = False
+        reply.save()
+        self.assertEqual(self.counters(), (1, 0))
+        # The hidden reply no longer lifts the thread.
+        thread = InfluencerCommunityPost.objects.get(pk=self.thread.pk)
+        self.assertEqual(thread.last_activity_at, thread.updated_at)
+        self.assertEqual(community.reconcile_counters(), 0)
+
+    def test_reconcile_repairs_only_drifted_rows(self):
+        self.post(self.users[1], parent=self.thread)
+        community.toggle_like(self.thread, self.users[2])
+        other = self.post(self.users[1])
+        InfluencerCommunityPost.objects.filter(pk=self.thread.pk).update(like_count=9, reply_count=0)
+
+        self.assertEqual(community.reconcile_counters(), 1)
+        self.assertEqual(self.counters(), (1, 1))
+        self.assertEqual(community.reconcile_counters(InfluencerCommunityPost.objects.filter(pk=other.pk)), 0)
+        self.assertEqual(community.reconcile_counters(), 0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class NotificationTests(TempRootsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(cache.clear)  # cached counts would outlive the rolled-back rows
+        self.influencer = Influencer.objects.create(name='Notified Person')
+        self.author, self.replier = User.objects.create_user('author'), User.objects.create_user('replier')
+        self.thread = self.reply(self.author)
+
+    def reply(self, user, parent=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return InfluencerCommunityPost.objects.create(
+                influencer=self.influencer, user=user, parent=parent, content='Hi')
+
+    def test_replies_notify_the_author_but_not_themselves(self):
+        self.reply(self.replier, parent=self.thread)
+        self.reply(self.author, parent=self.thread)
+        self.assertEqual(notifications.unread_state(self.author.id)[0], 1)
+        self.assertEqual(notifications.unread_state(self.replier.id)[0], 0)
+
+    def test_unread_badge_revalidates_until_the_count_changes(self):
+        self.client.force_login(self.author)
+        url = reverse('notifications_unread')
+        first = self.client.get(url)
+        self.assertEqual(first.json()['unread'], 0)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self.reply(self.replier, parent=self.thread)
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['unread'], 1)
+
+    def test_mark_read_adjusts_the_counter(self):
+        for _ in range(3):
+            self.reply(self.replier, parent=self.thread)
+        ids = list(self.author.postnotification_set.values_list('id', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(notifications.mark_read(self.author, ids[:1]), 1)
+            self.assertEqual(notifications.mark_read(self.author, ids[:1]), 0)
+        self.assertEqual(notifications.unread_state(self.author.id)[0], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(notifications.mark_read(self.author), 2)
+        self.assertEqual(notifications.unread_state(self.author.id)[0], 0)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_spaces_calls_across_threads(self):
+        limiter = scraping.RateLimiter(per_minute=1200)  # 50 ms apart
+        started = time.monotonic()
+        threads = [threading.Thread(target=limiter.wait) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_zero_means_unlimited(self):
+        limiter = scraping.RateLimiter(per_minute=0)
+        started = time.monotonic()
+        for _ in range(100):
+            limiter.wait()
+        self.assertLess(time.monotonic() - started, 0.05)
+
+
+def _fake_instagram(handle, limit):
+    if handle.startswith('broken'):
+        raise scraping.ScrapeError('profile not found')
+    return {'profile': {}, 'media': [(InfluencerImage, f'https://example.com/{handle}/1/', '', {})],
+            'stats': {'followers': 1000}}
+
+
+@override_settings(SCRAPE_PLATFORMS={'instagram': {'workers': 3, 'per_minute': 0}})
+@mock.patch.dict(scraping.SCRAPERS, {'instagram': _fake_instagram})
+class RunTests(TempRootsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.influencers = [
+            Influencer.objects.create(name=f'Person {n}', instagram_handle=f'{"broken" if n == 4 else "ok"}{n}')
+            for n in range(5)
+        ]
+        self.jobs = scraping.make_jobs(self.influencers, ['instagram'])
+
+    def test_results_are_written_in_batches(self):
+        logged = []
+        with mock.patch.object(scraping, 'apply_results', wraps=scraping.apply_results) as apply_results:
+            stats = scraping.run(self.jobs, batch_size=2, log=lambda job, error: logged.append(error))
+        self.assertEqual(stats, {'ok': 4, 'failed': 1})
+        self.assertEqual(len(logged), 5)
+        # 5 outcomes in batches of 2: two full batches and the remainder.
+        self.assertEqual([len(r) + len(f) for (r, f), _ in apply_results.call_args_list], [2, 2, 1])
+        self.assertEqual(InfluencerImage.objects.count(), 4)
+
+        states = {s.influencer_id: s for s in SocialFetchState.objects.all()}
+        broken = states[self.influencers[4].pk]
+        self.assertEqual((broken.last_status, broken.failure_count, broken.last_error),
+                         ('failed', 1, 'profile not found'))
+        self.assertEqual(states[self.influencers[0].pk].last_status, 'ok')
+        self.assertIsNotNone(states[self.influencers[0].pk].last_fetched_at)
+
+    def test_shared_budget_limits_every_platform(self):
+        budget = scraping.RateLimiter(per_minute=1200)
+        started = time.monotonic()
+        scraping.run(self.jobs, budget=budget)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)  # 5 jobs, 50 ms apart
+
+
+@override_settings(REFRESH_RETRY_BASE=timedelta(minutes=30), REFRESH_RETRY_MAX=timedelta(days=1),
+                   REFRESH_NEVER_FETCHED_AGE=timedelta(days=30), REFRESH_POPULARITY_PRIOR=10,
+                   REFRESH_VIEW_HALF_LIFE=timedelta(days=7))
+class RefreshSchedulerTests(TempRootsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+
+    def influencer(self, name, views=0, fetched_days_ago=None, due_in=None):
+        influencer = Influencer.objects.create(name=name, instagram_handle=name.lower())
+        Influencer.objects.filter(pk=influencer.pk).update(recent_views=views)
+        refresh.sync_states(['instagram'])
+        SocialFetchState.objects.filter(influencer=influencer).update(
+            last_fetched_at=None if fetched_days_ago is None else self.now - timedelta(days=fetched_days_ago),
+            next_due_at=None if due_in is None else self.now + due_in,
+        )
+        return influencer
+
+    def test_next_jobs_ranks_staleness_times_traffic(self):
+        self.influencer('Quiet', views=0, fetched_days_ago=10)         # 10 days x 10
+        self.influencer('Popular', views=90, fetched_days_ago=2)       # 2 days x 100
+        self.influencer('New', views=0)                                # 30 days x 10
+        self.influencer('Fresh', views=1000, fetched_days_ago=0, due_in=timedelta(hours=5))  # not due
+        names = dict(Influencer.objects.values_list('id', 'name'))
+        jobs = refresh.next_jobs(10, ['instagram'])
+        self.assertEqual([names[job['influencer_id']] for job in jobs], ['New', 'Popular', 'Quiet'])
+        self.assertEqual(len(refresh.next_jobs(1, ['instagram'])), 1)
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertEqual([scraping.retry_delay(n) for n in (1, 2, 3)],
+                         [timedelta(minutes=30), timedelta(hours=1), timedelta(hours=2)])
+        self.assertEqual(scraping.retry_delay(20), timedelta(days=1))
+
+    def test_failures_push_the_state_back(self):
+        influencer = self.influencer('Flaky')
+        job = scraping.make_jobs([influencer], ['instagram'])[0]
+        for failures in (1, 2):
+            scraping.apply_results([], [(job, 'timeout')])
+            state = SocialFetchState.objects.get(influencer=influencer)
+            self.assertEqual(state.failure_count, failures)
+            self.assertAlmostEqual((state.next_due_at - state.last_attempt_at).total_seconds(),
+                                   scraping.retry_delay(failures).total_seconds())
+        self.assertEqual(refresh.next_jobs(10, ['instagram']), [])
+
+        scraping.apply_results([(job, {'profile': {}, 'media': [], 'stats': {}})])
+        self.assertEqual(SocialFetchState.objects.get(influencer=influencer).failure_count, 0)
+
+    def test_sync_states_follows_handles(self):
+        influencer = self.influencer('Handle')
+        self.assertEqual(refresh.sync_states(['instagram']), (0, 0))
+        Influencer.objects.filter(pk=influencer.pk).update(instagram_handle='')
+        self.assertEqual(refresh.sync_states(['instagram']), (0, 1))
+
+    def test_decay_halves_once_per_half_life(self):
+        influencer = self.influencer('Viewed', views=40)
+        self.assertFalse(refresh.decay_views())  # starts the clock
+        self.assertTrue(refresh.decay_views(force=True))
+        self.assertFalse(refresh.decay_views())
+        influencer.refresh_from_db()
+        self.assertEqual(influencer.recent_views, 20)
+
+
+class StatBlobTests(SimpleTestCase):
+    def test_round_trip(self):
+        month = datetime.date(2025, 2, 1)
+        epoch = int(datetime.datetime(2025, 2, 1, tzinfo=datetime.timezone.utc).timestamp())
+        samples = [(epoch, 0), (epoch + 59, 12_000_000), (epoch + 86_400 * 27, 11_999_990), (epoch + 86_401 * 27, -5)]
+        blob = stats.encode(samples, month)
+        self.assertEqual(stats.decode(blob, month), samples)
+        self.assertEqual(stats.decode(b'', month), [])
+        with self.assertRaises(ValueError):
+            stats.decode(bytes([99]) + blob[1:], month)
+
+    def test_small_changes_stay_small(self):
+        month = datetime.date(2025, 2, 1)
+        epoch = int(datetime.datetime(2025, 2, 1, tzinfo=datetime.timezone.utc).timestamp())
+        daily = [(epoch + 86_400 * day, 50_000 + day * 3) for day in range(28)]
+        # First sample up to 7 bytes, then ~3 bytes of time and 1 of change per day.
+        self.assertLess(len(stats.encode(daily, month)), 8 + 27 * 4)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class StatRollupTests(TempRootsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(cache.clear)
+        self.now = timezone.now()
+        self.influencer = Influencer.objects.create(name='Growing Person')
+
+    def record(self, days_ago, value, influencer=None):
+        influencer = influencer or self.influencer
+        stats.record_samples([(influencer.pk, 'instagram', 'followers', value)], self.now - timedelta(days=days_ago))
+
+    def growth(self):
+        return SocialGrowth.objects.get(influencer=self.influencer, platform='instagram', metric='followers')
+
+    def test_windows_and_daily_points(self):
+        for days_ago, value in ((40, 1000), (20, 1500), (5, 1400), (0, 2000)):
+            self.record(days_ago, value)
+        growth = self.growth()
+        self.assertEqual(growth.value, 2000)
+        self.assertEqual(growth.growth_7d, 500)     # since 1500
+        self.assertEqual(growth.growth_30d, 1000)   # since 1000
+        self.assertEqual(growth.growth_30d_pct, 100.0)
+        self.assertIsNone(growth.growth_90d)        # nothing that old
+        self.assertEqual(len(growth.daily), stats.DAILY_POINTS)
+        self.assertEqual(growth.daily[-1], 2000)
+        self.assertEqual(growth.daily[-6:-4], [1400, 1400])  # end of the day of the -5d sample
+        self.assertEqual(growth.daily[-7], 1500)
+        self.assertIsNone(growth.daily[0])
+
+    def test_unchanged_values_are_not_stored(self):
+        for days_ago in (3, 2, 1):
+            self.record(days_ago, 700)
+        rows = SocialStatMonth.objects.filter(influencer=self.influencer)
+        samples = [sample for row in rows for sample in stats.decode(row.data, row.month)]
+        # One sample per month row (two rows only if the days straddle a month end).
+        self.assertEqual([value for _, value in samples], [700] * rows.count())
+
+    def test_fastest_growing(self):
+        slower = Influencer.objects.create(name='Slower Person')
+        for influencer, gain in ((self.influencer, 900), (slower, 100)):
+            self.record(30, 1000, influencer)
+            self.record(0, 1000 + gain, influencer)
+        self.assertEqual([row.influencer.name for row in stats.fastest_growing()], ['Growing Person', 'Slower Person'])
+
+
+@override_settings(COMMUNITY_REPLY_PREVIEW=2, COMMUNITY_THREADS_PER_PAGE=2, COMMUNITY_REPLIES_PER_PAGE=2)
+class CommunityThreadTests(TempRootsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.influencer = Influencer.objects.create(name='Thread Person')
+        self.user = User.objects.create_user('poster')
+        self.start = timezone.now() - timedelta(days=1)
+        self.clock = 0
+        # Three threads, oldest first; the oldest gets the newest replies, so it leads.
+        self.old, self.middle, self.new = (self.post() for _ in range(3))
+        self.replies = [self.post(parent=self.old) for _ in range(5)]
+        self.post(parent=self.old, is_approved=False)
+
+    def post(self, parent=None, **fields):
+        self.clock += 1
+        return InfluencerCommunityPost.objects.create(
+            influencer=self.influencer, user=self.user, parent=parent, content=f'Post {self.clock}',
+            updated_at=self.start + timedelta(minutes=self.clock), **fields)
+
+    def test_threads_with_new_replies_come_first_with_a_preview(self):
+        with self.assertNumQueries(2):  # the page of threads, then every preview
+            threads, cursor = community.thread_page(self.influencer)
+        self.assertEqual(threads, [self.old, self.new])
+        self.assertEqual(threads[0].thread_replies, self.replies[:-3:-1])
+        self.assertEqual(threads[0].more_replies, 3)
+        self.assertEqual(threads[1].thread_replies, [])
+
+        threads, cursor = community.thread_page(self.influencer, cursor)
+        self.assertEqual((threads, cursor), ([self.middle], None))
+
+    def test_reply_pages_continue_after_the_preview(self):
+        thread = community.thread_page(self.influencer)[0][0]
+        seen = list(thread.thread_replies)
+        cursor = thread.replies_cursor
+        while cursor:
+            replies, cursor, remaining = community.reply_page(thread, cursor)
+            seen += replies
+            self.assertEqual(remaining, len(self.replies) - len(seen))
+        self.assertEqual(seen, self.replies[::-1])  # every approved reply once, newest first
+
+    def test_thread_and_reply_endpoints(self):
+        url = reverse('community_threads', args=[self.influencer.pk])
+        first = self.client.get(url).json()
+        self.assertTrue(first['next_cursor'])
+        second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertEqual((second['success'], second['next_cursor']), (True, None))
+        self.assertIn('Post 2', second['html'])
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 400)
+
+        replies_url = reverse('community_replies', args=[self.old.pk])
+        response = self.client.get(replies_url, {'cursor': community.thread_page(self.influencer)[0][0].replies_cursor})
+        self.assertEqual((response.json()['remaining'], response.status_code), (1, 200))
+        self.assertEqual(self.client.get(reverse('community_replies', args=[self.replies[0].pk])).status_code, 404)
+
+    def test_build_tree_drops_orphans(self):
+        hidden_parent_reply = InfluencerCommunityPost(id=999, parent_id=12345)
+        roots = community.build_tree([self.new, self.replies[0], hidden_parent_reply])
+        self.assertEqual(roots, [self.new])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DirectoryFacetTests(TempRootsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(cache.clear)
+        rng = random.Random(3)
+        self.categories = [Category.objects.create(name=f'Niche {n}') for n in range(3)]
+        for n in range(40):
+            influencer = Influencer.objects.create(
+                name=f'Person {n}', profession=rng.choice(['Actor', 'Singer', None]),
+                instagram_followers=rng.choice([None, 500, 50_000, 500_000, 5_000_000]))
+            influencer.categories.set(rng.sample(self.categories, rng.randint(0, 2)))
+
+    def test_facet_counts_match_the_filtered_queryset(self):
+        for category in (None, *(c.pk for c in self.categories)):
+            for band in ('', *directory.BANDS):
+                for profession in ('', 'Actor', 'Singer'):
+                    filters = {'category': category, 'band': band, 'profession': profession, 'sort': 'followers'}
+                    with self.subTest(**filters):
+                        counts = directory.facet_counts(filters)
+                        self.assertEqual(counts['total'], directory.filtered_influencers(filters).count())
+                        for key, _, n in counts['bands']:
+                            self.assertEqual(n, directory.filtered_influencers({**filters, 'band': key}).count())
+                        for pk, _, n in counts['categories']:
+                            self.assertEqual(n, directory.filtered_influencers({**filters, 'category': pk}).count())
+
+    def test_cache_dropped_only_when_a_count_can_move(self):
+        directory.get_facets()
+        influencer = Influencer.objects.get(name='Person 0')
+        influencer.instagram_followers = 12_000
+        influencer.profession = 'Actor'
+        with self.captureOnCommitCallbacks(execute=True):
+            influencer.save()
+        directory.get_facets()
+
+        influencer.instagram_followers = 13_000  # same band
+        with self.captureOnCommitCallbacks(execute=True):
+            influencer.save()
+        self.assertIsNotNone(cache.get(directory.FACETS_CACHE_KEY))
+
+        influencer.instagram_followers = 130_000  # next band
+        with self.captureOnCommitCallbacks(execute=True):
+            influencer.save()
+        self.assertIsNone(cache.get(directory.FACETS_CACHE_KEY))
+
+    def test_directory_pages_cover_the_filter(self):
+        filters = directory.parse_filters({'band': 'micro', 'sort': 'bogus'})
+        self.assertEqual(filters['sort'], directory.DEFAULT_SORT)
+        seen, cursor = [], None
+        while True:
+            page, cursor = directory.directory_page(filters, cursor, per_page=3)
+            seen += [influencer.pk for influencer in page]
+            if not cursor:
+                break
+        expected = directory.filtered_influencers(filters).order_by('-instagram_followers', '-id')
+        self.assertEqual(seen, list(expected.values_list('pk', flat=True)))
+
+
+def _jpeg(size, color):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG')
+    return ContentFile(buffer.getvalue(), name='pic.jpg')
+
+
+class ImageMetaTests(TempRootsTestCase):
+    def test_upload_records_size_colour_and_placeholder(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            influencer = Influencer.objects.create(name='Pictured', profile_pic=_jpeg((300, 200), (200, 20, 20)))
+        meta = Influencer.objects.get(pk=influencer.pk).image_meta['profile_pic']
+        self.assertEqual((meta['name'], meta['w'], meta['h']), (influencer.profile_pic.name, 300, 200))
+        red, green, blue = (int(meta['color'][i:i + 2], 16) for i in (1, 3, 5))
+        self.assertGreater(red, 150)
+        self.assertLess(max(green, blue), 80)
+        with Image.open(io.BytesIO(base64.b64decode(meta['lqip'].split(',', 1)[1]))) as lqip:
+            self.assertEqual(max(lqip.size), image_meta.LQIP_SIZE)
+        self.assertNotIn('poster_pic', influencer.image_meta)
+
+    def test_replaced_or_broken_files(self):
+        influencer = Influencer.objects.create(name='Replaced', profile_pic=_jpeg((300, 200), (0, 0, 0)))
+        influencer.profile_pic = _jpeg((100, 400), (0, 0, 0))
+        influencer.save()
+        influencer.refresh_from_db()
+        self.assertEqual(image_meta.stale_fields(influencer), [])
+        self.assertEqual(influencer.image_meta['profile_pic']['h'], 400)
+
+        influencer.profile_pic = ContentFile(b'not an image', name='broken.jpg')
+        influencer.save()
+        self.assertEqual(influencer.image_meta['profile_pic'], {'name': influencer.profile_pic.name})
+        self.assertFalse(image_meta.refresh(influencer))  # not retried on every save
+
+    def test_thumbnail_tag_uses_stored_dimensions(self):
+        influencer = Influencer.objects.create(name='Tagged', profile_pic=_jpeg((300, 200), (0, 0, 0)))
+        html = Template('{% load thumbnails %}<img {% thumbnail influencer.profile_pic 150 %}>').render(
+            Context({'influencer': influencer}))
+        self.assertIn('width="150"', html)
+        self.assertIn('height="100"', html)
+        self.assertIn('data:image/webp;base64,', html)
+
+
+IMPORT_YAML = """\
+- name: Ada Stone
+  instagram_followers: 1200
+  categories: [Actors, Fashion]
+  images:
+    - image_url: https://example.com/ada-1.jpg
+      caption: First
+    - image_url: https://example.com/ada-2.jpg
+  videos:
+    - video_url: https://youtu.be/abc
+- name: Ada Stone
+  nickname: Ace
+- name: Ben Ray
+  categories: [Music]
+- surname: Nameless
+"""
+
+
+class ImporterTests(TempRootsTestCase):
+    def run_import(self, text, **kwargs):
+        self.messages = []
+        importer = Importer(lambda level, message: self.messages.append((level, message)), **kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            return importer.run(io.StringIO(text))
+
+    def test_creates_then_leaves_unchanged(self):
+        stats = self.run_import(IMPORT_YAML, chunk_size=2)
+        self.assertEqual((stats['created'], stats['media'], stats['skipped']), (2, 3, 1))
+        ada = Influencer.objects.get(name='Ada Stone')
+        self.assertEqual((ada.slug, ada.nickname, ada.instagram_followers), ('ada-stone', 'Ace', 1200))
+        self.assertEqual(sorted(ada.categories.values_list('name', flat=True)), ['Actors', 'Fashion'])
+        self.assertEqual(list(ada.images.order_by('display_order').values_list('caption', flat=True)), ['First', ''])
+        self.assertEqual(ada.videos.get().source, 'youtube')
+
+        stats = self.run_import(IMPORT_YAML, chunk_size=500)
+        self.assertEqual((stats['created'], stats['updated'], stats['unchanged'], stats['media']), (0, 0, 2, 0))
+        self.assertEqual(Influencer.objects.count(), 2)
+        self.assertEqual(ada.images.count(), 2)
+
+    def test_updates_fields_and_replaces_categories(self):
+        self.run_import(IMPORT_YAML)
+        stats = self.run_import("- name: Ben Ray\n  instagram_followers: 50\n  categories: [Sports]\n")
+        self.assertEqual(stats['updated'], 1)
+        ben = Influencer.objects.get(name='Ben Ray')
+        self.assertEqual(ben.instagram_followers, 50)
+        self.assertEqual(list(ben.categories.values_list('name', flat=True)), ['Sports'])
+
+    def test_dry_run_writes_nothing(self):
+        stats = self.run_import(IMPORT_YAML, dry_run=True)
+        self.assertFalse(Influencer.objects.exists())
+        self.assertFalse(Category.objects.exists())
+        self.assertEqual(stats['failed'], 0)
+        self.assertTrue(any(level == 'diff' for level, _ in self.messages))
+
+    def test_bad_record_fails_alone(self):
+        stats = self.run_import("- name: Good\n- name: Bad\n  instagram_followers: -5\n")
+        self.assertEqual((stats['created'], stats['failed']), (1, 1))
+        self.assertEqual(list(Influencer.objects.values_list('name', flat=True)), ['Good'])
+
+
+class PopulateUsersLoadTestTests(TempRootsTestCase):
+    def test_load_test_seeds_users_with_shared_avatars(self):
+        User.objects.create_user(username='taken@example.com', email='taken@example.com')
+        random.seed(7)
+        call_command('populate_users', '--load-test', num_users=7, country='us',
+                     workers=1, batch_size=3, stdout=io.StringIO())
+
+        users = User.objects.exclude(username='taken@example.com')
+        self.assertEqual(users.count(), 7)
+        self.assertEqual(len(set(users.values_list('email', flat=True))), 7)
+        self.assertEqual(len(set(users.values_list('password', flat=True))), 1)  # hashed once
+        self.assertTrue(users.first().check_password('!@#$qwertyu'))
+        for profile in UserProfile.objects.filter(user__in=users):
+            meta = profile.image_meta['profile_picture']
+            self.assertEqual(meta['name'], profile.profile_picture.name)
+            self.assertEqual((meta['w'], meta['h']), (200, 200))
+            self.assertTrue(os.path.exists(profile.profile_picture.path))
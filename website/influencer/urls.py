@@ -8,5 +8,17 @@ urlpatterns = [
     path('influencer/edit/<slug:slug>/', views.create_or_update_influencer_profile, name='update_influencer_profile'),
 
 
+    # Community feed (JSON, keyset-paginated)
+    path('community/<int:influencer_id>/threads/', views.community_threads, name='community_threads'),
+    path('community/replies/<int:post_id>/', views.community_replies, name='community_replies'),
+    path('community/like/<int:post_id>/', views.community_like, name='community_like'),
+    # Server-Sent Events, served by the ASGI app (see influencer/live.py)
+    path('community/<int:influencer_id>/live/', views.community_live, name='community_live'),
+
+    # Reply notifications (JSON)
+    path('notifications/', views.notifications_list, name='notifications_list'),
+    path('notifications/unread/', views.notifications_unread, name='notifications_unread'),
+    path('notifications/read/', views.notifications_mark_read, name='notifications_mark_read'),
+
     #path('', views.profile_detail, name='profile_detail'),
 ]
\ No newline at end of file
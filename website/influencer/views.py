@@ -9,11 +9,20 @@ from django.core.files import File # For saving files from URLs
 import requests # For making HTTP requests to fetch images
 import os
 from io import BytesIO # To handle image data in memory
-from .models import Influencer, InfluencerCommunityPost, PostNotification
+from .models import Influencer, InfluencerCommunityPost
 from django.db import transaction
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
+from website.conditional import conditional_page, make_etag
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.utils.cache import patch_cache_control
+from .community import mark_liked, reply_page, thread_page, toggle_like
+from .directory import directory_page, facet_counts, filter_url, parse_filters
+from .live import event_stream, live_enabled
+from .notifications import mark_read, notification_page, unread_state
+from .refresh import record_view
+from .stats import fastest_growing, growth_summary
 
 from .forms import (
     InfluencerProfileForm,
@@ -25,7 +34,7 @@ from .forms import (
 
 def influencer_community_view(request, influencer_id):
     influencer = get_object_or_404(Influencer, id=influencer_id)
-    posts = influencer.community_posts.filter(parent__isnull=True, is_approved=True)
+    posts, next_cursor = thread_page(influencer)
 
     if request.method == 'POST':
         form = CommunityPostForm(request.POST)
@@ -33,11 +42,7 @@ def influencer_community_view(request, influencer_id):
             post = form.save(commit=False)
             post.user = request.user
             post.influencer = influencer
-            post.save()
-
-            # Notify parent user if this is a reply
-            if post.parent:
-                PostNotification.objects.create(post=post, user=post.parent.user)
+            post.save()  # replies notify the parent's author (see models.notify_parent_author)
 
             return redirect('influencer_community', influencer_id=influencer.id)
     else:
@@ -46,6 +51,7 @@ def influencer_community_view(request, influencer_id):
     return render(request, 'community/influencer_community.html', {
         'influencer': influencer,
         'posts': posts,
+        'next_cursor': next_cursor,
         'form': form
     })
 
@@ -97,9 +103,17 @@ def create_or_update_influencer_profile(request, slug=None):
     }
     return render(request, 'influencer/influencer_profile_form.html', context)
 
+def _profile_state(request, slug):
+    row = Influencer.objects.filter(slug=slug).values_list('id', 'updated_at').first()
+    if row and request.method == 'GET':
+        # Anonymous views are counted here so 304s count too; logged-in ones in profile_detail.
+        record_view(row[0])
+    return (row[1], row) if row else None
+
+
+@conditional_page(_profile_state)
 def profile_detail(request, slug):
     influencer = get_object_or_404(Influencer, slug=slug)
-    posts = influencer.community_posts.filter(parent__isnull=True, is_approved=True)
 
     # Handle POST only if user is authenticated
     if request.method == 'POST':
@@ -125,6 +139,7 @@ def profile_detail(request, slug):
                 html = render_to_string('influencer/_community_post.html', {'post': new_post}, request)
                 return JsonResponse({
                     'success': True,
+                    'id': new_post.id,
                     'html': html,
                     'is_reply': bool(parent_post),
                     'parent_id': parent_post.id if parent_post else None,
@@ -132,7 +147,185 @@ def profile_detail(request, slug):
 
             return redirect('profile_detail', slug=slug)
 
-    return render(request, 'influencer/profile.html', {'influencer': influencer, 'posts': posts})
+    if request.method == 'GET' and request.user.is_authenticated:
+        record_view(influencer.pk)
+
+    # Only the first page of threads ships with the page; the rest scroll in
+    # from community_threads.
+    posts, next_cursor = thread_page(influencer)
+    mark_liked(posts, request.user)
+    return render(request, 'influencer/profile.html', {
+        'influencer': influencer,
+        'growth': growth_summary(influencer),
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'community_live': live_enabled(),
+    })
+
+
+def community_threads(request, influencer_id):
+    """JSON page of community threads for infinite scroll on the profile."""
+    influencer = get_object_or_404(Influencer, id=influencer_id)
+    try:
+        posts, next_cursor = thread_page(influencer, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor.'}, status=400)
+    mark_liked(posts, request.user)
+    html = render_to_string('influencer/_community_threads.html', {'posts': posts}, request)
+    return JsonResponse({'success': True, 'html': html, 'next_cursor': next_cursor})
+
+
+def community_replies(request, post_id):
+    """JSON page of a thread's replies behind its "show more replies" button."""
+    parent = get_object_or_404(InfluencerCommunityPost, id=post_id, parent__isnull=True, is_approved=True)
+    try:
+        replies, next_cursor, remaining = reply_page(parent, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor.'}, status=400)
+    mark_liked(replies, request.user)
+    html = render_to_string('influencer/_community_threads.html', {'posts': replies}, request)
+    return JsonResponse({'success': True, 'html': html, 'next_cursor': next_cursor, 'remaining': remaining})
+
+
+@require_POST
+def community_like(request, post_id):
+    """Toggle the current user's like on a community post; returns the new count."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'You must login to like posts.'}, status=403)
+    post = get_object_or_404(InfluencerCommunityPost, id=post_id, is_approved=True)
+    liked, like_count = toggle_like(post, request.user)
+    return JsonResponse({'success': True, 'liked': liked, 'like_count': like_count})
+
+def _login_required_json(request):
+    return JsonResponse({'success': False, 'error': 'You must login to see notifications.'}, status=403)
+
+
+def _unread_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return make_etag('notifications', request.user.id, *unread_state(request.user.id))
+
+
+@require_GET
+@condition(etag_func=_unread_etag)
+def notifications_unread(request):
+    """
+    Unread count for the header badge. Pollers send back the ETag and get a
+    304 until the count changes; neither answer reads PostNotification.
+    """
+    if not request.user.is_authenticated:
+        return _login_required_json(request)
+    unread, _ = unread_state(request.user.id)
+    response = JsonResponse({'success': True, 'unread': unread})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_GET
+def notifications_list(request):
+    """JSON page of the current user's notifications, newest first."""
+    if not request.user.is_authenticated:
+        return _login_required_json(request)
+    try:
+        notifications, next_cursor = notification_page(request.user, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor.'}, status=400)
+    html = render_to_string('influencer/_notifications.html', {'notifications': notifications}, request)
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'next_cursor': next_cursor,
+        'unread': unread_state(request.user.id)[0],
+    })
+
+
+@require_POST
+def notifications_mark_read(request):
+    """Mark the posted notification ``id``s, or all of them when none are given, as read."""
+    if not request.user.is_authenticated:
+        return _login_required_json(request)
+    ids = request.POST.getlist('id')
+    try:
+        ids = [int(i) for i in ids] if ids else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid notification id.'}, status=400)
+    marked = mark_read(request.user, ids)
+    return JsonResponse({'success': True, 'marked': marked, 'unread': unread_state(request.user.id)[0]})
+
+
+def _directory_facets(filters):
+    """Facet options for the directory sidebar: (label, count, url, active) per value."""
+    base_url = reverse('influencer_directory')
+    counts = facet_counts(filters)
+    return {
+        'total': counts['total'],
+        'categories': [
+            (name, n, filter_url(base_url, filters, category='' if pk == filters['category'] else pk), pk == filters['category'])
+            for pk, name, n in counts['categories']
+        ],
+        'bands': [
+            (label, n, filter_url(base_url, filters, band='' if key == filters['band'] else key), key == filters['band'])
+            for key, label, n in counts['bands']
+        ],
+        'professions': [
+            (profession, n, filter_url(base_url, filters, profession='' if profession == filters['profession'] else profession),
+             profession == filters['profession'])
+            for profession, n in counts['professions']
+        ],
+        'sorts': [
+            (label, filter_url(base_url, filters, sort=key), key == filters['sort'])
+            for key, label in (('followers', 'Most followers'), ('recent', 'Newest'))
+        ],
+        'clear_url': base_url,
+    }
+
+
+def influencer_directory(request):
+    """The /influencers/ directory: faceted, keyset-paginated influencer cards."""
+    filters = parse_filters(request.GET)
+    try:
+        influencers, next_cursor = directory_page(filters, request.GET.get('cursor'))
+    except ValueError:
+        # A stale or mangled cursor just restarts from the first page.
+        influencers, next_cursor = directory_page(filters)
+    more_url = None
+    if next_cursor:
+        more_url = filter_url(reverse('influencer_directory_more'), filters, cursor=next_cursor)
+    return render(request, 'influencer/directory.html', {
+        'influencers': influencers,
+        'more_url': more_url,
+        'facets': _directory_facets(filters),
+        'filters': filters,
+        'fastest_growing': fastest_growing(),
+    })
+
+
+def influencer_directory_more(request):
+    """JSON "load more" for the directory grid."""
+    filters = parse_filters(request.GET)
+    try:
+        influencers, next_cursor = directory_page(filters, request.GET.get('cursor'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    html = render_to_string('influencer/_influencer_cards.html', {'influencers': influencers}, request)
+    return JsonResponse({'success': True, 'html': html, 'next_cursor': next_cursor})
+
+
+async def community_live(request, influencer_id):
+    """
+    Server-Sent Events stream of an influencer's new community posts.
+    Async so that idle streams cost the ASGI process a coroutine, not a worker.
+    """
+    if not live_enabled():
+        # 204 tells EventSource to stop reconnecting.
+        return HttpResponse(status=204)
+    if not await Influencer.objects.filter(id=influencer_id).aexists():
+        raise Http404
+    response = StreamingHttpResponse(event_stream(influencer_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: flush every event
+    return response
+
 
 def influencer_portfolio_view(request):
     return render(request, 'influencer/portfolio.html')
\ No newline at end of file
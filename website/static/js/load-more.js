@@ -0,0 +1,58 @@
+// Infinite scroll for keyset-paginated lists.
+// A button with data-load-more="<target id>" and data-url="<endpoint>?cursor=..."
+// fetches the next page as JSON ({html, next_cursor}) and appends it to the target.
+// Buttons load automatically when scrolled into view unless data-autoload="false";
+// an optional data-label ("Show {n} more") is refreshed from the response's "remaining".
+// Buttons inside loaded HTML work too.
+(function() {
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => { if (entry.isIntersecting) loadMore(entry.target); });
+    }, { rootMargin: '400px' });
+
+    function watch(root) {
+        root.querySelectorAll('[data-load-more]:not([data-autoload="false"])').forEach(button => observer.observe(button));
+    }
+
+    function loadMore(button) {
+        if (button.dataset.loading || !button.dataset.url) return;
+        const target = document.getElementById(button.dataset.loadMore);
+        button.dataset.loading = '1';
+        button.disabled = true;
+
+        fetch(button.dataset.url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(res => res.json())
+        .then(data => {
+            if (!data.success) throw new Error(data.error);
+            target.insertAdjacentHTML('beforeend', data.html);
+            watch(target);
+            if (data.next_cursor) {
+                const url = new URL(button.dataset.url, window.location.origin);
+                url.searchParams.set('cursor', data.next_cursor);
+                button.dataset.url = url.pathname + url.search;
+                if (button.dataset.label && data.remaining !== undefined) {
+                    button.textContent = button.dataset.label.replace('{n}', data.remaining);
+                }
+                button.disabled = false;
+            } else {
+                // Last page: nothing more to fetch.
+                observer.unobserve(button);
+                button.remove();
+            }
+        })
+        .catch(err => {
+            console.error('Error loading more items:', err);
+            button.disabled = false;
+        })
+        .finally(() => { delete button.dataset.loading; });
+    }
+
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('[data-load-more]');
+        if (button) {
+            e.preventDefault();
+            loadMore(button);
+        }
+    });
+
+    document.addEventListener('DOMContentLoaded', () => watch(document));
+})();
@@ -0,0 +1,77 @@
+// Typeahead for the header search box.
+// An input with data-suggest-url="<endpoint>" gets a dropdown of
+// suggestions ({results: [{type, label, url}]}) as the user types.
+// Arrow keys move through them, Enter opens the highlighted one, and
+// without a highlight the form submits to the full search page as usual.
+(function() {
+    const LABELS = { influencer: 'Influencer', post: 'Post', webstory: 'Web story' };
+
+    document.querySelectorAll('[data-suggest-url]').forEach(input => {
+        const list = document.getElementById(input.getAttribute('aria-controls'));
+        let timer = null, controller = null, active = -1;
+
+        function close() {
+            list.innerHTML = '';
+            list.classList.add('hidden');
+            input.setAttribute('aria-expanded', 'false');
+            active = -1;
+        }
+
+        function render(results) {
+            list.innerHTML = '';
+            results.forEach((result, i) => {
+                const link = document.createElement('a');
+                link.href = result.url;
+                link.id = `${list.id}-${i}`;
+                link.setAttribute('role', 'option');
+                link.className = 'flex justify-between gap-4 px-4 py-2 hover:bg-gray-100';
+                const label = document.createElement('span');
+                label.textContent = result.label;
+                const type = document.createElement('span');
+                type.className = 'text-xs text-gray-500';
+                type.textContent = LABELS[result.type] || '';
+                link.append(label, type);
+                list.appendChild(link);
+            });
+            list.classList.toggle('hidden', !results.length);
+            input.setAttribute('aria-expanded', results.length ? 'true' : 'false');
+            active = -1;
+        }
+
+        function highlight(index) {
+            const options = list.querySelectorAll('[role="option"]');
+            if (!options.length) return;
+            active = (index + options.length) % options.length;
+            options.forEach((option, i) => option.classList.toggle('bg-gray-100', i === active));
+            input.setAttribute('aria-activedescendant', options[active].id);
+        }
+
+        function fetchSuggestions() {
+            const query = input.value.trim();
+            if (!query) return close();
+            if (controller) controller.abort();  // only the latest keystroke matters
+            controller = new AbortController();
+            const url = new URL(input.dataset.suggestUrl, window.location.origin);
+            url.searchParams.set('q', query);
+            fetch(url, { signal: controller.signal })
+            .then(res => res.json())
+            .then(data => { if (data.success) render(data.results); })
+            .catch(() => {});
+        }
+
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(fetchSuggestions, 80);
+        });
+        input.addEventListener('keydown', event => {
+            if (event.key === 'ArrowDown') { event.preventDefault(); highlight(active + 1); }
+            else if (event.key === 'ArrowUp') { event.preventDefault(); highlight(active - 1); }
+            else if (event.key === 'Escape') close();
+            else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                window.location.href = list.querySelectorAll('[role="option"]')[active].href;
+            }
+        });
+        input.addEventListener('blur', () => setTimeout(close, 150));  // let a click on a suggestion land first
+    });
+})();
@@ -1,52 +1,39 @@
-import os
-import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse
-from django.conf import settings
-from django.utils.text import slugify
 
+from website.downloader import Downloader
 
-def download_image(img_url, local_dir):
-    try:
-        parsed_url = urlparse(img_url)
-        filename = os.path.basename(parsed_url.path)
-        name, ext = os.path.splitext(filename)
-        safe_filename = slugify(name) + ext
 
-        local_path = os.path.join(local_dir, safe_filename)
-        full_path = os.path.join(settings.MEDIA_ROOT, local_path)
+def _srcset_urls(srcset):
+    for part in srcset.split(","):
+        try:
+            url_part, _size = part.strip().rsplit(" ", 1)
+        except ValueError:
+            continue
+        yield url_part.strip()
 
-        if not os.path.exists(full_path):
-            response = requests.get(img_url, stream=True, timeout=10)
-            if response.status_code == 200:
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                with open(full_path, "wb") as f:
-                    for chunk in response.iter_content(1024):
-                        f.write(chunk)
-                print(f"✅ Downloaded: {img_url}")
-            else:
-                print(f"❌ Failed: {img_url} | {response.status_code}")
-                return None
 
-        return f"{settings.MEDIA_URL}{local_path}"
-    except Exception as e:
-        print(f"❌ Error downloading {img_url}: {e}")
-        return None
-
-
-def migrate_images_in_post(post):
+def migrate_images_in_post(post, downloader=None):
+    downloader = downloader or Downloader()
     soup = BeautifulSoup(post.content, "html.parser")
-    local_dir = f"uploads/post_images/{post.id}"
+    images = soup.find_all("img")
+
+    # Collect every remote URL first so they download concurrently.
+    urls = []
+    for img in images:
+        src = img.get("src")
+        if src and src.startswith("http"):
+            urls.append(src)
+        if img.get("srcset"):
+            urls.extend(_srcset_urls(img["srcset"]))
+    stored = downloader.fetch_many(urls)
     updated = False
 
-    for img in soup.find_all("img"):
+    for img in images:
         # --- Handle src ---
         src = img.get("src")
-        if src and src.startswith("http"):
-            new_src = download_image(src, local_dir)
-            if new_src:
-                img["src"] = new_src
-                updated = True
+        if src and stored.get(src):
+            img["src"] = downloader.url(stored[src])
+            updated = True
 
         # --- Handle srcset ---
         srcset = img.get("srcset")
@@ -55,11 +42,11 @@ def migrate_images_in_post(post):
             for part in srcset.split(","):
                 try:
                     url_part, size = part.strip().rsplit(" ", 1)
-                    new_url = download_image(url_part.strip(), local_dir)
-                    if new_url:
-                        new_srcset_list.append(f"{new_url} {size}")
                 except ValueError:
                     continue
+                name = stored.get(url_part.strip())
+                if name:
+                    new_srcset_list.append(f"{downloader.url(name)} {size}")
 
             if new_srcset_list:
                 img["srcset"] = ", ".join(new_srcset_list)
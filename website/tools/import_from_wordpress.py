@@ -1,143 +1,259 @@
+"""
+Import blog posts from a WordPress site's REST API.
+
+Run from the website/ directory:
+
+    python -m tools.import_from_wordpress
+    python -m tools.import_from_wordpress --modified-after 2025-08-01T00:00:00
+    python -m tools.import_from_wordpress --base-url http://127.0.0.1:8001/wp-json/wp/v2
+
+Every page of posts is requested with ``_embed`` so authors, categories,
+tags and featured media come back in the same response. Pages are fetched
+concurrently over one keep-alive ``requests.Session`` while the database
+writes stay in the main thread. A page's images are downloaded before its
+transaction opens, so each page is written in one short transaction. Finished
+page numbers are recorded in a checkpoint file, so an interrupted import
+resumes where it stopped. Posts are paged in ``id`` order, which keeps page
+boundaries stable while new posts are published. Images go through the
+shared downloader in website/downloader.py.
+"""
+import argparse
+import json
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
 import django
-import requests
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse
-from datetime import datetime
 
 # Setup Django
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "website.settings")  # replace with your project settings
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "website.dev")
 django.setup()
 
+from django.db import transaction
+
 from blog.models import Post, Author, Category, Tag
+from website.downloader import Downloader, make_session
+
+DEFAULT_BASE_URL = "https://bavaal.com/wp-json/wp/v2"
+DEFAULT_CHECKPOINT = ".wp_import_checkpoint.json"
+
+
+class WordPressClient:
+    def __init__(self, base_url, session, per_page=100):
+        self.base_url = base_url.rstrip("/")
+        self.session = session
+        self.per_page = per_page
+
+    def fetch_posts_page(self, page, modified_after=None):
+        """Return (posts, total_pages) for one page of /posts with embedded relations."""
+        params = {
+            "_embed": 1,
+            "per_page": self.per_page,
+            "page": page,
+            "orderby": "id",
+            "order": "asc",
+        }
+        if modified_after:
+            params["modified_after"] = modified_after
+        response = self.session.get(f"{self.base_url}/posts", params=params, timeout=30)
+        # WordPress answers 400 for a page number past the end.
+        if response.status_code == 400:
+            return [], 0
+        response.raise_for_status()
+        return response.json(), int(response.headers.get("X-WP-TotalPages", 1))
 
 
-def download_image(url, save_path):
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            if not default_storage.exists(save_path):
-                default_storage.save(save_path, ContentFile(response.content))
-            return default_storage.url(save_path)
-    except Exception as e:
-        print(f"Error downloading image {url}: {e}")
-    return url  # fallback to original
+class Checkpoint:
+    """Set of imported page numbers, persisted after every page."""
 
+    def __init__(self, path, run_key, resume=True):
+        self.path = path
+        self.run_key = run_key
+        self.done = set()
+        if resume and path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            # A checkpoint from an import with other options doesn't apply.
+            if state.get("run_key") == run_key:
+                self.done = set(state.get("done_pages", []))
 
-def download_and_replace_images(content, post_slug):
+    def mark_done(self, page):
+        self.done.add(page)
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"run_key": self.run_key, "done_pages": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def parse_content(content):
+    """The post body's soup and its <img> tags that have a src."""
     soup = BeautifulSoup(content, 'html.parser')
-    for img in soup.find_all('img'):
-        src = img.get('src')
-        if not src:
-            continue
-
-        try:
-            filename = os.path.basename(urlparse(src).path)
-            local_path = f"post_images/{post_slug}/{filename}"
-            new_url = download_image(src, local_path)
-            img['src'] = new_url
-        except Exception as e:
-            print(f"Failed to process image {src}: {e}")
-            continue
+    return soup, [img for img in soup.find_all('img') if img.get('src')]
+
 
+def replace_images(downloader, soup, images, stored):
+    """Point each image at its stored copy; images that failed keep the original URL."""
+    for img in images:
+        name = stored.get(img['src'])
+        if name:
+            img['src'] = downloader.url(name)
     return str(soup)
 
 
-def get_or_create_author(author_data):
-    author, _ = Author.objects.get_or_create(
-        wp_id=author_data["id"],
-        defaults={"name": author_data["name"], "slug": author_data["slug"]}
-    )
-    return author
+def featured_image_url(post_data):
+    media = (post_data.get("_embedded", {}).get("wp:featuredmedia") or [None])[0]
+    return media.get("source_url") if media else None
 
 
-def get_or_create_category(cat_data):
-    category, _ = Category.objects.get_or_create(
-        wp_id=cat_data["id"],
-        defaults={"name": cat_data["name"], "slug": cat_data["slug"]}
-    )
-    return category
-
-
-def get_or_create_tags(tag_ids):
-    tag_objs = []
-    for tag_id in tag_ids:
-        res = requests.get(f"https://bavaal.com/wp-json/wp/v2/tags/{tag_id}")
-        if res.status_code == 200:
-            tag_data = res.json()
-            tag, _ = Tag.objects.get_or_create(
-                wp_id=tag_data["id"],
-                defaults={"name": tag_data["name"], "slug": tag_data["slug"]}
+def parse_wp_date(value):
+    """WordPress *_gmt fields are naive UTC timestamps."""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=dt_timezone.utc)
+
+
+class Importer:
+    def __init__(self, downloader):
+        self.downloader = downloader
+        # In-process caches keyed by WordPress id, seeded from the database once.
+        self.authors = {a.wp_id: a for a in Author.objects.all()}
+        self.categories = {c.wp_id: c for c in Category.objects.all()}
+        self.tags = {t.wp_id: t for t in Tag.objects.all()}
+
+    def _cached(self, cache, model, data):
+        obj = cache.get(data["id"])
+        if obj is None:
+            obj, _ = model.objects.get_or_create(
+                wp_id=data["id"],
+                defaults={"name": data["name"], "slug": data["slug"]},
             )
-            tag_objs.append(tag)
-    return tag_objs
+            cache[data["id"]] = obj
+        return obj
+
+    def import_post(self, post_data, content, stored):
+        """Write one post. ``content`` has its images replaced already; ``stored`` maps URLs to stored names."""
+        embedded = post_data.get("_embedded", {})
+
+        # Author
+        author = None
+        author_data = (embedded.get("author") or [None])[0]
+        if author_data and "id" in author_data:
+            author = self._cached(self.authors, Author, author_data)
+
+        # Categories and tags arrive as one list of terms per taxonomy.
+        categories, tags = [], []
+        for term in (t for group in embedded.get("wp:term", []) for t in group):
+            if term.get("taxonomy") == "category":
+                categories.append(self._cached(self.categories, Category, term))
+            elif term.get("taxonomy") == "post_tag":
+                tags.append(self._cached(self.tags, Tag, term))
+
+        post = Post.objects.filter(wp_id=post_data["id"]).first() or Post(wp_id=post_data["id"])
+        created = post.pk is None
+        post.title = post_data["title"]["rendered"]
+        post.slug = post_data["slug"]
+        post.content = content
+        post.excerpt = post_data["excerpt"]["rendered"]
+        post.author = author
+
+        # Featured Image
+        featured_url = featured_image_url(post_data)
+        if featured_url:
+            if stored.get(featured_url):
+                post.featured_image = stored[featured_url]
+            else:
+                print(f"Featured image skipped: {featured_url}")
+
+        post.save()
+
+        # published_date is auto_now_add, so save() ignores it; set it directly.
+        Post.objects.filter(pk=post.pk).update(published_date=parse_wp_date(post_data["date_gmt"]))
+
+        post.categories.set(categories)
+        post.tags.set(tags)
+        return created
 
+    def import_page(self, posts):
+        # Download every image of the page first, outside the transaction, so
+        # the writes below hold the SQLite write lock only for the inserts.
+        parsed = [parse_content(post_data["content"]["rendered"]) for post_data in posts]
+        urls = [img['src'] for _, images in parsed for img in images]
+        urls += [featured_image_url(post_data) for post_data in posts]
+        stored = self.downloader.fetch_many(urls)
+
+        created = 0
+        with transaction.atomic():
+            for post_data, (soup, images) in zip(posts, parsed):
+                print(f"Importing: {post_data['title']['rendered']}")
+                content = replace_images(self.downloader, soup, images, stored)
+                created += self.import_post(post_data, content, stored)
+        return created
+
+
+def iter_pages(client, pages, first_page, modified_after, workers):
+    """Yield (page, posts) in page order while up to 2*workers fetches run ahead."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for page in pages:
+            future = None if page == 1 else pool.submit(client.fetch_posts_page, page, modified_after)
+            in_flight.append((page, future))
+            if len(in_flight) >= workers * 2:
+                page, future = in_flight.popleft()
+                yield page, first_page if future is None else future.result()[0]
+        while in_flight:
+            page, future = in_flight.popleft()
+            yield page, first_page if future is None else future.result()[0]
+
+
+def import_posts(base_url=DEFAULT_BASE_URL, modified_after=None, workers=4, per_page=100,
+                 checkpoint_path=DEFAULT_CHECKPOINT, resume=True):
+    session = make_session(pool_size=workers)
+    client = WordPressClient(base_url, session, per_page=per_page)
+    importer = Importer(Downloader(workers=workers * 2))
+    checkpoint = Checkpoint(checkpoint_path, run_key=f"{base_url}|{modified_after}|{per_page}", resume=resume)
 
-def import_posts():
     print("Fetching posts...")
-    page = 1
-    while True:
-        response = requests.get(f"https://bavaal.com/wp-json/wp/v2/posts?per_page=10&page={page}")
-        if response.status_code != 200:
-            break
-
-        posts = response.json()
-        if not posts:
-            break
-
-        for post_data in posts:
-            print(f"Importing: {post_data['title']['rendered']}")
-
-            # Author
-            author_data = requests.get(f"https://bavaal.com/wp-json/wp/v2/users/{post_data['author']}").json()
-            author = get_or_create_author(author_data)
-
-            # Category
-            category = None
-            if post_data["categories"]:
-                cat_data = requests.get(f"https://bavaal.com/wp-json/wp/v2/categories/{post_data['categories'][0]}").json()
-                category = get_or_create_category(cat_data)
-
-            # Content
-            raw_content = post_data["content"]["rendered"]
-            updated_content = download_and_replace_images(raw_content, post_data["slug"])
-
-            # Featured Image
-            featured_image_url = None
-            if post_data.get("featured_media"):
-                media_data = requests.get(f"https://bavaal.com/wp-json/wp/v2/media/{post_data['featured_media']}").json()
-                featured_image_url = media_data.get("source_url")
-
-            post, created = Post.objects.get_or_create(
-                wp_id=post_data["id"],
-                defaults={
-                    "title": post_data["title"]["rendered"],
-                    "slug": post_data["slug"],
-                    "content": updated_content,
-                    "excerpt": post_data["excerpt"]["rendered"],
-                    "author": author,
-                    "published_date": datetime.strptime(post_data["date"], "%Y-%m-%dT%H:%M:%S"),
-                },
-            )
+    first_page, total_pages = client.fetch_posts_page(1, modified_after)
+    pages = [p for p in range(1, total_pages + 1) if p not in checkpoint.done]
+    if checkpoint.done:
+        print(f"Resuming: {len(checkpoint.done)} of {total_pages} page(s) already imported.")
 
-            if created and category:
-                post.categories.set([category])
+    imported = created = 0
+    # Fetching runs in worker threads; all database writes happen here, one transaction per page.
+    for page, posts in iter_pages(client, pages, first_page, modified_after, workers):
+        created += importer.import_page(posts)
+        imported += len(posts)
+        checkpoint.mark_done(page)
 
-            if featured_image_url:
-                filename = os.path.basename(urlparse(featured_image_url).path)
-                save_path = f"featured_images/{post.slug}/{filename}"
-                new_img_url = download_image(featured_image_url, save_path)
-                post.featured_image = save_path
+    checkpoint.clear()
+    print(f"Import complete: {imported} post(s), {created} new.")
 
-            post.content = updated_content
-            post.save()
 
-            # Tags
-            tags = get_or_create_tags(post_data["tags"])
-            post.tags.set(tags)
+def main():
+    parser = argparse.ArgumentParser(description="Import posts from the WordPress REST API.")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="WordPress REST root, e.g. https://site/wp-json/wp/v2")
+    parser.add_argument("--modified-after", help="Only posts modified after this ISO 8601 timestamp")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent page fetches")
+    parser.add_argument("--per-page", type=int, default=100, help="Posts per API page (WordPress caps this at 100)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file used to resume")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    import_posts(
+        base_url=args.base_url,
+        modified_after=args.modified_after,
+        workers=args.workers,
+        per_page=args.per_page,
+        checkpoint_path=args.checkpoint,
+        resume=not args.no_resume,
+    )
 
-        page += 1
 
-    print("Import complete.")
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,12 @@
-import os
-import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse
 from django.utils.text import slugify
-from django.conf import settings
 from webstory.models import WebStory, WebStoryImage
+from website.downloader import Downloader, DownloadError
 
 
-def download_image(img_url, slug, subfolder="images"):
-    try:
-        parsed = urlparse(img_url)
-        filename = os.path.basename(parsed.path)
-        name, ext = os.path.splitext(filename)
-        safe_filename = slugify(name) + ext
-
-        local_dir = f"webstories/{slug}/{subfolder}"
-        local_path = os.path.join(local_dir, safe_filename)
-        full_path = os.path.join(settings.MEDIA_ROOT, local_path)
-
-        if not os.path.exists(full_path):
-            r = requests.get(img_url, stream=True, timeout=10)
-            if r.status_code == 200:
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                with open(full_path, "wb") as f:
-                    for chunk in r.iter_content(1024):
-                        f.write(chunk)
-        return f"{settings.MEDIA_URL}{local_path}", local_path
-    except Exception as e:
-        print(f"Failed to download image: {img_url} => {e}")
-        return None, None
-
-
-def import_webstory_from_url(url):
-    resp = requests.get(url)
+def import_webstory_from_url(url, downloader=None):
+    downloader = downloader or Downloader()
+    resp = downloader.session.get(url, timeout=20)
     if resp.status_code != 200:
         print(f"Failed to fetch page: {url}")
         return
@@ -48,9 +22,12 @@ def import_webstory_from_url(url):
 
     # Cover image
     poster_img_url = story_tag.get("poster-portrait-src")
-    local_cover_url, cover_path = None, None
+    cover_path = None
     if poster_img_url:
-        local_cover_url, cover_path = download_image(poster_img_url, slug, "cover")
+        try:
+            cover_path = downloader.fetch(poster_img_url)
+        except DownloadError as e:
+            print(f"Failed to download cover: {e}")
 
     # Save or update WebStory
     story_obj, created = WebStory.objects.update_or_create(
@@ -69,15 +46,16 @@ def import_webstory_from_url(url):
         story_obj.images.all().delete()
 
     # Replace all amp-img with local and store info
-    for i, img_tag in enumerate(story_tag.find_all("amp-img")):
-        src = img_tag.get("src")
-        if not src or not src.startswith("http"):
-            continue
-
-        local_src, relative_path = download_image(src, slug)
-        if local_src:
+    amp_images = [
+        img_tag for img_tag in story_tag.find_all("amp-img")
+        if (img_tag.get("src") or "").startswith("http")
+    ]
+    stored = downloader.fetch_many(img_tag["src"] for img_tag in amp_images)
+    for i, img_tag in enumerate(amp_images):
+        relative_path = stored.get(img_tag["src"])
+        if relative_path:
             # Replace in HTML
-            img_tag["src"] = local_src
+            img_tag["src"] = downloader.url(relative_path)
 
             # Save image record
             WebStoryImage.objects.create(
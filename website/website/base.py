@@ -1,3 +1,4 @@
+from datetime import timedelta
 from pathlib import Path
 import os
 from dotenv import load_dotenv
@@ -92,6 +93,18 @@ DATABASES = {
     }
 }
 
+# One cache shared by every gunicorn worker, the ASGI app and management
+# commands, so a cache.delete() anywhere (facet counts, unread counts) is
+# seen everywhere. Files need no extra service; the directory must be
+# writable by the service user.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_ROOT', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,6 +156,87 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media') # This will be E:\projectbavaal\web
 
 CKEDITOR_UPLOAD_PATH = "uploads/"
 
+# Posts per page on the keyset-paginated blog lists
+BLOG_POSTS_PER_PAGE = 12
+
+# Community threads on an influencer profile (influencer/community.py): top-level
+# posts per page, replies previewed under each, replies per "show more" click
+COMMUNITY_THREADS_PER_PAGE = 20
+COMMUNITY_REPLY_PREVIEW = 2
+COMMUNITY_REPLIES_PER_PAGE = 20
+
+# Live community posts over SSE (influencer/live.py). Off by default: turn it
+# on only with the ASGI service routed in nginx and COMMUNITY_LIVE_BROKER set
+# to 'influencer.live.RedisBroker' (InMemoryBroker only reaches streams in the
+# publishing process, so streams stay off with it).
+COMMUNITY_LIVE_ENABLED = os.environ.get('COMMUNITY_LIVE_ENABLED', '').lower() in ('1', 'true', 'yes')
+COMMUNITY_LIVE_BROKER = os.environ.get('COMMUNITY_LIVE_BROKER', 'influencer.live.InMemoryBroker')
+COMMUNITY_LIVE_REDIS_URL = os.environ.get('COMMUNITY_LIVE_REDIS_URL', 'redis://localhost:6379/0')
+COMMUNITY_LIVE_QUEUE_SIZE = 100         # undelivered messages kept per stream
+COMMUNITY_LIVE_KEEPALIVE_SECONDS = 25   # comment line sent on idle streams
+COMMUNITY_LIVE_RETRY_MS = 5000          # EventSource reconnect delay
+
+# /influencers/ directory (influencer/directory.py): cards per page, and a
+# backstop expiry for the facet counts (they are dropped from the shared
+# cache on every change, by whichever process made it)
+INFLUENCER_DIRECTORY_PER_PAGE = 24
+INFLUENCER_FACETS_CACHE_SECONDS = 60 * 60 * 24
+
+# Reply notifications (influencer/notifications.py): list page size, and a
+# backstop expiry for a user's cached unread count (it is dropped from the
+# shared cache, see CACHES, when the reply or mark-read commits)
+NOTIFICATIONS_PER_PAGE = 20
+NOTIFICATION_COUNT_CACHE_SECONDS = 300
+
+# Part of every ETag (website/conditional.py); bump after template changes
+# so crawlers re-fetch pages whose content didn't change.
+CONDITIONAL_GET_VERSION = 1
+
+# Static sitemaps written by `manage.py build_sitemaps` (website/sitemap_files.py)
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITE_URL = os.environ.get("SITE_URL", "https://bavaal.com")
+
+# Header search typeahead (website/suggest.py): where the mmapped index and
+# its delta log live (a directory shared by every worker), suggestions per
+# kind, and how large the delta log grows before a background rebuild
+SUGGEST_ROOT = os.path.join(BASE_DIR, 'suggest')
+SUGGEST_LIMIT_PER_KIND = 5
+SUGGEST_DELTA_MAX_BYTES = 256 * 1024
+
+# Resized images (website/thumbnails.py). THUMBNAIL_URL must map to
+# THUMBNAIL_ROOT in nginx, falling back to Django on a miss (README.txt).
+THUMBNAIL_ROOT = os.path.join(MEDIA_ROOT, 'thumbs')
+THUMBNAIL_URL = MEDIA_URL + 'thumbs/'
+THUMBNAIL_FORMAT = 'webp'
+THUMBNAIL_QUALITY = {'webp': 80, 'avif': 60, 'jpg': 82}
+THUMBNAIL_MAX_SIZE = 2400
+THUMBNAIL_CACHE_SECONDS = 30 * 24 * 3600
+
+# Batch scraping (influencer/scraping.py): worker threads and a request budget
+# per platform, and how many scraped results are written per transaction
+SCRAPE_PLATFORMS = {
+    'instagram': {'workers': 2, 'per_minute': 20},
+    'youtube': {'workers': 4, 'per_minute': 60},
+    'twitter': {'workers': 2, 'per_minute': 30},
+}
+SCRAPE_WRITE_BATCH = 50
+
+# Scheduled refreshes (influencer/refresh.py, `manage.py refresh_worker`):
+# the worker's overall request budget, how long a successful fetch stays
+# fresh, the retry backoff after failures (doubling from BASE up to MAX),
+# and how profile views weight the queue. Never-fetched profiles rank as if
+# NEVER_FETCHED_AGE stale; POPULARITY_PRIOR views are added to every profile
+# so quiet ones still age into the queue. View counts are buffered per
+# process for VIEW_FLUSH_SECONDS and halved every VIEW_HALF_LIFE.
+REFRESH_REQUESTS_PER_MINUTE = 30
+REFRESH_INTERVAL = timedelta(hours=24)
+REFRESH_RETRY_BASE = timedelta(minutes=30)
+REFRESH_RETRY_MAX = timedelta(days=7)
+REFRESH_NEVER_FETCHED_AGE = timedelta(days=30)
+REFRESH_POPULARITY_PRIOR = 10
+REFRESH_VIEW_FLUSH_SECONDS = 60
+REFRESH_VIEW_HALF_LIFE = timedelta(days=7)
+
 
 # CKEditor 5 Configuration (ADD THIS ENTIRE DICTIONARY)
 CKEDITOR_5_CONFIGS = {
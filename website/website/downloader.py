@@ -0,0 +1,188 @@
+"""
+Concurrent media downloader with a content-addressed store.
+
+Every import tool fetches remote images through this module. Downloads
+share one pooled keep-alive session, run on a bounded thread pool and are
+streamed to a temporary file while being hashed with SHA-256. The result is
+stored once under ``MEDIA_ROOT/downloads/<aa>/<bb>/<sha256><ext>``: bytes
+that were already downloaded (from any URL, by any tool) resolve to the
+existing file instead of another ``_ENShxhA``-style copy.
+
+Files in the store can be referenced by many rows, so code that deletes
+media on replace/delete must leave them alone; see ``is_shared_file()``.
+
+    downloader = Downloader(workers=8)
+    name = downloader.fetch(url)               # storage name, raises DownloadError
+    names = downloader.fetch_many(urls)        # {url: name or None}
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_DIR = 'downloads'
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Raster types only, each stored under a fixed extension. SVG (or anything
+# else a browser may run script in) is never stored: the files are served
+# from MEDIA_URL on the site's own origin.
+_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/avif': '.avif',
+    'image/bmp': '.bmp',
+    'image/tiff': '.tif',
+    'image/x-icon': '.ico',
+    'image/vnd.microsoft.icon': '.ico',
+}
+ALLOWED_CONTENT_TYPES = tuple(_EXTENSIONS)
+
+_RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class DownloadError(Exception):
+    """A URL could not be downloaded or its response was rejected."""
+
+
+def make_session(pool_size=8, retries=3, backoff=0.5):
+    """A keep-alive session with a connection pool and retries on transient errors."""
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET', 'HEAD'),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = 'bavaal-importer/1.0'
+    return session
+
+
+def is_shared_file(name):
+    """True for files in the content-addressed store, which may be referenced by many rows."""
+    return bool(name) and name.replace(os.sep, '/').startswith(f'{DOWNLOAD_DIR}/')
+
+
+class Downloader:
+    def __init__(self, workers=8, session=None, max_bytes=MAX_DOWNLOAD_BYTES,
+                 content_types=ALLOWED_CONTENT_TYPES, retries=3, backoff=0.5, timeout=20):
+        self.workers = workers
+        self.session = session or make_session(pool_size=workers, retries=retries, backoff=backoff)
+        self.max_bytes = max_bytes
+        self.content_types = content_types
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # url -> storage name for this run, so repeated URLs are fetched once.
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def url(name):
+        return f'{settings.MEDIA_URL}{name}'
+
+    def fetch(self, url):
+        """Download ``url`` into the store and return its storage name."""
+        with self._lock:
+            if url in self._seen:
+                return self._seen[url]
+
+        # The session's Retry covers connect errors and 429/5xx responses;
+        # this loop also retries connections that drop mid-body.
+        for attempt in range(self.retries + 1):
+            try:
+                name = self._download(url)
+                break
+            except _RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    raise DownloadError(f'{url}: {e}') from e
+                time.sleep(self.backoff * 2 ** attempt)
+            except requests.RequestException as e:
+                raise DownloadError(f'{url}: {e}') from e
+
+        with self._lock:
+            self._seen[url] = name
+        return name
+
+    def fetch_many(self, urls):
+        """Download ``urls`` concurrently; return {url: storage name, or None on failure}."""
+        unique = list(dict.fromkeys(u for u in urls if u))
+        results = {}
+
+        def fetch_one(url):
+            try:
+                return url, self.fetch(url)
+            except DownloadError as e:
+                logger.warning("Download failed: %s", e)
+                return url, None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for url, name in pool.map(fetch_one, unique):
+                results[url] = name
+        return results
+
+    def _download(self, url):
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            if response.status_code != 200:
+                raise DownloadError(f'{url}: HTTP {response.status_code}')
+
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if self.content_types and content_type not in self.content_types:
+                raise DownloadError(f'{url}: unexpected content type {content_type or "(none)"}')
+
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                raise DownloadError(f'{url}: {length} bytes exceeds the {self.max_bytes} byte limit')
+
+            store_root = os.path.join(settings.MEDIA_ROOT, DOWNLOAD_DIR)
+            os.makedirs(store_root, exist_ok=True)
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp_path = tempfile.mkstemp(dir=store_root, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise DownloadError(f'{url}: body exceeds the {self.max_bytes} byte limit')
+                        digest.update(chunk)
+                        f.write(chunk)
+                if not size:
+                    raise DownloadError(f'{url}: empty response')
+
+                sha = digest.hexdigest()
+                ext = _EXTENSIONS.get(content_type, '')
+                name = f'{DOWNLOAD_DIR}/{sha[:2]}/{sha[2:4]}/{sha}{ext}'
+                full_path = os.path.join(settings.MEDIA_ROOT, name)
+                if os.path.exists(full_path):
+                    os.remove(tmp_path)  # same bytes already stored
+                else:
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    # mkstemp's 0600 would hide the file from nginx (another user).
+                    os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+                    os.replace(tmp_path, full_path)
+                return name
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
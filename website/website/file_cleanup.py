@@ -0,0 +1,67 @@
+"""
+Deferred deletion of replaced or orphaned media files.
+
+Deleting a file inside save() or a post_delete receiver has two problems.
+It runs before the transaction commits, so a rollback leaves the row
+pointing at a file that is already gone. It also makes the request wait on
+the storage backend.
+
+delete_on_commit() queues the deletion for after the surrounding
+transaction commits (and drops it on rollback). A single background thread
+then works through the queue. Files in the shared download store
+(website/downloader.py) are never deleted, since other rows may use them.
+Cached resized copies (website/thumbnails.py) go with the original. The
+queue is drained at interpreter exit, so management commands don't leave
+files behind.
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from django.db import transaction
+
+from .downloader import is_shared_file
+from .thumbnails import purge as purge_thumbnails
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def delete_on_commit(field_file):
+    """Delete ``field_file``'s file from its storage once the current transaction commits."""
+    name = getattr(field_file, 'name', None)
+    if not name or is_shared_file(name):
+        return
+    storage = field_file.storage
+    transaction.on_commit(lambda: _enqueue(storage, name))
+
+
+def _enqueue(storage, name):
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_work, name='file-cleanup', daemon=True)
+            _worker.start()
+            atexit.register(flush)
+    _queue.put((storage, name))
+
+
+def _work():
+    while True:
+        storage, name = _queue.get()
+        try:
+            storage.delete(name)  # a file that is already gone is not an error
+            purge_thumbnails(name)
+        except Exception:
+            logger.exception('Could not delete %s', name)
+        finally:
+            _queue.task_done()
+
+
+def flush():
+    """Block until every queued deletion has run."""
+    _queue.join()
@@ -0,0 +1,102 @@
+"""
+Intrinsic size, dominant colour and a blurred placeholder for uploaded images.
+
+Models with images carry an ``image_meta`` JSONField and list the image
+fields it covers in ``IMAGE_META_FIELDS``. It maps each field name to
+
+    {'name': 'influencers/profile_pics/x.jpg', 'w': 1080, 'h': 1350,
+     'color': '#a35c41', 'lqip': 'data:image/webp;base64,...'}
+
+``name`` is the file the entry was computed from. An entry whose name no
+longer matches the field is stale. A post_save receiver in blog/signals.py
+calls refresh() after every save that may have changed an image, so uploads
+and imports are covered. ``manage.py backfill_image_meta`` fills in older
+rows and rows written with bulk_create()/update().
+
+Templates read these values through the ``{% thumbnail %}`` tag
+(influencer/templatetags/thumbnails.py), which emits width/height and a
+placeholder background without opening any file.
+"""
+import base64
+import io
+
+from PIL import Image, ImageOps
+
+LQIP_SIZE = 16       # longest side of the placeholder, in pixels
+LQIP_QUALITY = 40
+DRAFT_SIZE = 64      # JPEGs are decoded at the smallest 1/2^n scale at least this big
+
+
+def read_meta(src_file):
+    """
+    Measure the image in ``src_file`` (a path or file object). A plain
+    function, so backfill_image_meta can fan it out over a process pool.
+    """
+    with Image.open(src_file) as img:
+        width, height = img.size
+        # EXIF-rotated photos are displayed (and resized) the other way round.
+        if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        img.draft('RGB', (DRAFT_SIZE, DRAFT_SIZE))
+        small = ImageOps.exif_transpose(img).convert('RGB')
+        small.thumbnail((LQIP_SIZE, LQIP_SIZE), Image.Resampling.BOX)
+
+    red, green, blue = small.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    buffer = io.BytesIO()
+    small.save(buffer, format='WEBP', quality=LQIP_QUALITY)
+    return {
+        'w': width,
+        'h': height,
+        'color': f'#{red:02x}{green:02x}{blue:02x}',
+        'lqip': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+    }
+
+
+def stale_fields(instance):
+    """The instance's image fields whose metadata is missing or describes another file."""
+    meta = instance.image_meta or {}
+    return [
+        field_name for field_name in instance.IMAGE_META_FIELDS
+        if (getattr(instance, field_name).name or '') != meta.get(field_name, {}).get('name', '')
+    ]
+
+
+def compute(instance, field_names):
+    """
+    ``instance.image_meta`` with the entries of ``field_names`` recomputed
+    from storage. An empty field has no entry; an unreadable file has only
+    its name.
+    """
+    meta = dict(instance.image_meta or {})
+    for field_name in field_names:
+        field_file = getattr(instance, field_name)
+        meta.pop(field_name, None)
+        if not field_file:
+            continue
+        try:
+            with field_file.storage.open(field_file.name) as src:
+                meta[field_name] = {'name': field_file.name, **read_meta(src)}
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Missing file or not an image: remember that, so every save
+            # doesn't retry it. Templates fall back to no dimensions.
+            meta[field_name] = {'name': field_file.name}
+    return meta
+
+
+def refresh(instance):
+    """
+    Bring a saved instance's ``image_meta`` up to date, writing it with an
+    UPDATE (no save() or signals, updated_at untouched). Returns True if it changed.
+    """
+    field_names = stale_fields(instance)
+    if not field_names:
+        return False
+    meta = compute(instance, field_names)
+    if meta == (instance.image_meta or {}):
+        return False
+    type(instance)._default_manager.filter(pk=instance.pk).update(image_meta=meta)
+    instance.image_meta = meta
+    stored = getattr(instance, '_stored_values', None)
+    if stored is not None:
+        stored['image_meta'] = meta  # Influencer's change tracking: this is what the row holds now
+    return True
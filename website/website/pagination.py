@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination shared by the list views.
+
+Pages are cut on an ordering column plus ``id`` as a tie-breaker, so each
+page is a single indexed range scan: no OFFSET and no COUNT(*).
+The cursor handed to the client is an opaque, URL-safe token that
+encodes the (value, id) pair of the last row on the previous page. Cursors
+come from the query string, so any token that isn't exactly such a pair of
+the ordering column's type is rejected with ValueError.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def encode_cursor(value, pk):
+    """Pack an (ordering value, id) pair into a URL-safe token."""
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Unpack a token made by encode_cursor() into ``(value, pk)``: ``value`` is
+    a str, an int or None and ``pk`` an int. Raises ValueError on anything else.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        decoded = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {token!r}") from exc
+    if not isinstance(decoded, list) or len(decoded) != 2:
+        raise ValueError(f"Invalid cursor: {token!r}")
+    value, pk = decoded
+    # bool is an int subclass; neither it nor floats, lists or dicts come from encode_cursor().
+    if type(pk) is not int or not (value is None or type(value) in (str, int)):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return value, pk
+
+
+def _cursor_value(model_field, value):
+    """A decoded cursor value as ``model_field``'s Python type. Raises ValueError."""
+    if value is None:
+        return None
+    if isinstance(model_field, models.DateTimeField):
+        if not isinstance(value, str):
+            raise ValueError(f"Invalid cursor value: {value!r}")
+        value = datetime.datetime.fromisoformat(value)
+        return timezone.make_aware(value) if timezone.is_naive(value) else value
+    if isinstance(model_field, models.IntegerField) and type(value) is not int:
+        raise ValueError(f"Invalid cursor value: {value!r}")
+    try:
+        return model_field.to_python(value)
+    except ValidationError as exc:
+        raise ValueError(f"Invalid cursor value: {value!r}") from exc
+
+
+def keyset_page(queryset, field, cursor=None, per_page=12):
+    """
+    Return ``(items, next_cursor)`` for one descending page of ``queryset``.
+
+    ``field`` is the ordering column; rows are ordered by ``-field, -id``.
+    NULLs in ``field`` sort last. ``next_cursor`` is None on the last page.
+    """
+    model_field = queryset.model._meta.get_field(field)
+    nullable = model_field.null
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        value = _cursor_value(model_field, value)
+        if value is None:
+            queryset = queryset.filter(**{f'{field}__isnull': True, 'id__lt': pk})
+        else:
+            # "field <= value" gives SQLite an index range to seek into; the
+            # OR only has to sort out rows that tie on the ordering value.
+            after = Q(**{f'{field}__lte': value}) & (
+                Q(**{f'{field}__lt': value}) | Q(id__lt=pk)
+            )
+            if nullable:
+                after |= Q(**{f'{field}__isnull': True})
+            queryset = queryset.filter(after)
+
+    ordering = F(field).desc(nulls_last=True) if nullable else f'-{field}'
+    # Fetch one extra row to learn whether another page exists.
+    rows = list(queryset.order_by(ordering, '-id')[:per_page + 1])
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
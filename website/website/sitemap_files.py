@@ -0,0 +1,221 @@
+"""
+Pre-generated sitemap files.
+
+``python manage.py build_sitemaps`` writes every sitemap section to
+SITEMAP_ROOT as ``<section>-sitemap.xml`` plus a gzip copy, and a
+``sitemap_index.xml`` listing them, so nginx can serve crawler traffic
+straight from disk:
+
+    location ~ ^/(sitemap_index|[a-z]+-sitemap[0-9]*)\\.xml$ {
+        root /path/to/website/sitemaps;
+        gzip_static on;
+        try_files $uri @django;   # fall back to the dynamic views
+    }
+
+Rows are streamed with values_list(), never as model instances. A section
+with more than MAX_URLS_PER_FILE URLs is split into ``post-sitemap.xml``,
+``post-sitemap2.xml``, ...
+
+Saves and deletes only drop a marker file for their section when they
+commit (mark_dirty()); the command, run from cron, rebuilds just the marked
+sections and the index.
+"""
+import gzip
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils.encoding import iri_to_uri
+
+MAX_URLS_PER_FILE = 50_000
+SECTION_NAMES = ('post', 'category', 'webstory', 'profiles', 'pages')
+# The column each section's <lastmod> comes from
+LASTMOD_FIELDS = {'post': 'modified_date', 'category': 'updated_at', 'webstory': 'updated_at', 'profiles': 'updated_at'}
+
+MANIFEST_NAME = 'sitemaps.json'
+DIRTY_DIR = '.dirty'
+
+_URLSET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<?xml-stylesheet type="text/xsl" href="/static/sitemap.xsl"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+_INDEX_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<?xml-stylesheet type="text/xsl" href="/static/sitemap_index.xsl"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+
+
+def _root():
+    return settings.SITEMAP_ROOT
+
+
+def _marker(section):
+    return os.path.join(_root(), DIRTY_DIR, section)
+
+
+def mark_dirty(section):
+    """
+    Flag a section for the next build. Cheap enough to call from any save().
+    The marker is touched after commit: a build between the touch and the
+    commit would clear it while still reading the old rows.
+    """
+    transaction.on_commit(lambda: _touch(_marker(section)))
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a'):
+        os.utime(path)
+
+
+def section_version(section):
+    """
+    Changes whenever ``section`` is marked dirty or any build finishes: the
+    dirty marker's and the manifest's mtimes (0 when missing). Two stat()
+    calls, so conditional GETs of the sitemaps can use it instead of
+    counting rows to notice deletions (which mark the section dirty).
+    """
+    version = []
+    for path in (_marker(section), os.path.join(_root(), MANIFEST_NAME)):
+        try:
+            version.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            version.append(0)
+    return tuple(version)
+
+
+def _read_manifest():
+    try:
+        with open(os.path.join(_root(), MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def dirty_sections():
+    """Sections marked dirty, plus any that were never built."""
+    manifest = _read_manifest()
+    return [s for s in SECTION_NAMES if s not in manifest or os.path.exists(_marker(s))]
+
+
+def _rows(section):
+    """Yield (path, lastmod) for every URL of a section, straight from values_list()."""
+    from blog.models import Category, Post
+    from influencer.models import Influencer
+    from webstory.models import WebStory
+    from .sitemaps import StaticSitemap
+
+    if section == 'pages':
+        sitemap = StaticSitemap()
+        for item in sitemap.items():
+            yield sitemap.location(item), None
+        return
+
+    model, url_name = {
+        'post': (Post, 'blog_detail'),
+        'category': (Category, 'category_detail'),
+        'webstory': (WebStory, 'webstory_detail'),
+        'profiles': (Influencer, 'profile_detail'),
+    }[section]
+    lastmod_field = LASTMOD_FIELDS[section]
+    # Reverse once and fill in slugs, instead of a reverse() per row.
+    placeholder = 'SLUG-PLACEHOLDER'
+    pattern = reverse(url_name, kwargs={'slug': placeholder})
+    prefix, suffix = pattern.split(placeholder)
+    rows = model.objects.order_by('id').values_list('slug', lastmod_field)
+    for slug, lastmod in rows.iterator(chunk_size=2000):
+        yield iri_to_uri(f'{prefix}{slug}{suffix}'), lastmod  # as reverse() would quote it
+
+
+def _write(name, text):
+    """Atomically write ``name`` and ``name.gz`` under SITEMAP_ROOT."""
+    path = os.path.join(_root(), name)
+    data = text.encode('utf-8')
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(data)
+    # mtime=0 keeps the .gz byte-identical when the content is.
+    with open(f'{path}.gz.tmp', 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+        gz.write(data)
+    os.replace(f'{path}.gz.tmp', f'{path}.gz')
+    os.replace(f'{path}.tmp', path)
+
+
+def _file_name(section, number):
+    return f'{section}-sitemap.xml' if number == 1 else f'{section}-sitemap{number}.xml'
+
+
+def build_section(section, base_url):
+    """Write one section's file(s). Returns [(file name, latest lastmod or None), ...]."""
+    files = []
+    chunk, latest = [], None
+
+    def flush():
+        name = _file_name(section, len(files) + 1)
+        _write(name, _URLSET_HEAD + ''.join(chunk) + '</urlset>\n')
+        files.append((name, latest.isoformat() if latest else None))
+
+    for path, lastmod in _rows(section):
+        entry = f'<url><loc>{escape(base_url + path)}</loc>'
+        if lastmod:
+            entry += f'<lastmod>{lastmod.isoformat()}</lastmod>'
+            latest = max(latest, lastmod) if latest else lastmod
+        chunk.append(entry + '</url>\n')
+        if len(chunk) == MAX_URLS_PER_FILE:
+            flush()
+            chunk, latest = [], None
+    if chunk or not files:
+        flush()  # an empty section still gets a valid, empty urlset
+
+    # Drop numbered files left over from when the section was bigger.
+    number = len(files) + 1
+    while os.path.exists(os.path.join(_root(), _file_name(section, number))):
+        for suffix in ('', '.gz'):
+            os.remove(os.path.join(_root(), _file_name(section, number) + suffix))
+        number += 1
+    return files
+
+
+def build_index(base_url, manifest):
+    entries = []
+    for section in SECTION_NAMES:
+        for name, lastmod in manifest.get(section, []):
+            entry = f'<sitemap><loc>{escape(f"{base_url}/{name}")}</loc>'
+            if lastmod:
+                entry += f'<lastmod>{lastmod}</lastmod>'
+            entries.append(entry + '</sitemap>\n')
+    _write('sitemap_index.xml', _INDEX_HEAD + ''.join(entries) + '</sitemapindex>\n')
+
+
+def build(sections=None, base_url=None):
+    """
+    Rebuild the given sections (default: the dirty ones) and the index.
+    Returns {section: [file names]} for what was written.
+    """
+    base_url = (base_url or settings.SITE_URL).rstrip('/')
+    sections = dirty_sections() if sections is None else list(sections)
+    if not sections:
+        return {}
+    os.makedirs(_root(), exist_ok=True)
+
+    manifest = _read_manifest()
+    built = {}
+    for section in sections:
+        # A save landing mid-build re-touches the marker and keeps it for next time.
+        marker = _marker(section)
+        marked_at = os.stat(marker).st_mtime_ns if os.path.exists(marker) else None
+        manifest[section] = build_section(section, base_url)
+        built[section] = [name for name, _ in manifest[section]]
+        if marked_at is not None and os.stat(marker).st_mtime_ns == marked_at:
+            os.remove(marker)
+
+    build_index(base_url, manifest)
+    tmp_path = os.path.join(_root(), f'{MANIFEST_NAME}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(_root(), MANIFEST_NAME))
+    return built
@@ -1,16 +1,18 @@
 from django.contrib.sitemaps import Sitemap
+from django.db.models import Max
 from django.urls import reverse
 from blog.models import Post, Category
 from webstory.models import WebStory
 from influencer.models import Influencer
 from django.conf import settings
+from website.sitemap_files import section_version
 
 class PostSitemap(Sitemap):
     def items(self):
         return Post.objects.all()
 
     def lastmod(self, obj):
-        return obj.published_date
+        return obj.modified_date
 
     def location(self, obj):
         return reverse('blog_detail', kwargs={'slug': obj.slug})
@@ -35,7 +37,7 @@ class InfluencersSitemap(Sitemap):
         return reverse('profile_detail', kwargs={'slug': obj.slug})
     
     def lastmod(self, obj):
-        return obj.created_at
+        return obj.updated_at
     
     def get_urls(self, page=1, site=None, protocol=None):
         # Force localhost when in DEBUG mode
@@ -55,7 +57,7 @@ class WebstorySitemap(Sitemap):
         return reverse('webstory_detail', kwargs={'slug': obj.slug})
     
     def lastmod(self, obj):
-        return obj.created_at
+        return obj.updated_at
 
 class StaticSitemap(Sitemap):
     changefreq = "monthly"
@@ -72,4 +74,37 @@ class StaticSitemap(Sitemap):
         ]
         
     def location(self, item):
-        return reverse(item)
\ No newline at end of file
+        return reverse(item)
+
+
+# Model and (indexed) lastmod column behind each section, for conditional GETs.
+SECTION_SOURCES = {
+    'post': (Post, 'modified_date'),
+    'category': (Category, 'updated_at'),
+    'webstory': (WebStory, 'updated_at'),
+    'profiles': (Influencer, 'updated_at'),
+}
+
+
+def section_state(section):
+    """
+    (latest lastmod, version) of a sitemap section. Max() is one index seek;
+    deletions don't move it, but they mark the section dirty, which changes
+    sitemap_files.section_version(). No rows are counted.
+    """
+    model, field = SECTION_SOURCES[section]
+    latest = model.objects.aggregate(latest=Max(field))['latest']
+    return latest, section_version(section)
+
+
+def sitemap_state(request, section, **kwargs):
+    if section not in SECTION_SOURCES:
+        return None
+    latest, version = section_state(section)
+    return latest, (section, latest, *version)
+
+
+def sitemap_index_state(request):
+    states = {section: section_state(section) for section in SECTION_SOURCES}
+    latest = max((l for l, _ in states.values() if l), default=None)
+    return latest, sorted(states.items())
@@ -0,0 +1,71 @@
+"""
+Unique slug allocation shared by every model that derives its slug from a
+name or title.
+
+Picking ``base``, ``base-1``, ``base-2``... with one ``exists()`` per try
+costs a query per collision, so importing a hundred "Priya Sharma"s
+took 5,050 queries. unique_slug() reads every taken ``base`` / ``base-N``
+slug in one query and picks the lowest free suffix in memory.
+
+Two writers can still pick the same free slug at the same moment; the
+unique index rejects the second, and save_with_unique_slug() allocates
+again and retries.
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            return save_with_unique_slug(self, self.name, lambda: self.save(*args, **kwargs))
+        super().save(*args, **kwargs)
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+SAVE_ATTEMPTS = 5
+
+
+def slug_base(model, value, field='slug'):
+    """The unsuffixed slug for ``value``, short enough for any suffix."""
+    max_length = model._meta.get_field(field).max_length
+    base = slugify(value) or model._meta.model_name
+    # Leave room for a "-NNNN" suffix without ever cutting one off.
+    return base[:max_length - 5].rstrip('-') if len(base) > max_length - 5 else base
+
+
+def unique_slug(model, value, field='slug', exclude_pk=None):
+    """The first free slug for ``value`` among ``model``'s rows (excluding ``exclude_pk``)."""
+    base = slug_base(model, value, field)
+    taken = model._default_manager.filter(Q(**{field: base}) | Q(**{f'{field}__startswith': f'{base}-'}))
+    if exclude_pk is not None:
+        taken = taken.exclude(pk=exclude_pk)
+    return first_free(base, set(taken.values_list(field, flat=True)))
+
+
+def first_free(base, taken):
+    """
+    ``base``, or ``base-N`` with the lowest N, that isn't in the set
+    ``taken``. Bulk importers load every taken slug once and call this per row.
+    """
+    if base not in taken:
+        return base
+    number = 1
+    while f'{base}-{number}' in taken:
+        number += 1
+    return f'{base}-{number}'
+
+
+def save_with_unique_slug(instance, value, save, field='slug', attempts=SAVE_ATTEMPTS):
+    """
+    Give ``instance`` a free slug derived from ``value`` and call ``save()``;
+    if a concurrent writer took that slug first, allocate another and retry.
+    """
+    model = type(instance)
+    for attempt in range(attempts):
+        slug = unique_slug(model, value, field, exclude_pk=instance.pk)
+        setattr(instance, field, slug)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            taken = model._default_manager.filter(**{field: slug}).exclude(pk=instance.pk).exists()
+            if not taken or attempt == attempts - 1:
+                raise  # not a slug collision, or we keep losing the race
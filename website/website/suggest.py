@@ -0,0 +1,571 @@
+"""
+Typeahead suggestions for the header search box (``/search/suggest?q=``).
+
+Suggestions never touch the database. They are answered from a compact,
+read-only index file under SUGGEST_ROOT. Each gunicorn worker mmaps that
+file, so all workers share one copy through the page cache.
+
+The file holds, as flat uint32 arrays plus string blobs:
+
+* entries: one record per influencer, post and web story (kind, id, label,
+  url, search tokens). Entries are ordered by kind, then best first, so a
+  lower entry number always ranks higher.
+* vocab: every distinct normalized token, sorted, each with a postings list
+  of the entries it occurs in. A prefix query is a binary search plus a
+  merge of postings.
+* fuzzy: every one-character deletion of each token's first FUZZY_PREFIX
+  characters, sorted, pointing back into vocab. Looking up the query's own
+  deletions finds tokens one typo away (SymSpell-style), and
+  _near_prefix() confirms each candidate.
+
+Saves and deletes (receivers in blog/signals.py) append the changed entry to
+a small delta log after commit. Every worker overlays the log on the mmapped
+index, so edits show up at once. Once the log passes SUGGEST_DELTA_MAX_BYTES,
+the index is rebuilt in a background thread and the log is cut down to what
+came in during the rebuild. ``python manage.py build_suggest_index`` does a
+full rebuild by hand.
+"""
+import bisect
+import contextlib
+import fcntl
+import heapq
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import unicodedata
+from array import array
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SGT1'
+# magic, then entry count, vocab size, fuzzy key count and the entry number
+# where each kind starts (influencer, post, webstory, end)
+_HEADER = struct.Struct('<4s7I')
+
+KINDS = ('influencer', 'post', 'webstory')
+FUZZY_PREFIX = 5
+FUZZY_MIN_LENGTH = 3  # shorter queries match too much when a typo is allowed
+MAX_TOKENS_PER_ENTRY = 24
+MAX_PREFIX_TOKENS = 2000  # vocab tokens merged for one very short prefix
+MAX_FILTER_POSTINGS = 20000  # larger sets cost more to build than they save
+MERGE_MAX_TOKENS = 16
+
+INDEX_NAME = 'suggest.idx'
+DELTA_NAME = 'suggest.delta'
+BUILD_LOCK_NAME = 'build.lock'
+DELTA_LOCK_NAME = 'delta.lock'
+
+_SEP = '\x1f'
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+# ------------------------------
+# Text
+# ------------------------------
+
+def tokenize(text):
+    """Lowercase, accent-free alphanumeric tokens of ``text``."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return _TOKEN_RE.findall(text)
+
+
+def _deletions(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _near_prefix(query, token):
+    """True when ``query`` is within one edit (or one swap of neighbours) of some prefix of ``token``."""
+    if token.startswith(query):
+        return True
+    n = len(query)
+    # Rows of the optimal string alignment distance between query and
+    # token[:j], for prefixes up to one character longer than query.
+    before, previous = None, list(range(n + 1))
+    best = n
+    for j, t_char in enumerate(token[:n + 1], 1):
+        current = [j]
+        for i, q_char in enumerate(query, 1):
+            cost = min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (q_char != t_char))
+            if i > 1 and j > 1 and q_char == token[j - 2] and query[i - 2] == t_char:
+                cost = min(cost, before[i - 2] + 1)
+            current.append(cost)
+        if min(current) > 1:
+            return False
+        best = min(best, current[n])
+        before, previous = previous, current
+    return best <= 1
+
+
+# ------------------------------
+# Entries
+# ------------------------------
+
+def _entry(kind, pk, label, url, texts):
+    tokens = []
+    for text in texts:
+        for token in tokenize(text):
+            if token not in tokens:
+                tokens.append(token)
+    return [kind, pk, label, url, tokens[:MAX_TOKENS_PER_ENTRY]]
+
+
+def influencer_entry(name, slug, nickname, instagram_handle, pk):
+    handle = (instagram_handle or '').lstrip('@')
+    # "pooja_janrao_official" is searchable by its parts and as one word.
+    texts = (name, nickname, handle, handle.replace('_', '').replace('.', ''))
+    return _entry('influencer', pk, name, reverse('profile_detail', kwargs={'slug': slug}), texts)
+
+
+def post_entry(title, slug, pk):
+    return _entry('post', pk, title, reverse('blog_detail', kwargs={'slug': slug}), (title,))
+
+
+def webstory_entry(title, slug, pk):
+    return _entry('webstory', pk, title, reverse('webstory_detail', kwargs={'slug': slug}), (title,))
+
+
+def _all_entries():
+    """Every entry, grouped by kind and best first within a kind."""
+    from blog.models import Post
+    from influencer.models import Influencer
+    from webstory.models import WebStory
+
+    influencers = (
+        Influencer.objects.order_by('-instagram_followers', 'id')
+        .values_list('name', 'slug', 'nickname', 'instagram_handle', 'id')
+    )
+    for row in influencers.iterator(chunk_size=2000):
+        yield influencer_entry(*row)
+    for row in Post.objects.order_by('-published_date', '-id').values_list('title', 'slug', 'id').iterator(chunk_size=2000):
+        yield post_entry(*row)
+    for row in WebStory.objects.order_by('-created_at', '-id').values_list('title', 'slug', 'id').iterator(chunk_size=2000):
+        yield webstory_entry(*row)
+
+
+# ------------------------------
+# Files
+# ------------------------------
+
+def _path(name):
+    return os.path.join(settings.SUGGEST_ROOT, name)
+
+
+@contextlib.contextmanager
+def _flock(name, blocking=True):
+    """
+    An exclusive flock on SUGGEST_ROOT/``name``, held across every worker.
+    Yields False when ``blocking`` is off and another process has it.
+    """
+    os.makedirs(settings.SUGGEST_ROOT, exist_ok=True)
+    with open(_path(name), 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _delta_size():
+    try:
+        return os.path.getsize(_path(DELTA_NAME))
+    except FileNotFoundError:
+        return 0
+
+
+# ------------------------------
+# Building
+# ------------------------------
+
+def _string_table(strings):
+    offsets, blob = array('I', [0]), bytearray()
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % 4)
+
+
+def write_index(entries):
+    """Write ``entries`` (grouped by kind, best first) as the index file, atomically."""
+    records, kind_starts, postings = [], {}, {}
+    for number, (kind, pk, label, url, tokens) in enumerate(entries):
+        kind_starts.setdefault(kind, number)
+        records.append(_SEP.join((kind, str(pk), label, url, ' '.join(tokens))))
+        for token in tokens:
+            postings.setdefault(token, []).append(number)
+
+    vocab = sorted(postings)
+    vocab_number = {token: i for i, token in enumerate(vocab)}
+    fuzzy = sorted({
+        (variant, vocab_number[token])
+        for token in vocab if len(token) > 1
+        for variant in _deletions(token[:FUZZY_PREFIX])
+    })
+
+    starts = [len(records)]
+    for kind in reversed(KINDS):  # a kind with no entries starts where the next one does
+        starts.insert(0, kind_starts.get(kind, starts[0]))
+
+    entry_offsets, entry_blob = _string_table(records)
+    vocab_offsets, vocab_blob = _string_table(vocab)
+    posting_starts, posting_ids = array('I', [0]), array('I')
+    for token in vocab:
+        posting_ids.extend(postings[token])
+        posting_starts.append(len(posting_ids))
+    fuzzy_offsets, fuzzy_blob = _string_table(variant for variant, _ in fuzzy)
+    fuzzy_targets = array('I', (target for _, target in fuzzy))
+
+    sections = [
+        entry_offsets.tobytes(), _pad(entry_blob),
+        vocab_offsets.tobytes(), _pad(vocab_blob), posting_starts.tobytes(), posting_ids.tobytes(),
+        fuzzy_offsets.tobytes(), _pad(fuzzy_blob), fuzzy_targets.tobytes(),
+    ]
+    os.makedirs(settings.SUGGEST_ROOT, exist_ok=True)
+    tmp_path = _path(f'{INDEX_NAME}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(records), len(vocab), len(fuzzy), *starts))
+        # Section byte lengths, so the reader can slice without parsing.
+        f.write(array('I', (len(section) for section in sections)).tobytes())
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, _path(INDEX_NAME))
+    return len(records)
+
+
+def _rebuild():
+    # Remember where the delta log ends now; lines appended during the build
+    # may describe rows the build read before they changed, so they are kept.
+    with _flock(DELTA_LOCK_NAME):
+        start = _delta_size()
+    count = write_index(_all_entries())
+    with _flock(DELTA_LOCK_NAME):
+        try:
+            with open(_path(DELTA_NAME), 'rb') as f:
+                f.seek(start)
+                tail = f.read()
+        except FileNotFoundError:
+            tail = b''
+        tmp_path = _path(f'{DELTA_NAME}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(tail)
+        os.replace(tmp_path, _path(DELTA_NAME))
+    return count
+
+
+def build():
+    """Rebuild the index from the database and compact the delta log. Returns the entry count."""
+    with _flock(BUILD_LOCK_NAME):
+        return _rebuild()
+
+
+def _compact():
+    # One rebuild at a time across all workers; the others skip theirs.
+    with _flock(BUILD_LOCK_NAME, blocking=False) as locked:
+        if locked and _delta_size() > settings.SUGGEST_DELTA_MAX_BYTES:
+            try:
+                _rebuild()
+            except Exception:
+                logger.exception('Could not rebuild the suggest index')
+
+
+# ------------------------------
+# Incremental updates
+# ------------------------------
+
+def _append(*records):
+    lines = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+    with _flock(DELTA_LOCK_NAME):
+        with open(_path(DELTA_NAME), 'a', encoding='utf-8') as f:
+            f.write(lines)
+    if _delta_size() > settings.SUGGEST_DELTA_MAX_BYTES:
+        threading.Thread(target=_compact, name='suggest-compact', daemon=True).start()
+
+
+def record_upsert(*entries):
+    """
+    Add or replace ``entries`` (from influencer_entry() and friends) once the
+    transaction commits. Bulk writers pass them all at once: one append.
+    """
+    records = [{'upsert': entry} for entry in entries]
+    if records:
+        transaction.on_commit(lambda: _append(*records))
+
+
+def record_delete(kind, pk):
+    transaction.on_commit(lambda: _append({'delete': [kind, pk]}))
+
+
+# ------------------------------
+# Reading
+# ------------------------------
+
+class _Index:
+    """The mmapped index file plus the delta overlay."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self.n_vocab, self.n_fuzzy, *starts = _HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a suggest index')
+        self.kind_ranges = {kind: (starts[i], starts[i + 1]) for i, kind in enumerate(KINDS)}
+
+        view = memoryview(self.mm)
+        position = _HEADER.size + 9 * 4
+        sections = []
+        for length in view[_HEADER.size:position].cast('I'):
+            sections.append(view[position:position + length])
+            position += length
+        (entry_offsets, self.entry_blob, vocab_offsets, self.vocab_blob, posting_starts,
+         posting_ids, fuzzy_offsets, self.fuzzy_blob, fuzzy_targets) = sections
+        self.entry_offsets = entry_offsets.cast('I')
+        self.vocab_offsets = vocab_offsets.cast('I')
+        self.posting_starts = posting_starts.cast('I')
+        self.posting_ids = posting_ids.cast('I')
+        self.fuzzy_offsets = fuzzy_offsets.cast('I')
+        self.fuzzy_targets = fuzzy_targets.cast('I')
+
+        # (kind, pk) -> entry, or None once deleted; read from the delta log.
+        self.overlay = {}
+        self.delta_inode = None
+        self.delta_offset = 0
+
+    # -- sorted string tables --
+
+    @staticmethod
+    def _key(offsets, blob, i):
+        return bytes(blob[offsets[i]:offsets[i + 1]])
+
+    def _prefix_range(self, offsets, blob, count, prefix):
+        """``(lo, hi)`` of the sorted keys starting with ``prefix``, at most MAX_PREFIX_TOKENS of them."""
+        prefix = prefix.encode()
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(offsets, blob, mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        end = lo
+        while end < count and end - lo < MAX_PREFIX_TOKENS and self._key(offsets, blob, end).startswith(prefix):
+            end += 1
+        return lo, end
+
+    def vocab_prefix(self, prefix):
+        """Vocab numbers of the tokens starting with ``prefix``."""
+        return range(*self._prefix_range(self.vocab_offsets, self.vocab_blob, self.n_vocab, prefix))
+
+    def prefix_postings(self, prefix):
+        """How many postings the tokens starting with ``prefix`` have (they are stored together)."""
+        numbers = self.vocab_prefix(prefix)
+        return self.posting_starts[numbers.stop] - self.posting_starts[numbers.start]
+
+    def prefix_entries(self, prefix):
+        """The set of entry numbers containing a token that starts with ``prefix``."""
+        numbers = self.vocab_prefix(prefix)
+        return set(self.posting_ids[self.posting_starts[numbers.start]:self.posting_starts[numbers.stop]])
+
+    def sorted_postings(self, vocab_numbers):
+        """
+        Every entry number in the postings of a wide vocab range, sorted. A
+        range's postings are stored together, so for a short prefix like
+        "12" one sort beats merging a thousand short lists. None when a lazy
+        merge is cheaper: few tokens, or past MAX_FILTER_POSTINGS.
+        """
+        start, stop = self.posting_starts[vocab_numbers.start], self.posting_starts[vocab_numbers.stop]
+        if len(vocab_numbers) <= MERGE_MAX_TOKENS or stop - start > MAX_FILTER_POSTINGS:
+            return None
+        return sorted(set(self.posting_ids[start:stop]))
+
+    def fuzzy_prefix(self, prefix):
+        """Vocab numbers of the tokens with a deletion variant starting with ``prefix``."""
+        lo, hi = self._prefix_range(self.fuzzy_offsets, self.fuzzy_blob, self.n_fuzzy, prefix)
+        return {self.fuzzy_targets[i] for i in range(lo, hi)}
+
+    def token(self, vocab_number):
+        return self._key(self.vocab_offsets, self.vocab_blob, vocab_number).decode()
+
+    def postings(self, vocab_number, kind):
+        """Entry numbers of ``kind`` containing the token, best first."""
+        start, end = self.posting_starts[vocab_number], self.posting_starts[vocab_number + 1]
+        low, high = self.kind_ranges[kind]
+        ids = self.posting_ids
+        return ids[bisect.bisect_left(ids, low, start, end):bisect.bisect_left(ids, high, start, end)]
+
+    def entry(self, number):
+        kind, pk, label, url, tokens = self._key(self.entry_offsets, self.entry_blob, number).decode().split(_SEP)
+        return [kind, int(pk), label, url, tokens.split()]
+
+    # -- delta overlay --
+
+    def refresh_overlay(self):
+        """Read whatever the delta log gained since the last call (all of it after a compaction)."""
+        try:
+            f = open(_path(DELTA_NAME), 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self.delta_inode or stat.st_size < self.delta_offset:
+                self.overlay, self.delta_inode, self.delta_offset = {}, stat.st_ino, 0
+            if stat.st_size == self.delta_offset:
+                return
+            f.seek(self.delta_offset)
+            data = f.read()
+        data = data[:data.rfind(b'\n') + 1]  # leave a half-written line for next time
+        self.delta_offset += len(data)
+        for line in data.splitlines():
+            record = json.loads(line)
+            if 'upsert' in record:
+                kind, pk = record['upsert'][:2]
+                self.overlay[(kind, pk)] = record['upsert']
+            else:
+                self.overlay[tuple(record['delete'])] = None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """This worker's view of the index, building the file first if no worker has yet."""
+    global _index
+    path = _path(INDEX_NAME)
+    with _index_lock:
+        if not os.path.exists(path):
+            with _flock(BUILD_LOCK_NAME):
+                if not os.path.exists(path):
+                    _rebuild()
+        if _index is None or _index.inode != os.stat(path).st_ino:
+            _index = _Index(path)  # first use, or a rebuild replaced the file
+        _index.refresh_overlay()
+        return _index
+
+
+# ------------------------------
+# Querying
+# ------------------------------
+
+def _matches(tokens, query_tokens, fuzzy_token=None):
+    """Every query token prefixes some entry token; ``fuzzy_token`` may be one edit off."""
+    for query in query_tokens:
+        if query == fuzzy_token:
+            if not any(_near_prefix(query, token) for token in tokens):
+                return False
+        elif not any(token.startswith(query) for token in tokens):
+            return False
+    return True
+
+
+def _fuzzy_vocab(index, anchor):
+    """Vocab numbers of the tokens one edit from a prefix of ``anchor`` (exact prefixes excluded)."""
+    head = anchor[:FUZZY_PREFIX]
+    # A typo'd character in head shares a deletion variant with the token's
+    # head; a missing one leaves head[:-1] a prefix of one; an extra one is
+    # dropped by a deletion of head, which then prefixes the token itself.
+    candidates = index.fuzzy_prefix(head[:FUZZY_PREFIX - 1])
+    for variant in _deletions(head):
+        candidates |= index.fuzzy_prefix(variant)
+        candidates.update(index.vocab_prefix(variant))
+    if len(anchor) > FUZZY_PREFIX:
+        candidates.update(index.vocab_prefix(head))  # the typo comes after head
+    return [
+        number for number in candidates
+        if not (token := index.token(number)).startswith(anchor) and _near_prefix(anchor, token)
+    ]
+
+
+def _candidates(index, vocab, kind, numbers=None):
+    """
+    Entry numbers of ``kind`` containing any of the ``vocab`` tokens, best
+    first. ``numbers`` is index.sorted_postings() of the same tokens, if known.
+    """
+    if numbers is not None:
+        low, high = index.kind_ranges[kind]
+        return numbers[bisect.bisect_left(numbers, low):bisect.bisect_left(numbers, high)]
+    return heapq.merge(*(index.postings(v, kind) for v in vocab))
+
+
+def _collect(index, candidates, query_tokens, limit, found, fuzzy_token=None, required=()):
+    """
+    Add matching entries from ``candidates`` to ``found`` until it holds
+    ``limit``. Entry numbers missing from any ``required`` set are skipped
+    without decoding them.
+    """
+    seen = {(entry[0], entry[1]) for entry in found}
+    for number in candidates:
+        if len(found) >= limit:
+            return
+        if not all(number in entries for entries in required):
+            continue
+        entry = index.entry(number)
+        key = (entry[0], entry[1])
+        if key in seen or key in index.overlay:
+            continue  # the overlay has a newer version, or it was deleted
+        seen.add(key)
+        if _matches(entry[4], query_tokens, fuzzy_token):
+            found.append(entry)
+
+
+def suggest(query, limit=None):
+    """
+    Suggestions for a partial query as ``[{'type', 'label', 'url'}]``: up to
+    ``limit`` per kind, influencers first, then posts, then web stories.
+    """
+    limit = limit or settings.SUGGEST_LIMIT_PER_KIND
+    query_tokens = tokenize(query)[:MAX_TOKENS_PER_ENTRY]
+    if not query_tokens:
+        return []
+    index = get_index()
+    # The token with the fewest postings fetches the candidates; one with
+    # none at all is probably misspelt, and the fuzzy pass takes it.
+    anchor = min(query_tokens, key=index.prefix_postings)
+    fuzzy_token = anchor if len(anchor) >= FUZZY_MIN_LENGTH else None
+    # Entries must also contain the other tokens; checking set membership
+    # first saves decoding the entries that don't.
+    required = [
+        index.prefix_entries(token) for token in query_tokens
+        if token != anchor and index.prefix_postings(token) <= MAX_FILTER_POSTINGS
+    ]
+
+    exact_vocab = index.vocab_prefix(anchor)
+    exact_numbers = index.sorted_postings(exact_vocab)
+    fuzzy_vocab = None
+    results = []
+    for kind in KINDS:
+        # Entries saved since the last build go first; they are few and fresh.
+        found = [
+            entry for (entry_kind, _), entry in index.overlay.items()
+            if entry and entry_kind == kind and _matches(entry[4], query_tokens)
+        ][:limit]
+        _collect(index, _candidates(index, exact_vocab, kind, exact_numbers), query_tokens, limit, found,
+                 required=required)
+        if len(found) < limit and fuzzy_token:
+            # Too few exact matches: fall back to one-typo matches.
+            if fuzzy_vocab is None:
+                fuzzy_vocab = _fuzzy_vocab(index, anchor)
+            found += [
+                entry for (entry_kind, _), entry in index.overlay.items()
+                if entry and entry_kind == kind and entry not in found
+                and _matches(entry[4], query_tokens, fuzzy_token)
+            ][:limit - len(found)]
+            _collect(index, _candidates(index, fuzzy_vocab, kind), query_tokens, limit, found, fuzzy_token, required)
+        results += [{'type': kind, 'label': entry[2], 'url': entry[3]} for entry in found]
+    return results
@@ -0,0 +1,265 @@
+import datetime
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Post
+from influencer.models import Influencer
+
+from . import image_meta, sitemap_files, suggest, thumbnails
+from .downloader import Downloader, DownloadError
+from .pagination import decode_cursor, encode_cursor
+from .slugs import first_free, save_with_unique_slug, slug_base, unique_slug
+
+
+def _rotated_jpeg(width=400, height=300, orientation=6):
+    """A ``width`` x ``height`` JPEG whose EXIF says to display it rotated."""
+    exif = Image.Exif()
+    exif[thumbnails.EXIF_ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (120, 80, 40)).save(buffer, format='JPEG', exif=exif)
+    buffer.seek(0)
+    return buffer
+
+
+class ThumbnailRenderTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def render(self, src, width, height):
+        dest = os.path.join(self.root, f'{width}x{height}.jpg')
+        thumbnails.render(src, dest, width, height, 80, 'jpg')
+        with Image.open(dest) as thumb:
+            return thumb.size
+
+    def test_exif_rotated_photo_keeps_displayed_aspect_ratio(self):
+        # Stored 400x300, displayed 300x400 (orientation 6).
+        self.assertEqual(self.render(_rotated_jpeg(), 150, 0), (150, 200))
+        self.assertEqual(image_meta.read_meta(_rotated_jpeg())['w'], 300)
+
+    def test_exif_rotated_photo_cropped_to_box(self):
+        self.assertEqual(self.render(_rotated_jpeg(), 100, 100), (100, 100))
+        self.assertEqual(self.render(_rotated_jpeg(), 90, 120), (90, 120))
+
+    def test_never_upscales(self):
+        self.assertEqual(self.render(_rotated_jpeg(), 600, 0), (300, 400))
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        moment = timezone.make_aware(datetime.datetime(2025, 3, 4, 5, 6, 7, 890))
+        for value in (moment, 1200, None, 'text'):
+            with self.subTest(value=value):
+                expected = moment.isoformat() if value is moment else value
+                self.assertEqual(decode_cursor(encode_cursor(value, 42)), (expected, 42))
+
+    def test_garbage_is_value_error(self):
+        for token in ('', '!!!', encode_cursor(1.5, 1), encode_cursor('x', '1'), encode_cursor([1], 1)):
+            with self.subTest(token=token), self.assertRaises(ValueError):
+                decode_cursor(token)
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """Serves ``/<anything>.<ext>`` with the content type in ``TYPES``."""
+
+    TYPES = {'.png': 'image/png', '.svg': 'image/svg+xml', '.html': 'text/html'}
+
+    def do_GET(self):
+        body = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+        self.send_response(200)
+        self.send_header('Content-Type', self.TYPES[os.path.splitext(self.path)[1]])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloaderTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _ImageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f'http://127.0.0.1:{server.server_port}'
+        self.downloader = Downloader(workers=1, retries=0)
+
+    def test_svg_and_html_are_rejected(self):
+        for path in ('/logo.svg', '/page.html'):
+            with self.subTest(path=path), self.assertRaises(DownloadError):
+                self.downloader.fetch(self.base_url + path)
+
+    def test_raster_is_stored_under_its_types_extension(self):
+        name = self.downloader.fetch(f'{self.base_url}/x.png')
+        self.assertTrue(name.startswith('downloads/') and name.endswith('.png'))
+
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root, SITEMAP_ROOT=os.path.join(root, 'sitemaps'),
+                                     SUGGEST_ROOT=os.path.join(root, 'suggest'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        suggest._index = None  # a mmap of another test's file
+        self.addCleanup(setattr, suggest, '_index', None)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.priya = Influencer.objects.create(name='Priya Sharma', instagram_handle='@priya_sharma_official')
+            Post.objects.create(wp_id=1, title='Priya at the premiere', slug='priya-premiere', content='<p>x</p>')
+        suggest.build()
+
+    def labels(self, query):
+        return [(item['type'], item['label']) for item in suggest.suggest(query)]
+
+    def test_index_round_trips_entries(self):
+        entries = [
+            suggest.influencer_entry('Ána Núñez', 'ana', None, 'ana.nunez', 1),
+            suggest.post_entry('Ana writes', 'ana-writes', 7),
+        ]
+        suggest.write_index(entries)
+        index = suggest._Index(suggest._path(suggest.INDEX_NAME))
+        self.assertEqual([index.entry(n) for n in range(2)], entries)
+        self.assertEqual(entries[0][4], ['ana', 'nunez', 'ananunez'])
+
+    def test_prefix_fuzzy_and_handle_matches(self):
+        self.assertEqual(self.labels('pri sha'), [('influencer', 'Priya Sharma')])
+        self.assertEqual(self.labels('priya'), [('influencer', 'Priya Sharma'), ('post', 'Priya at the premiere')])
+        self.assertIn(('influencer', 'Priya Sharma'), self.labels('pirya'))  # one swap
+        self.assertIn(('influencer', 'Priya Sharma'), self.labels('priyasharmaofficial'))
+        self.assertEqual(self.labels('zzz'), [])
+
+    def test_saves_and_deletes_show_through_the_delta_log(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.priya.name = 'Priya Kapoor'
+            self.priya.save()
+            Influencer.objects.create(name='Kavya Rao')
+        self.assertEqual(self.labels('kapoor'), [('influencer', 'Priya Kapoor')])
+        self.assertEqual(self.labels('sharma'), [('influencer', 'Priya Kapoor')])  # the handle still matches
+        self.assertEqual(self.labels('kavya'), [('influencer', 'Kavya Rao')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.priya.delete()
+        self.assertEqual(self.labels('kapoor'), [])
+
+        # A rebuild folds the log into the index and empties it.
+        suggest.build()
+        self.assertEqual(os.path.getsize(suggest._path(suggest.DELTA_NAME)), 0)
+        self.assertEqual(self.labels('kavya'), [('influencer', 'Kavya Rao')])
+        self.assertEqual(self.labels('kapoor'), [])
+
+    def test_near_prefix(self):
+        self.assertTrue(suggest._near_prefix('shrma', 'sharma'))
+        self.assertTrue(suggest._near_prefix('shamra', 'sharma'))
+        self.assertFalse(suggest._near_prefix('xyzma', 'sharma'))
+
+
+class SlugTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=root, SITEMAP_ROOT=os.path.join(root, 'sitemaps'),
+                                     SUGGEST_ROOT=os.path.join(root, 'suggest'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_first_free(self):
+        self.assertEqual(first_free('a', set()), 'a')
+        self.assertEqual(first_free('a', {'a', 'a-1', 'a-3'}), 'a-2')
+
+    def test_same_names_get_numbered_slugs_in_one_query_each(self):
+        slugs = [Influencer.objects.create(name='Priya Sharma').slug for _ in range(3)]
+        self.assertEqual(slugs, ['priya-sharma', 'priya-sharma-1', 'priya-sharma-2'])
+        # "priya-sharma-official" shares the prefix but is not a suffix of it.
+        Influencer.objects.create(name='Priya Sharma Official')
+        with self.assertNumQueries(1):
+            self.assertEqual(unique_slug(Influencer, 'Priya Sharma'), 'priya-sharma-3')
+
+    def test_long_names_leave_room_for_a_suffix(self):
+        max_length = Influencer._meta.get_field('slug').max_length
+        base = slug_base(Influencer, 'x' * 300)
+        self.assertLessEqual(len(base) + 5, max_length)
+        self.assertEqual(slug_base(Influencer, '!!!'), 'influencer')
+
+    def test_lost_race_allocates_again(self):
+        Influencer.objects.create(name='Racer')
+        influencer = Influencer(name='Racer')
+        # The first allocation is stale, as if another writer took 'racer' just before our INSERT.
+        real_unique_slug = unique_slug
+        calls = []
+
+        def stale_then_real(*args, **kwargs):
+            calls.append(1)
+            return 'racer' if len(calls) == 1 else real_unique_slug(*args, **kwargs)
+
+        with mock.patch('website.slugs.unique_slug', stale_then_real):
+            save_with_unique_slug(influencer, influencer.name, lambda: super(Influencer, influencer).save())
+        self.assertEqual(influencer.slug, 'racer-1')
+        self.assertEqual(len(calls), 2)
+
+
+class SitemapFileTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.sitemaps = os.path.join(root, 'sitemaps')
+        settings = override_settings(MEDIA_ROOT=root, SITEMAP_ROOT=self.sitemaps,
+                                     SUGGEST_ROOT=os.path.join(root, 'suggest'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def read(self, name):
+        with open(os.path.join(self.sitemaps, name), encoding='utf-8') as f:
+            text = f.read()
+        with gzip.open(os.path.join(self.sitemaps, f'{name}.gz'), 'rt', encoding='utf-8') as f:
+            self.assertEqual(f.read(), text)
+        return text
+
+    def test_first_build_writes_every_section_and_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(wp_id=1, title='Mapped', slug='mapped', content='<p>x</p>')
+        built = sitemap_files.build(base_url='https://example.com/')
+        self.assertEqual(set(built), set(sitemap_files.SECTION_NAMES))
+        self.assertIn('<loc>https://example.com/mapped/</loc><lastmod>', self.read('post-sitemap.xml'))
+        self.assertIn('<loc>https://example.com/profiles-sitemap.xml</loc>', self.read('sitemap_index.xml'))
+        self.assertEqual(sitemap_files.dirty_sections(), [])
+
+    def test_only_dirty_sections_are_rebuilt(self):
+        sitemap_files.build(base_url='https://example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            Influencer.objects.create(name='New Face')
+        self.assertEqual(sitemap_files.dirty_sections(), ['profiles'])
+        self.assertEqual(sitemap_files.build(base_url='https://example.com'), {'profiles': ['profiles-sitemap.xml']})
+        self.assertIn('/@new-face/', self.read('profiles-sitemap.xml'))
+
+    def test_large_sections_split_and_shrink(self):
+        for n in range(5):
+            Influencer.objects.create(name=f'Person {n}')
+        with mock.patch.object(sitemap_files, 'MAX_URLS_PER_FILE', 2):
+            files = sitemap_files.build(['profiles'], base_url='https://example.com')['profiles']
+            self.assertEqual(files, ['profiles-sitemap.xml', 'profiles-sitemap2.xml', 'profiles-sitemap3.xml'])
+            self.assertIn('profiles-sitemap3.xml', self.read('sitemap_index.xml'))
+
+            Influencer.objects.filter(name__in=['Person 0', 'Person 1', 'Person 2']).delete()
+            sitemap_files.build(['profiles'], base_url='https://example.com')
+        self.assertFalse(os.path.exists(os.path.join(self.sitemaps, 'profiles-sitemap2.xml')))
+        self.assertFalse(os.path.exists(os.path.join(self.sitemaps, 'profiles-sitemap3.xml.gz')))
+        self.assertNotIn('profiles-sitemap2.xml', self.read('sitemap_index.xml'))
@@ -0,0 +1,148 @@
+"""
+On-demand resized copies of uploaded images, cached on disk.
+
+Templates ask for a size with the ``{% thumbnail %}`` tag
+(influencer/templatetags/thumbnails.py), which emits ``src``/``srcset`` URLs
+like
+
+    /media/thumbs/80x80q80/influencer_pics/pooja.jpg.3f9c0a1b2d4e5f60.webp
+
+that is ``<width>x<height>q<quality>/<original name>.<signature>.<format>``.
+A height of 0 keeps the aspect ratio; otherwise the image is cropped to
+cover the box, like ``object-cover``. The signature is an HMAC of the rest
+of the URL, so nobody can make the server render sizes the templates never
+asked for.
+
+The first request for a URL reaches the ``thumbnail`` view. It renders the
+file into THUMBNAIL_ROOT at that same path, so nginx serves every later
+request straight from disk (see README.txt). Images are never scaled up. A
+deleted original takes its cached copies with it (website/file_cleanup.py
+calls purge()).
+"""
+import glob
+import math
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+# URL extension -> (Pillow format, content type)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'avif': ('AVIF', 'image/avif'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+SIGNATURE_LENGTH = 16
+EXIF_ORIENTATION = 0x0112
+
+
+def _spec(width, height, quality):
+    return f'{width}x{height}q{quality}'
+
+
+def signature(spec, name, fmt):
+    raw = f'{spec}/{name}.{fmt}'
+    return salted_hmac('website.thumbnails', raw).hexdigest()[:SIGNATURE_LENGTH]
+
+
+def thumbnail_path(width, height, quality, name, fmt):
+    """The thumbnail's path relative to THUMBNAIL_ROOT (and to THUMBNAIL_URL)."""
+    spec = _spec(width, height, quality)
+    return f'{spec}/{name}.{signature(spec, name, fmt)}.{fmt}'
+
+
+def thumbnail_url(name, width, height=0, fmt=None, quality=None):
+    """Signed URL of ``name`` (a storage name) resized to ``width`` x ``height``."""
+    fmt = fmt or settings.THUMBNAIL_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown thumbnail format {fmt!r}')
+    quality = quality or settings.THUMBNAIL_QUALITY[fmt]
+    width, height = min(int(width), settings.THUMBNAIL_MAX_SIZE), min(int(height), settings.THUMBNAIL_MAX_SIZE)
+    return settings.THUMBNAIL_URL + thumbnail_path(width, height, quality, name, fmt)
+
+
+def parse(spec, rest):
+    """
+    ``(width, height, quality, name, fmt)`` for a thumbnail URL's parts, or
+    None when they are malformed or the signature doesn't match.
+    """
+    try:
+        width, rest_spec = spec.split('x', 1)
+        height, quality = rest_spec.split('q', 1)
+        width, height, quality = int(width), int(height), int(quality)
+        name, sig, fmt = rest.rsplit('.', 2)
+    except ValueError:
+        return None
+    if fmt not in FORMATS or spec != _spec(width, height, quality):
+        return None
+    if not (0 < width <= settings.THUMBNAIL_MAX_SIZE and 0 <= height <= settings.THUMBNAIL_MAX_SIZE and 0 < quality <= 100):
+        return None
+    if not constant_time_compare(sig, signature(spec, name, fmt)):
+        return None
+    return width, height, quality, name, fmt
+
+
+def _target_size(source, width, height):
+    """The output size: ``width`` x ``height`` (or aspect-kept), shrunk to never upscale."""
+    src_width, src_height = source
+    if not height:
+        width = min(width, src_width)
+        return width, max(1, round(src_height * width / src_width))
+    # Keep the box's aspect ratio but no larger than the source allows.
+    scale = min(1, src_width / width, src_height / height)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def render(src_file, dest_path, width, height, quality, fmt):
+    """Resize the image in ``src_file`` (a path or file object) into ``dest_path``."""
+    with Image.open(src_file) as img:
+        # EXIF-rotated photos are displayed (and sized) the other way round.
+        rotated = img.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8)
+        src_width, src_height = (img.height, img.width) if rotated else img.size
+        size = _target_size((src_width, src_height), width, height)
+        # Smallest scale at which the decoded image still covers the output.
+        scale = max(size[0] / src_width, size[1] / src_height)
+        needed = (math.ceil(src_width * scale), math.ceil(src_height * scale))
+
+        # JPEG: let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full
+        # size. draft() works on the stored, unrotated pixels.
+        img.draft('RGB', needed[::-1] if rotated else needed)
+        img = ImageOps.exif_transpose(img)
+        # Other formats: cheap integer-factor box reduction before the real resample.
+        factor = int(min(img.width / needed[0], img.height / needed[1]))
+        if factor >= 2:
+            img = img.reduce(factor)
+
+        pil_format = FORMATS[fmt][0]
+        mode = 'RGB' if pil_format == 'JPEG' or img.mode not in ('RGBA', 'LA', 'P') else 'RGBA'
+        img = img.convert(mode)
+        if height:
+            thumb = ImageOps.fit(img, size, Image.Resampling.LANCZOS)
+        else:
+            thumb = img.resize(size, Image.Resampling.LANCZOS)
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path), suffix='.tmp')
+    options = {'optimize': True, 'progressive': True} if pil_format == 'JPEG' else {}
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            thumb.save(f, format=pil_format, quality=quality, **options)
+        os.chmod(tmp_path, 0o644)  # mkstemp's 0600 would hide it from nginx
+        os.replace(tmp_path, dest_path)  # nginx never serves a half-written file
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def purge(name):
+    """Delete every cached thumbnail of ``name``."""
+    suffix = '.' + '[0-9a-f]' * SIGNATURE_LENGTH + '.*'
+    pattern = os.path.join(glob.escape(settings.THUMBNAIL_ROOT), '*', glob.escape(name) + suffix)
+    for path in glob.glob(pattern):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -5,8 +5,9 @@ from django.urls import path, include, re_path
 from django.contrib.sitemaps.views import sitemap
 from . import sitemaps as sm 
 from . import views
+from .conditional import conditional_page
 from bavaalapps import views as appsviews
-from influencer.views import profile_detail
+from influencer.views import influencer_directory, influencer_directory_more, profile_detail
 
 sitemaps = {
     'post': sm.PostSitemap,
@@ -32,13 +33,18 @@ urlpatterns = [
     # Influencer Profile URL (if you want it directly here)
     # This pattern catches anything starting with '@' followed by a slug
     re_path(r'^@(?P<slug>[-\w]+)/$', profile_detail, name='profile_detail'),
+    path('influencers/', influencer_directory, name='influencer_directory'),
+    path('influencers/more/', influencer_directory_more, name='influencer_directory_more'),
 
     # Sitemap URLs
     # Use the 'sitemaps' dictionary directly in the sitemap view
     path('ads.txt', views.ads_txt_view, name='ads_txt'),
     path('sitemap_index.xml', views.custom_sitemap_index, name='custom_sitemap_index'), # Pass sitemaps to your custom index
-    path('<section>-sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('<section>-sitemap.xml', conditional_page(sm.sitemap_state)(sitemap), {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
 
+    path('search/suggest', views.search_suggest, name='search_suggest'),
+    # Resized images; nginx serves the cached files (website/thumbnails.py)
+    path(f'{settings.THUMBNAIL_URL.lstrip("/")}<str:spec>/<path:rest>', views.thumbnail, name='thumbnail'),
     path('influencer/', include('influencer.urls')),
     
     # IMPORTANT: The root URL should point to ONE primary app.
@@ -1,6 +1,9 @@
-from django.http import HttpResponse
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
 from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET
 from django.template.loader import render_to_string
 from webstory.models import WebStory
 from influencer.models import Influencer
@@ -8,6 +11,11 @@ from blog.models import Post, Category
 from django.conf import settings
 import os
 
+from .conditional import conditional_page
+from .sitemaps import sitemap_index_state
+from .suggest import suggest
+from . import thumbnails
+
 
 def about_page(request):
     return render(request, 'core/about.html')
@@ -43,6 +51,7 @@ def ads_txt_view(request):
         return HttpResponse("ads.txt not found", status=404, content_type="text/plain")
 
 
+@conditional_page(sitemap_index_state)
 def custom_sitemap_index(request):
     base_url = request.build_absolute_uri('/')[:-1]  # removes trailing slash
 
@@ -53,7 +62,7 @@ def custom_sitemap_index(request):
         },
         {
             "location": f"{base_url}/post-sitemap.xml",
-            "lastmod": get_latest(Post, 'published_date'),
+            "lastmod": get_latest(Post, 'modified_date'),
         },
         {
             "location": f"{base_url}/category-sitemap.xml",
@@ -70,3 +79,34 @@ def custom_sitemap_index(request):
 
     xml = render_to_string("sitemap_index.xml", {"sitemaps": sitemaps})
     return HttpResponse(xml, content_type="application/xml")
+
+
+@require_GET
+@cache_control(public=True, max_age=60)
+def search_suggest(request):
+    """Header typeahead; answered from the suggest index, never the database."""
+    query = request.GET.get('q', '')[:100]
+    return JsonResponse({'success': True, 'results': suggest(query)})
+
+
+@require_GET
+def thumbnail(request, spec, rest):
+    """
+    Render a resized image on its first request. The file lands where
+    nginx looks first, so later requests never get here.
+    """
+    parsed = thumbnails.parse(spec, rest)
+    if parsed is None:
+        raise Http404('Unknown thumbnail')
+    width, height, quality, name, fmt = parsed
+    dest_path = os.path.join(settings.THUMBNAIL_ROOT, spec, rest)
+    if not os.path.exists(dest_path):
+        try:
+            with default_storage.open(name) as src:
+                thumbnails.render(src, dest_path, width, height, quality, fmt)
+        except (OSError, ValueError):
+            # Missing original, or not an image Pillow can read.
+            raise Http404('Image not found')
+    response = FileResponse(open(dest_path, 'rb'), content_type=thumbnails.FORMATS[fmt][1])
+    response['Cache-Control'] = f'public, max-age={settings.THUMBNAIL_CACHE_SECONDS}'
+    return response
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:35
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing stories were last changed no later than they were created.
+    WebStory = apps.get_model('webstory', 'WebStory')
+    WebStory.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webstory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webstory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -1,26 +1,21 @@
 from django.db import models
 
+from website.slugs import save_with_unique_slug
+
 class WebStory(models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField(unique=True)
     content = models.TextField()  # Full AMP HTML
     cover_image = models.ImageField(upload_to="webstories/cover/", null=True, blank=True)
+    # Size, colour and placeholder of cover_image (website/image_meta.py)
+    image_meta = models.JSONField(default=dict, blank=True, editable=False)
+    IMAGE_META_FIELDS = ('cover_image',)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def save(self, *args, **kwargs):
-        if not self.slug: # If slug is empty or None
-            original_slug = slugify(self.title)
-            queryset = WebStory.objects.all()
-            if self.pk: # Exclude self when updating
-                queryset = queryset.exclude(pk=self.pk)
-
-            # Ensure slug is unique by appending a number if necessary
-            unique_slug = original_slug
-            num = 1
-            while queryset.filter(slug=unique_slug).exists():
-                unique_slug = f"{original_slug}-{num}"
-                num += 1
-            self.slug = unique_slug
+        if not self.slug: # If slug is empty or None, allocate one and save with it
+            return save_with_unique_slug(self, self.title, lambda: self.save(*args, **kwargs))
         super().save(*args, **kwargs)
 
     def __str__(self):
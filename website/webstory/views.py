@@ -1,5 +1,6 @@
 # webstory/views.py
 from django.shortcuts import get_object_or_404, render
+from website.conditional import conditional_page
 from .models import WebStory # Ensure WebStory is imported
 
 def webstory_list_view(request):
@@ -8,6 +9,12 @@ def webstory_list_view(request):
     return render(request, "webstories/webstory_list.html", {"stories": stories})
 
 
+def _story_state(request, slug):
+    row = WebStory.objects.filter(slug=slug).values_list('id', 'updated_at').first()
+    return (row[1], row) if row else None
+
+
+@conditional_page(_story_state)
 def webstory_detail_view(request, slug):
     story = get_object_or_404(WebStory, slug=slug)
     return render(request, "webstories/detail.html", {"story": story})
\ No newline at end of file